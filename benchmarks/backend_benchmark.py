@@ -0,0 +1,84 @@
+#
+# Compares inference backends on CPU: single-problem latency, batch throughput, model size and
+# the largest probability difference from the fp32 PyTorch model.
+#
+# Usage: python -m benchmarks.backend_benchmark [--rows N] [--latency-rows N] [--threads N]
+#
+# Without --model a small randomly initialized BERT is exported, so the benchmark runs offline.
+#
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_skewed_texts
+from benchmarks.synthetic_model import make_model_dir
+from classifier.export import export_onnx, export_quantized
+from classifier.predict import BACKENDS, ONNX_INT8_MODEL_FILE, ONNX_MODEL_FILE, QUANTIZED_MODEL_FILE, Predictor
+
+MODEL_FILES = {
+    'torch': "model.safetensors",
+    'torch-int8': QUANTIZED_MODEL_FILE,
+    'onnx': ONNX_MODEL_FILE,
+    'onnx-int8': ONNX_INT8_MODEL_FILE,
+}
+
+
+def measure_backend(predictor, texts, latency_texts):
+    latencies = []
+
+    for text in latency_texts:
+        start = time.perf_counter()
+        predictor.predict_proba([text])
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    probabilities = predictor.predict_proba(texts)
+    elapsed = time.perf_counter() - start
+
+    return probabilities, np.percentile(latencies, 50) * 1000, len(texts) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=512)
+    parser.add_argument('--latency-rows', type=int, default=64)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--model', default=None)
+    parser.add_argument('--mlb', default=None)
+    args = parser.parse_args()
+
+    texts = make_skewed_texts(args.rows)
+    latency_texts = texts[:args.latency_rows]
+    print(f"=== {len(texts)} problems, latency of {len(latency_texts)} single problems")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.model is None:
+            args.model, args.mlb = make_model_dir(tmp_dir)
+
+        export_quantized(args.model)
+        export_onnx(args.model, int8=True)
+
+        expected_probabilities = None
+
+        for backend in BACKENDS:
+            predictor = Predictor(args.model, mlb_filepath=args.mlb, num_threads=args.threads, backend=backend)
+            probabilities, latency_ms, throughput = measure_backend(predictor, texts, latency_texts)
+
+            if expected_probabilities is None:
+                expected_probabilities = probabilities
+
+            model_size_mb = os.path.getsize(f"{args.model}/{MODEL_FILES[backend]}") / 2 ** 20
+            max_diff = np.abs(probabilities - expected_probabilities).max()
+
+            print(
+                f"{backend:<12} p50 latency {latency_ms:7.2f}ms, {throughput:8.1f} problems/sec, "
+                f"model {model_size_mb:6.1f}MB, max probability diff {max_diff:.2e}"
+            )
+
+
+if __name__ == '__main__':
+    main()
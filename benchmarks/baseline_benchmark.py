@@ -0,0 +1,77 @@
+#
+# Compares training time, problems/sec and macro-F1 of the baseline classifier with TF-IDF and
+# hashed features, trained on a single core and on all cores.
+#
+# Usage: python -m benchmarks.baseline_benchmark [--rows N]
+#
+# Synthetic problems have the skewed lengths of problem statements, and words typical for each
+# of their labels, so the baseline has something to learn.
+#
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import joblib
+import numpy as np
+
+from benchmarks.synthetic import make_skewed_texts
+from classifier.baseline import BaselinePredictor, train_baseline
+from classifier.metrics import multi_labels_metrics
+from data_manager.preprocess import iterative_stratified_split
+from data_manager.utils import PROBLEM_LABELS
+
+# words of a label appear in a statement with this label
+LABEL_WORDS_COUNT = 5
+
+
+def make_labelled_texts(rows_count, seed=0):
+    rng = random.Random(seed)
+    labels = np.zeros((rows_count, len(PROBLEM_LABELS)), dtype=np.uint8)
+    texts = make_skewed_texts(rows_count, seed=seed)
+
+    for row in range(rows_count):
+        row_labels = rng.sample(range(len(PROBLEM_LABELS)), rng.randint(1, 3))
+        labels[row, row_labels] = 1
+        label_words = [f"{PROBLEM_LABELS[label]}{rng.randrange(LABEL_WORDS_COUNT)}".replace(" ", "") for label in row_labels]
+        texts[row] = f"{texts[row]} {' '.join(label_words)}"
+
+    return texts, labels
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20000)
+    args = parser.parse_args()
+
+    texts, labels = make_labelled_texts(args.rows)
+    train_index, val_index = iterative_stratified_split(labels)
+    train_texts, val_texts = [texts[i] for i in train_index], [texts[i] for i in val_index]
+
+    print(f"=== {len(train_texts)} training and {len(val_texts)} validation problems, "
+          f"{len(PROBLEM_LABELS)} labels, {os.cpu_count()} CPU cores")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for vectorizer in ['tfidf', 'hashing']:
+            for n_jobs in [1, -1]:
+                start = time.perf_counter()
+                pipeline = train_baseline(train_texts, labels[train_index], vectorizer=vectorizer, n_jobs=n_jobs)
+                training_time = time.perf_counter() - start
+
+                model_filepath = f"{tmp_dir}/baseline.joblib"
+                joblib.dump({'pipeline': pipeline, 'label_names': PROBLEM_LABELS}, model_filepath)
+                predictor = BaselinePredictor(model_filepath)
+
+                start = time.perf_counter()
+                logits = predictor.predict_logits(val_texts)
+                elapsed = time.perf_counter() - start
+
+                f1 = multi_labels_metrics(logits, labels[val_index])['f1']
+                print(f"{vectorizer:<8} n_jobs={n_jobs:<3} trained in {training_time:6.2f}s, "
+                      f"{len(val_texts) / elapsed:8.0f} problems/sec, macro-F1 {f1:.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#
+# Compares a training epoch on CPU with batches padded to the fixed max length (as before)
+# and with length-bucketed batches padded to their longest sample.
+#
+# Usage: python -m benchmarks.batching_benchmark [--rows N] [--max-length N] [--layers N] [--hidden-size N]
+#
+# Texts have a skewed length distribution, like problem statements do: most of them are short
+# and a few reach the max length. A small randomly initialized BERT is trained, tokens/sec counts
+# only real (not padding) tokens.
+#
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, RandomSampler
+from transformers import BertConfig, BertForSequenceClassification
+
+from benchmarks.synthetic import make_skewed_texts
+from benchmarks.synthetic_tokenizer import make_tokenizer
+from classifier.batching import LengthBucketBatchSampler, collate_to_longest
+from classifier.corpus import CorpusDataset, build_corpus
+
+BATCH_SIZE = 16
+LABELS_COUNT = 22
+
+
+def run_epoch(model, dataloader):
+    optimizer = torch.optim.AdamW(model.parameters(), lr=1e-4)
+    model.train()
+    tokens_count = 0
+    padded_tokens_count = 0
+
+    start = time.perf_counter()
+
+    for batch in dataloader:
+        loss = model(**batch).loss
+        loss.backward()
+        optimizer.step()
+        optimizer.zero_grad()
+
+        tokens_count += int(batch['attention_mask'].sum())
+        padded_tokens_count += batch['attention_mask'].numel()
+
+    return time.perf_counter() - start, tokens_count, padded_tokens_count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=512)
+    parser.add_argument('--max-length', type=int, default=512)
+    parser.add_argument('--layers', type=int, default=2)
+    parser.add_argument('--hidden-size', type=int, default=128)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    texts = make_skewed_texts(args.rows)
+    labels = (np.random.default_rng(0).random((args.rows, LABELS_COUNT)) < 0.2).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tokenizer = make_tokenizer(tmp_dir)
+        build_corpus(texts, labels, tokenizer, f"{tmp_dir}/corpus", max_length=args.max_length)
+        dataset = CorpusDataset(f"{tmp_dir}/corpus")
+
+        config = BertConfig(
+            vocab_size=tokenizer.vocab_size,
+            hidden_size=args.hidden_size,
+            num_hidden_layers=args.layers,
+            num_attention_heads=max(1, args.hidden_size // 64),
+            intermediate_size=args.hidden_size * 4,
+            max_position_embeddings=args.max_length,
+            num_labels=LABELS_COUNT,
+            problem_type="multi_label_classification",
+        )
+
+        dataloaders = [
+            ("fixed length (before)", DataLoader(dataset, batch_size=BATCH_SIZE, sampler=RandomSampler(dataset))),
+            ("bucketed, dynamic padding (after)", DataLoader(
+                dataset,
+                batch_sampler=LengthBucketBatchSampler(dataset.get_lengths(), BATCH_SIZE),
+                collate_fn=collate_to_longest,
+            )),
+        ]
+
+        lengths = dataset.get_lengths()
+        print(f"=== {args.rows} texts, tokens per text: median {int(np.median(lengths))}, max {lengths.max()}, "
+              f"batch size {BATCH_SIZE}, max length {args.max_length}")
+
+        for name, dataloader in dataloaders:
+            model = BertForSequenceClassification(config)
+            elapsed, tokens_count, padded_tokens_count = run_epoch(model, dataloader)
+            print(
+                f"{name:<36} {elapsed:8.2f}s per epoch {tokens_count / elapsed:10.0f} tokens/sec "
+                f"({100 * tokens_count / padded_tokens_count:.0f}% of computed tokens are not padding)"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#
+# Compares data loading time per epoch of tokenizing every sample on the fly
+# (as `train_bert.py` did before) with serving pre-tokenized memory-mapped corpus,
+# and checks that both produce the same samples.
+#
+# Usage: python -m benchmarks.corpus_benchmark [--rows N] [--epochs N] [--checkpoint bert-base-uncased]
+#
+# Without --checkpoint a word-level tokenizer over synthetic words is used, so the benchmark runs offline.
+#
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Dataset
+from transformers import BertTokenizerFast
+
+from benchmarks.synthetic import make_codeforces_df
+from benchmarks.synthetic_tokenizer import make_tokenizer
+from classifier.corpus import CorpusDataset, build_corpus
+from classifier.tokenization import MAX_LENGTH
+
+BATCH_SIZE = 16
+
+
+class TokenizingDataset(Dataset):
+    # CustomDataset from train_bert.py, as it was before the corpus was pre-tokenized
+
+    def __init__(self, texts, labels, tokenizer, max_len=MAX_LENGTH):
+        self.texts = texts
+        self.labels = labels
+        self.tokenizer = tokenizer
+        self.max_len = max_len
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __getitem__(self, idx):
+        text = str(self.texts[idx])
+        label = torch.tensor(self.labels[idx], dtype=torch.float32)
+
+        encoding = self.tokenizer(
+            text,
+            truncation=True,
+            padding="max_length",
+            max_length=self.max_len,
+            return_tensors='pt'
+        )
+
+        return {
+            'input_ids': encoding['input_ids'].squeeze(0),
+            'attention_mask': encoding['attention_mask'].squeeze(0),
+            'labels': label
+        }
+
+
+def run_epochs(dataset, epochs):
+    loader = DataLoader(dataset, batch_size=BATCH_SIZE)
+    epoch_times = []
+
+    for _ in range(epochs):
+        start = time.perf_counter()
+
+        for _ in loader:
+            pass
+
+        epoch_times.append(time.perf_counter() - start)
+
+    return epoch_times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--checkpoint', default=None)
+    args = parser.parse_args()
+
+    df = make_codeforces_df(args.rows)
+    texts = df['description'].fillna('').tolist()
+    rng = np.random.default_rng(0)
+    labels = (rng.random((args.rows, 22)) < 0.2).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tokenizer = BertTokenizerFast.from_pretrained(args.checkpoint) if args.checkpoint else make_tokenizer(tmp_dir)
+        corpus_dir = f"{tmp_dir}/corpus"
+
+        start = time.perf_counter()
+        build_corpus(texts, labels, tokenizer, corpus_dir)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        is_rebuilt = build_corpus(texts, labels, tokenizer, corpus_dir)
+        check_time = time.perf_counter() - start
+        assert not is_rebuilt, "unchanged corpus is tokenized again"
+
+        tokenizing_dataset = TokenizingDataset(texts, labels, tokenizer)
+        corpus_dataset = CorpusDataset(corpus_dir)
+
+        print(f"=== {args.rows} texts, {args.epochs} epochs, batch size {BATCH_SIZE}")
+        print(f"corpus tokenization (once)         {build_time:8.2f}s")
+        print(f"up-to-date corpus check            {check_time:8.2f}s")
+
+        for name, dataset in [("tokenizing on the fly (before)", tokenizing_dataset), ("memory-mapped corpus (after)", corpus_dataset)]:
+            epoch_times = run_epochs(dataset, args.epochs)
+            print(f"{name:<34} {np.mean(epoch_times):8.2f}s per epoch")
+
+        for idx in range(len(texts)):
+            expected, actual = tokenizing_dataset[idx], corpus_dataset[idx]
+
+            for name in expected:
+                assert torch.equal(expected[name], actual[name].to(expected[name].dtype)), f"sample {idx} has different {name}"
+
+        print("both datasets produce the same samples")
+
+
+if __name__ == '__main__':
+    main()
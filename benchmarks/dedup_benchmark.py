@@ -0,0 +1,118 @@
+#
+# Compares finding near-duplicate problems by comparing all pairs of shingle sets (quadratic) and with
+# MinHash signatures and LSH bands, checks that MinHash finds the same duplicates, and measures how
+# MinHash/LSH scales with the number of problems.
+#
+# Usage: python -m benchmarks.dedup_benchmark [--rows N] [--pairwise-rows N]
+#
+# Synthetic problems are random statements, some of them copied to another source with a few words
+# edited and different formatting, like a classic problem published on several sites.
+#
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_manager.dedup import SIMILARITY_THRESHOLD, find_duplicate_clusters, get_shingle_hashes
+
+VOCABULARY_SIZE = 20000
+DUPLICATE_PROBABILITY = 0.05
+# share of words of a copied statement which are replaced
+EDITED_WORDS_SHARE = 0.03
+SOURCES = ['codeforces', 'leetcode', 'spoj']
+
+
+def make_problems(rows_count, seed=0):
+    """
+    :return: descriptions and sources of problems, and the row of the original problem of every copy
+    """
+    rng = np.random.default_rng(seed)
+    descriptions, sources, originals = [], [], {}
+
+    for row in range(rows_count):
+        if descriptions and rng.random() < DUPLICATE_PROBABILITY:
+            original = int(rng.integers(len(descriptions)))
+            words = descriptions[original].lower().split()
+            edited = rng.random(len(words)) < EDITED_WORDS_SHARE
+            words = [f"w{rng.integers(VOCABULARY_SIZE)}" if is_edited else word for word, is_edited in zip(words, edited)]
+            # another site formats the same statement differently
+            descriptions.append("<p>" + ", ".join(words).upper() + "</p>")
+            originals[row] = original
+        else:
+            words_count = int(rng.lognormal(4.5, 0.8)) + 1
+            descriptions.append(" ".join(f"w{word}" for word in rng.zipf(1.3, words_count) % VOCABULARY_SIZE))
+
+        sources.append(SOURCES[row % len(SOURCES)])
+
+    return pd.DataFrame({'source': sources, 'description': descriptions}), originals
+
+
+def find_pairwise_duplicates(descriptions: pd.Series, threshold=SIMILARITY_THRESHOLD):
+    # exact Jaccard similarity of shingle sets of every pair of problems
+    hashes, offsets = get_shingle_hashes(descriptions)
+    shingle_sets = [set(hashes[offsets[i]:offsets[i + 1]].tolist()) for i in range(len(descriptions))]
+    pairs = set()
+
+    for i in range(len(shingle_sets)):
+        for j in range(i + 1, len(shingle_sets)):
+            union = len(shingle_sets[i] | shingle_sets[j])
+
+            if union and len(shingle_sets[i] & shingle_sets[j]) / union >= threshold:
+                pairs.add((i, j))
+
+    return pairs
+
+
+def get_cluster_pairs(cluster_ids):
+    pairs = set()
+
+    for cluster_id in np.unique(cluster_ids):
+        rows = np.flatnonzero(cluster_ids == cluster_id)
+        pairs.update((int(i), int(j)) for k, i in enumerate(rows) for j in rows[k + 1:])
+
+    return pairs
+
+
+def measure(name, rows_count, function):
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+
+    print(f"{name:<28} {rows_count:>8} problems {elapsed:8.2f}s {rows_count / elapsed:10.0f} problems/sec")
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--pairwise-rows', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"=== pairwise and MinHash/LSH on {args.pairwise_rows} problems")
+    problems_df, _ = make_problems(args.pairwise_rows)
+
+    pairwise_pairs = measure("pairwise (before)", args.pairwise_rows, lambda: find_pairwise_duplicates(problems_df['description']))
+    cluster_ids = measure("MinHash/LSH (after)", args.pairwise_rows, lambda: find_duplicate_clusters(problems_df['description']))
+
+    minhash_pairs = get_cluster_pairs(cluster_ids)
+    recall = len(pairwise_pairs & minhash_pairs) / max(len(pairwise_pairs), 1)
+    precision = len(pairwise_pairs & minhash_pairs) / max(len(minhash_pairs), 1)
+    print(f"{len(pairwise_pairs)} pairwise duplicate pairs, {len(minhash_pairs)} MinHash/LSH pairs, "
+          f"recall {recall:.3f}, precision {precision:.3f}")
+
+    print("=== MinHash/LSH scaling")
+
+    for rows_count in sorted({args.rows // 8, args.rows // 4, args.rows // 2, args.rows}):
+        problems_df, originals = make_problems(rows_count)
+        cluster_ids = measure("MinHash/LSH", rows_count, lambda: find_duplicate_clusters(problems_df['description']))
+
+        found_count = sum(cluster_ids[copy] == cluster_ids[original] for copy, original in originals.items())
+        print(f"{'':<28} found {found_count} of {len(originals)} copies, "
+              f"{len(problems_df) - len(np.unique(cluster_ids))} problems would be removed")
+
+
+if __name__ == '__main__':
+    main()
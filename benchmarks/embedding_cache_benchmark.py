@@ -0,0 +1,84 @@
+#
+# Compares classifying problems without the embedding cache, with a cold cache and with a warm one,
+# when most problems were classified before. Checks that cached and uncached probabilities are the same,
+# that the cache keeps at most its max entries and that it is cleared when the model changes.
+#
+# Usage: python -m benchmarks.embedding_cache_benchmark [--rows N] [--repeats N]
+#
+# A small randomly initialized BERT is used (or --model/--mlb), so the benchmark runs offline.
+#
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_skewed_texts
+from benchmarks.synthetic_model import make_model_dir
+from classifier.predict import Predictor
+
+# float16 embeddings change probabilities by less than this
+MAX_PROBABILITY_DIFF = 1e-2
+
+
+def measure(predictor, texts):
+    start = time.perf_counter()
+    probabilities = predictor.predict_proba(texts)
+
+    return probabilities, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=512)
+    parser.add_argument('--repeats', type=int, default=3, help="every problem is classified this many times")
+    parser.add_argument('--model', default=None)
+    parser.add_argument('--mlb', default=None)
+    args = parser.parse_args()
+
+    unique_texts = make_skewed_texts(args.rows)
+    # re-scraped copies differ only in whitespace
+    texts = [text if repeat % 2 == 0 else f"  {text}\n" for repeat in range(args.repeats) for text in unique_texts]
+    print(f"=== {len(texts)} problems, {len(unique_texts)} unique")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.model is None:
+            args.model, args.mlb = make_model_dir(tmp_dir)
+
+        cache_dir = f"{tmp_dir}/embedding_cache"
+
+        expected_probabilities, elapsed = measure(Predictor(args.model, mlb_filepath=args.mlb), texts)
+        print(f"{'no cache (before)':<24} {len(texts) / elapsed:8.1f} problems/sec")
+
+        predictor = Predictor(args.model, mlb_filepath=args.mlb, cache_dir=cache_dir)
+        probabilities, elapsed = measure(predictor, texts)
+        print(f"{'cold cache':<24} {len(texts) / elapsed:8.1f} problems/sec, {len(predictor.embedding_cache)} entries")
+
+        # a new process reuses the cache saved on disk
+        predictor = Predictor(args.model, mlb_filepath=args.mlb, cache_dir=cache_dir)
+        warm_probabilities, elapsed = measure(predictor, texts)
+        print(f"{'warm cache (after)':<24} {len(texts) / elapsed:8.1f} problems/sec, hits {predictor.embedding_cache.hits_count}, "
+              f"misses {predictor.embedding_cache.misses_count}")
+
+        max_diff = max(np.abs(probabilities - expected_probabilities).max(), np.abs(warm_probabilities - probabilities).max())
+        assert max_diff < MAX_PROBABILITY_DIFF, f"cached probabilities differ by {max_diff}"
+        print(f"cached probabilities are the same (max diff {max_diff:.1e})")
+
+        max_entries = args.rows // 4
+        predictor = Predictor(args.model, mlb_filepath=args.mlb, cache_dir=f"{tmp_dir}/bounded_cache", cache_max_entries=max_entries)
+        bounded_probabilities, _ = measure(predictor, texts)
+        assert len(predictor.embedding_cache) == max_entries
+        assert np.abs(bounded_probabilities - probabilities).max() == 0
+        print(f"cache of {max_entries} entries keeps {len(predictor.embedding_cache)} most recent texts")
+
+        # a retrained model is saved over the old one
+        os.utime(f"{args.model}/config.json")
+        predictor = Predictor(args.model, mlb_filepath=args.mlb, cache_dir=cache_dir)
+        assert len(predictor.embedding_cache) == 0
+        print("cache is cleared when the model changes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+#
+# Compares the old row-wise `df.apply` formatting with the column-wise one.
+#
+# Usage: python -m benchmarks.format_benchmark [--rows N]
+#
+# Real datasets from data_manager/dataset/huggingface are used when they are downloaded,
+# otherwise synthetic datasets with N rows are generated. The row-wise formatter reads
+# a CSV export of the dataset and parses labels with `ast.literal_eval`, as it did before.
+# Formatted datasets are cached in a temporary directory, so dataset/cache is left untouched.
+#
+
+import argparse
+import ast
+import os
+import tempfile
+import time
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from benchmarks.synthetic import make_codeforces_df, make_leetcode_df
+from data_manager import cache
+from data_manager.format import (
+    OpenR1CodeforcesFormatter, KaysssLeetcodeFormatter, MAX_LABELS_COUNT, MAX_PROBLEM_DESCRIPTION_LENGTH
+)
+from data_manager.utils import convert_codeforces_labels, convert_leetcode_labels, masks_to_labels, read_dataset, write_dataset
+
+DATASET_DIR = f"{os.path.dirname(os.path.dirname(os.path.abspath(__file__)))}/data_manager/dataset"
+
+
+# === Row-wise formatting, as it was done before the column-wise formatter ===
+
+def _legacy_codeforces_row(row):
+    labels = convert_codeforces_labels(row['labels'])
+
+    if len(labels) == 0 or len(labels) > MAX_LABELS_COUNT:
+        return None
+
+    if pd.isna(row['description']):
+        return None
+
+    description = row['description'].replace('\n', ' ')
+
+    for field in ['input_format', 'output_format', 'interaction_format', 'note']:
+        if not pd.isna(row[field]):
+            text = row[field].replace('\n', ' ')
+            description += f"\n{field} = {text}"
+
+    if len(description) > MAX_PROBLEM_DESCRIPTION_LENGTH:
+        return None
+
+    return pd.Series({'source': 'codeforces', 'title': row['title'], 'description': description, 'labels': labels})
+
+
+def _legacy_leetcode_row(row):
+    labels = convert_leetcode_labels(row['labels'])
+
+    if len(labels) == 0 or len(labels) > MAX_LABELS_COUNT:
+        return None
+
+    if pd.isna(row['description']):
+        return None
+
+    raw_description = row['description'].replace('\n', ' ')
+    description = " ".join(BeautifulSoup(raw_description, "html.parser").get_text().split())
+
+    if not description or len(description) > MAX_PROBLEM_DESCRIPTION_LENGTH:
+        return None
+
+    return pd.Series({'source': 'leetcode', 'title': row['title'], 'description': description, 'labels': labels})
+
+
+def legacy_format(dataset_filepath, format_row):
+    loaded_df = pd.read_csv(dataset_filepath)
+    loaded_df['labels'] = loaded_df['labels'].apply(ast.literal_eval)
+
+    loaded_df = loaded_df.apply(format_row, axis=1)
+
+    return loaded_df.dropna()
+
+
+# === Benchmark ===
+
+def _to_csv(formatted_df):
+    # old formatter returns labels in `set` order, which depends on PYTHONHASHSEED,
+    # and doesn't have label bitmasks
+    formatted_df = formatted_df[['source', 'title', 'description', 'labels']]
+    formatted_df = formatted_df.assign(labels=formatted_df['labels'].apply(sorted))
+
+    return formatted_df.to_csv(index=False)
+
+
+def _measure(name, rows_count, function):
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+
+    print(f"{name:<40} {elapsed:8.3f}s {rows_count / elapsed:12.0f} rows/sec")
+
+    return result
+
+
+def benchmark(formatter, legacy_format_row, tmp_dir):
+    loaded_df = read_dataset(formatter.dataset_filepath)
+    rows_count = len(loaded_df)
+    print(f"=== {formatter.source} ({rows_count} rows)")
+
+    csv_filepath = f"{tmp_dir}/{formatter.source}.csv"
+    loaded_df.to_csv(csv_filepath, index=False)
+
+    before = _measure("row-wise (before)", rows_count,
+                      lambda: legacy_format(csv_filepath, legacy_format_row))
+    after = _measure("column-wise (after)", rows_count, lambda: formatter.format(use_cache=False))
+
+    formatter.format()  # fills the cache
+    cached = _measure("cached, unchanged source", rows_count, formatter.format)
+
+    assert _to_csv(before) == _to_csv(after), f"{formatter.source}: formatted datasets differ"
+    assert _to_csv(after) == _to_csv(cached), f"{formatter.source}: cached dataset differs"
+    assert (masks_to_labels(after['label_mask'].to_numpy(), index=after.index) == after['labels']).all(), \
+        f"{formatter.source}: label bitmasks differ from labels"
+    print("formatted datasets are identical")
+
+
+def _remove_empty_dirs(root_dir):
+    for dirpath, _, _ in sorted(os.walk(root_dir), reverse=True):
+        if not os.listdir(dirpath):
+            os.rmdir(dirpath)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20000)
+    args = parser.parse_args()
+
+    # formatters create dataset directories of their sources, they are removed when left empty
+    had_dataset_dir = os.path.exists(DATASET_DIR)
+    codeforces_formatter = OpenR1CodeforcesFormatter()
+    leetcode_formatter = KaysssLeetcodeFormatter()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache.cache_dir = f"{tmp_dir}/cache"
+
+        if not os.path.exists(codeforces_formatter.dataset_filepath):
+            codeforces_formatter.dataset_filepath = f"{tmp_dir}/codeforces.parquet"
+            write_dataset(make_codeforces_df(args.rows), codeforces_formatter.dataset_filepath)
+
+        if not os.path.exists(leetcode_formatter.dataset_filepath):
+            leetcode_formatter.dataset_filepath = f"{tmp_dir}/leetcode.parquet"
+            write_dataset(make_leetcode_df(args.rows), leetcode_formatter.dataset_filepath)
+
+        benchmark(codeforces_formatter, _legacy_codeforces_row, tmp_dir)
+        benchmark(leetcode_formatter, _legacy_leetcode_row, tmp_dir)
+
+    cache.cache_dir = None
+
+    if not had_dataset_dir:
+        _remove_empty_dirs(DATASET_DIR)
+
+
+if __name__ == '__main__':
+    main()
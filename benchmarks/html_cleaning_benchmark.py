@@ -0,0 +1,92 @@
+#
+# Compares BeautifulSoup and streaming HTML cleaning, serial and in a process pool,
+# and checks that the fast streaming cleaner returns the same text as BeautifulSoup.
+#
+# Usage: python -m benchmarks.html_cleaning_benchmark [--rows N] [--workers W] [--chunk-size C]
+#
+# The real LeetCode dataset is used when it is downloaded, otherwise a synthetic one with N rows.
+#
+
+import argparse
+import os
+import time
+
+from benchmarks.synthetic import make_leetcode_df
+from data_manager.html_cleaner import clean_html, clean_html_column, HTML_CLEANING_CHUNK_SIZE
+from data_manager.utils import get_dataset_filepath, read_dataset
+
+# markup which appears in LeetCode descriptions and is easy to get wrong
+EDGE_CASES = [
+    '<p>Given <code>nums</code>, return&nbsp;<em>the answer</em>.</p>',
+    '<p>1 &lt;= n &lt;= 10<sup>5</sup> &amp;&amp; x &gt; 0</p>',
+    '<pre><strong>Input:</strong> s = "a b"\n<strong>Output:</strong> 2</pre>',
+    '<ul>\n\t<li>first</li>\n\t<li>second&#39;s</li>\n</ul>',
+    '<p>unclosed <b>tags <i>here</p><img src="x.png" alt="ignored" />',
+    '<!-- comment --><p>text</p><script>var x = "<p>";</script><style>p {}</style>',
+    '<p>&#8804; &#x2264; &le; &hellip; &nbsp&notanentity;</p>',
+    '<div class="example-block"><p><strong>Input:</strong> [1,2]</p></div>',
+    '',
+]
+
+
+def _measure(name, rows_count, function):
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+
+    print(f"{name:<40} {elapsed:8.3f}s {rows_count / elapsed:12.0f} rows/sec")
+
+    return result
+
+
+def check_parity(raw_descriptions):
+    mismatches = 0
+
+    for raw_description in list(raw_descriptions) + EDGE_CASES:
+        expected = clean_html(raw_description)
+        actual = clean_html(raw_description, fast=True)
+
+        if expected != actual:
+            mismatches += 1
+            print(f"MISMATCH:\n  html: {raw_description[:200]!r}\n  bs4:  {expected[:200]!r}\n  fast: {actual[:200]!r}")
+
+    assert mismatches == 0, f"{mismatches} descriptions are cleaned differently"
+    print(f"fast cleaner matches BeautifulSoup on {len(raw_descriptions) + len(EDGE_CASES)} descriptions")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=HTML_CLEANING_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    dataset_filepath = get_dataset_filepath("huggingface/kaysss_leetcode-problem-detailed.parquet")
+
+    if os.path.exists(dataset_filepath):
+        loaded_df = read_dataset(dataset_filepath)
+    else:
+        loaded_df = make_leetcode_df(args.rows)
+
+    raw_descriptions = loaded_df['description'].str.replace('\n', ' ').dropna()
+    rows_count = len(raw_descriptions)
+    print(f"=== leetcode ({rows_count} descriptions, {args.workers or os.cpu_count()} workers)")
+
+    check_parity(raw_descriptions)
+
+    results = [
+        _measure("BeautifulSoup, serial (before)", rows_count,
+                 lambda: clean_html_column(raw_descriptions, workers=1)),
+        _measure("BeautifulSoup, process pool", rows_count,
+                 lambda: clean_html_column(raw_descriptions, args.workers, args.chunk_size)),
+        _measure("streaming, serial", rows_count,
+                 lambda: clean_html_column(raw_descriptions, workers=1, fast=True)),
+        _measure("streaming, process pool", rows_count,
+                 lambda: clean_html_column(raw_descriptions, args.workers, args.chunk_size, fast=True)),
+    ]
+
+    assert all(result.equals(results[0]) for result in results), "cleaned columns differ"
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#
+# Compares converting source tags into standard labels row by row (dict lookups and a set per problem)
+# with the compiled label table (a vectorized OR-reduce into label bitmasks of the whole column),
+# and checks that both give the same labels. Some tags are unknown, they are counted instead of failing.
+#
+# Usage: python -m benchmarks.labels_benchmark [--rows N]
+#
+
+import argparse
+import random
+import time
+from collections import Counter
+
+import pandas as pd
+
+from data_manager.problem_types import codeforces_to_standard
+from data_manager.utils import CODEFORCES_LABEL_TABLE, convert_codeforces_labels, convert_labels_to_masks, masks_to_labels
+
+UNKNOWN_TAGS = ['unknown tag', 'another unknown tag']
+UNKNOWN_TAG_PROBABILITY = 0.01
+
+
+def make_tags(rows_count, seed=0):
+    rng = random.Random(seed)
+    tags = list(codeforces_to_standard)
+
+    return pd.Series([
+        rng.sample(tags, rng.randint(0, 5)) + ([rng.choice(UNKNOWN_TAGS)] if rng.random() < UNKNOWN_TAG_PROBABILITY else [])
+        for _ in range(rows_count)
+    ])
+
+
+def measure(name, rows_count, function):
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+
+    print(f"{name:<36} {elapsed:8.3f}s {rows_count / elapsed:12.0f} rows/sec")
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+
+    tags = make_tags(args.rows)
+    print(f"=== {args.rows} problems")
+
+    before = measure("row-wise (before)", args.rows, lambda: [sorted(convert_codeforces_labels(row)) for row in tags])
+
+    unknown_tags = Counter()
+    masks = measure("label bitmasks (after)", args.rows, lambda: convert_labels_to_masks(tags, CODEFORCES_LABEL_TABLE, unknown_tags))
+    after = measure("label bitmasks and lists of labels", args.rows, lambda: masks_to_labels(convert_labels_to_masks(tags, CODEFORCES_LABEL_TABLE)))
+
+    assert before == [sorted(labels) for labels in after], "converted labels differ"
+    assert masks_to_labels(masks).tolist() == after.tolist()
+    print(f"converted labels are the same, unknown tags: {dict(unknown_tags)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#
+# Measures peak memory of DatasetLoader.download in default and streaming modes
+# on synthetic local datasets of growing size, shaped like open-r1/codeforces.
+#
+# Usage: python -m benchmarks.loader_memory_benchmark [--shard-rows N] [--shards 1 2 4 8]
+#
+
+import argparse
+import os
+import resource
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from benchmarks.synthetic import make_codeforces_df, make_text_of_size
+
+
+def make_dataset(dataset_dir, shard_rows, shards_count):
+    shard_df = make_codeforces_df(shard_rows).rename(columns={
+        'labels': 'tags',
+        'time_limit_per_test': 'time_limit',
+        'memory_limit_per_test': 'memory_limit',
+    })
+    shard_df['examples'] = [[{'input': '1 2', 'output': '3'}] for _ in range(shard_rows)]
+
+    # heavy columns which are not used by the loader
+    shard_df['editorial'] = [make_text_of_size(i, 4000) for i in range(shard_rows)]
+    shard_df['generated_checker'] = [make_text_of_size(i, 2000) for i in range(shard_rows)]
+
+    os.makedirs(f"{dataset_dir}/data", exist_ok=True)
+
+    for shard in range(shards_count):
+        shard_df['id'] = [f"{shard}-{i}" for i in range(shard_rows)]
+        shard_df.to_parquet(f"{dataset_dir}/data/train-{shard:05d}.parquet", index=False)
+
+
+def _build_arrow_cache(dataset_dir):
+    from datasets import load_dataset
+
+    load_dataset(dataset_dir)
+
+
+def _download(dataset_dir, output_filepath, streaming):
+    # runs in a fresh process, so ru_maxrss is the peak of this download only
+    from data_manager.load import OpenR1CodeforcesLoader
+
+    loader = OpenR1CodeforcesLoader()
+    loader.dataset_name = dataset_dir
+    loader.dataset_filepath = output_filepath
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    loader.download(force=True, streaming=streaming)
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return (rss_after - rss_before) / 1024
+
+
+def _run(function, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(function, *args).result()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--shard-rows', type=int, default=5000)
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["HF_DATASETS_CACHE"] = f"{tmp_dir}/hf_cache"
+
+        print(f"{'rows':>10} {'default, MB':>14} {'streaming, MB':>14}")
+
+        for shards_count in args.shards:
+            dataset_dir = f"{tmp_dir}/dataset-{shards_count}"
+            make_dataset(dataset_dir, args.shard_rows, shards_count)
+            _run(_build_arrow_cache, dataset_dir)
+
+            default_peak = _run(_download, dataset_dir, f"{tmp_dir}/default-{shards_count}.parquet", False)
+            streaming_peak = _run(_download, dataset_dir, f"{tmp_dir}/streaming-{shards_count}.parquet", True)
+
+            print(f"{args.shard_rows * shards_count:>10} {default_peak:>14.1f} {streaming_peak:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#
+# Parses SPOJ pages with every parser backend, checks that all backends produce the same
+# problems as html5lib, and reports parsed pages/sec. Runs offline.
+#
+# Usage: python -m benchmarks.parser_benchmark [--problems N] [--parsers lxml html.parser]
+#
+# Pages from the scrapper's HTTP cache are used when it exists, otherwise generated stub pages.
+#
+
+import argparse
+import os
+import sqlite3
+import time
+import zlib
+
+from benchmarks.spoj_stub import make_problem_page, make_problems_page, PROBLEMS_PER_PAGE
+from data_manager.spoj_scrapper import scrapper
+from data_manager.spoj_scrapper.scrapper_types import ProblemPreview
+
+REFERENCE_PARSER = 'html5lib'
+
+
+def load_cached_pages():
+    connection = sqlite3.connect(scrapper.HTTP_CACHE_FILE)
+    problems_pages, problem_pages = [], []
+
+    for url, body in connection.execute('SELECT url, body FROM responses ORDER BY url'):
+        text = zlib.decompress(body).decode()
+
+        if '/problems/classical/' in url:
+            problems_pages.append(text)
+        else:
+            problem_pages.append((text, ProblemPreview(url=url)))
+
+    connection.close()
+
+    return problems_pages, problem_pages
+
+
+def generate_pages(problems_count):
+    pages_count = (problems_count + PROBLEMS_PER_PAGE - 1) // PROBLEMS_PER_PAGE
+    problems_pages = [make_problems_page(scrapper.BASE_URL, i, problems_count) for i in range(pages_count)]
+    problem_pages = [(make_problem_page(i), ProblemPreview(url=str(i))) for i in range(problems_count)]
+
+    return problems_pages, problem_pages
+
+
+def parse_all(parser, problems_pages, problem_pages):
+    spoj_scrapper = scrapper.Scrapper.__new__(scrapper.Scrapper)
+    spoj_scrapper.parser = parser
+
+    start = time.perf_counter()
+
+    problems_preview = [spoj_scrapper.parse_problems_preview_page(html) for html in problems_pages]
+    problems = [spoj_scrapper.parse_problem_page(html, preview) for html, preview in problem_pages]
+
+    return problems_preview, problems, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--problems', type=int, default=500)
+    parser.add_argument('--parsers', nargs='+', default=[scrapper.PARSER])
+    args = parser.parse_args()
+
+    if os.path.exists(scrapper.HTTP_CACHE_FILE):
+        problems_pages, problem_pages = load_cached_pages()
+        print("=== pages from the scrapper's HTTP cache")
+    else:
+        problems_pages, problem_pages = generate_pages(args.problems)
+        print("=== generated stub pages")
+
+    pages_count = len(problems_pages) + len(problem_pages)
+    reference = None
+    mismatches = 0
+
+    for parser_name in [REFERENCE_PARSER] + [p for p in args.parsers if p != REFERENCE_PARSER]:
+        problems_preview, problems, elapsed = parse_all(parser_name, problems_pages, problem_pages)
+        print(f"{parser_name:<12} {elapsed:8.2f}s {pages_count / elapsed:10.1f} pages/sec ({pages_count} pages)")
+
+        if reference is None:
+            reference = (problems_preview, problems)
+            continue
+
+        for expected, actual in zip(reference[0] + reference[1], problems_preview + problems):
+            if expected != actual:
+                mismatches += 1
+                print(f"MISMATCH ({parser_name}):\n  {REFERENCE_PARSER}: {expected}\n  {parser_name}: {actual}")
+
+    assert mismatches == 0, f"{mismatches} pages are parsed differently"
+    print(f"all parsers produce the same problems as {REFERENCE_PARSER}")
+
+
+if __name__ == '__main__':
+    main()
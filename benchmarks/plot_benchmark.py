@@ -0,0 +1,104 @@
+#
+# Compares computing statistics of figures the way plot.py did (exploding and filtering the dataset
+# again for every source of every figure) with the single vectorized pass into DatasetStats, checks
+# that both give the same statistics, and compares rendering figures in one process and in a pool.
+#
+# Usage: python -m benchmarks.plot_benchmark [--rows N]
+#
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from dataclasses import asdict
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_skewed_texts
+from data_manager.plot import TOTAL, DatasetStats, compute_stats, render_figures
+from data_manager.utils import PROBLEM_LABELS
+
+SOURCES = ['codeforces', 'leetcode', 'spoj']
+
+
+def make_problems_df(rows_count, seed=0):
+    rng = random.Random(seed)
+    labels = [sorted(rng.sample(PROBLEM_LABELS, rng.randint(0, 4))) for _ in range(rows_count)]
+    masks = [sum(1 << PROBLEM_LABELS.index(label) for label in row_labels) for row_labels in labels]
+
+    return pd.DataFrame({
+        'source': [rng.choice(SOURCES) for _ in range(rows_count)],
+        'title': "",
+        'description': make_skewed_texts(rows_count, seed=seed),
+        'labels': labels,
+        'label_mask': np.array(masks, dtype=np.uint64),
+    })
+
+
+def compute_stats_per_figure(df):
+    # statistics of every figure, computed like plot.py did before
+    df = df.copy()
+    df["description_length"] = df["description"].astype(str).str.len()
+    df["label_count"] = df["labels"].str.len()
+    sources = df["source"].unique()
+    exploded_df = df.explode("labels")
+
+    label_counts, labels_count_counts, lengths = {}, {}, {}
+
+    for source in list(sources) + [None]:
+        source_df = df if source is None else df[df["source"] == source]
+        source_exploded_df = exploded_df if source is None else exploded_df[exploded_df["source"] == source]
+        key = TOTAL if source is None else source
+
+        label_counts[key] = source_exploded_df["labels"].value_counts().to_dict()
+        labels_count_counts[key] = source_df["label_count"].value_counts().sort_index().to_dict()
+        lengths[key] = np.histogram(source_df["description_length"], bins='auto')
+
+    return df['source'].value_counts().to_dict(), label_counts, labels_count_counts, lengths
+
+
+def check_stats(stats: DatasetStats, per_figure_stats):
+    problems_counts, label_counts, labels_count_counts, lengths = per_figure_stats
+
+    assert stats.problems_counts == problems_counts, "problems counts differ"
+
+    for key in stats.sources + [TOTAL]:
+        assert stats.label_counts[key] == label_counts[key], f"label counts of {key} differ"
+        assert {i: count for i, count in enumerate(stats.labels_count_counts[key]) if count > 0} == labels_count_counts[key]
+        assert stats.description_length_histograms[key]['counts'] == lengths[key][0].tolist()
+        assert np.allclose(stats.description_length_histograms[key]['edges'], lengths[key][1])
+
+
+def measure(name, function):
+    start = time.perf_counter()
+    result = function()
+    print(f"{name:<40} {time.perf_counter() - start:8.3f}s")
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+
+    problems_df = make_problems_df(args.rows)
+    print(f"=== {args.rows} problems of {len(SOURCES)} sources")
+
+    per_figure_stats = measure("statistics per figure (before)", lambda: compute_stats_per_figure(problems_df))
+    stats = measure("single pass statistics (after)", lambda: compute_stats(problems_df))
+
+    check_stats(stats, per_figure_stats)
+    cached_stats = DatasetStats(**json.loads(json.dumps(asdict(stats))))
+    assert cached_stats == stats, "statistics change after a JSON round trip"
+    print(f"statistics are the same, {len(json.dumps(asdict(stats)))} bytes of JSON")
+
+    with tempfile.TemporaryDirectory() as figures_dir:
+        measure("render figures in one process", lambda: render_figures(stats, figures_dir, workers=1))
+        measure("render figures in a process pool", lambda: render_figures(stats, figures_dir))
+
+
+if __name__ == '__main__':
+    main()
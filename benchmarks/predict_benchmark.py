@@ -0,0 +1,71 @@
+#
+# Compares classifying problems one at a time, padded to the max length (as the training
+# dataset did), with the batched Predictor, and checks that both give the same probabilities.
+#
+# Usage: python -m benchmarks.predict_benchmark [--rows N] [--batch-size N] [--model DIR --mlb FILE]
+#
+# Without --model a small randomly initialized BERT is used, so the benchmark runs offline.
+#
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import torch
+from transformers import AutoModelForSequenceClassification
+
+from benchmarks.synthetic import make_skewed_texts
+from benchmarks.synthetic_model import make_model_dir
+from classifier.predict import INFERENCE_BATCH_SIZE, Predictor
+from classifier.tokenization import MAX_LENGTH
+
+
+def predict_one_by_one(model, tokenizer, texts):
+    probabilities = []
+
+    with torch.no_grad():
+        for text in texts:
+            encoding = tokenizer(text, truncation=True, padding="max_length", max_length=MAX_LENGTH, return_tensors='pt')
+            logits = model(**encoding).logits
+            probabilities.append(torch.sigmoid(logits)[0].numpy())
+
+    return np.array(probabilities)
+
+
+def run(name, predict_function, texts):
+    start = time.perf_counter()
+    probabilities = predict_function(texts)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<36} {elapsed:8.2f}s {len(texts) / elapsed:10.1f} problems/sec")
+
+    return probabilities
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=256)
+    parser.add_argument('--batch-size', type=int, default=INFERENCE_BATCH_SIZE)
+    parser.add_argument('--model', default=None)
+    parser.add_argument('--mlb', default=None)
+    args = parser.parse_args()
+
+    texts = make_skewed_texts(args.rows)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.model is None:
+            args.model, args.mlb = make_model_dir(tmp_dir)
+
+        predictor = Predictor(args.model, mlb_filepath=args.mlb, batch_size=args.batch_size)
+        model = AutoModelForSequenceClassification.from_pretrained(args.model).eval()
+        print(f"=== {len(texts)} problems, batch size {args.batch_size}")
+
+        expected = run("one by one, max length (before)", lambda t: predict_one_by_one(model, predictor.tokenizer, t), texts)
+        actual = run("sorted micro-batches (after)", predictor.predict_proba, texts)
+
+    assert np.allclose(expected, actual, atol=1e-4), f"max probability difference {np.abs(expected - actual).max()}"
+    print("both give the same probabilities")
+
+
+if __name__ == '__main__':
+    main()
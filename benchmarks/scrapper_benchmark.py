@@ -0,0 +1,135 @@
+#
+# Runs the SPOJ scrapper against a local stub server with different concurrency levels,
+# and checks that all of them scrape the same problems, also when scrapping is interrupted
+# and resumed from the progress journal. Then re-crawls with conditional requests
+# and checks that only changed problems are updated.
+#
+# Usage: python -m benchmarks.scrapper_benchmark [--problems N] [--latency S] [--concurrency 1 8]
+#
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+from benchmarks.spoj_stub import SpojStubServer, problem_code
+from data_manager.spoj_scrapper import scrapper
+
+
+@contextmanager
+def stubbed_scrapper(server, output_dir):
+    # scrapper reads its urls and files from module constants
+    with mock.patch.multiple(
+        scrapper,
+        BASE_URL=server.base_url,
+        PAGE_URL=f"{server.base_url}/problems/classical",
+        SPOJ_PAGES_COUNT=server.pages_count,
+        PROBLEMS_PREVIEW_FILE=f"{output_dir}/problems_preview.json",
+        PROBLEMS_FILE=f"{output_dir}/problems.json",
+        PROGRESS_JOURNAL_FILE=f"{output_dir}/progress.jsonl",
+        HTTP_CACHE_FILE=f"{output_dir}/http_cache.sqlite",
+        DATASET_FILE=f"{output_dir}/spoj.json",
+        RETRY_BACKOFF=0.01,
+    ):
+        yield
+
+
+def scrape(server, concurrency, requests_per_second):
+    with tempfile.TemporaryDirectory() as output_dir, stubbed_scrapper(server, output_dir):
+        start = time.perf_counter()
+        scrapper.Scrapper(concurrency=concurrency, requests_per_second=requests_per_second).start()
+        elapsed = time.perf_counter() - start
+
+        with open(f"{output_dir}/spoj.json") as f:
+            return json.load(f), elapsed
+
+
+def scrape_with_interruption(server, concurrency, requests_per_second):
+    interrupted_at = server.problems_count // 2
+    server.missing_once_paths.add(f"/problems/{problem_code(interrupted_at)}")
+
+    with tempfile.TemporaryDirectory() as output_dir, stubbed_scrapper(server, output_dir):
+        try:
+            scrapper.Scrapper(concurrency=concurrency, requests_per_second=requests_per_second).start()
+        except scrapper.ScrapperError:
+            pass
+        else:
+            raise AssertionError("scrapping is not interrupted")
+
+        journal_size = os.path.getsize(f"{output_dir}/progress.jsonl")
+        scrapper.Scrapper(concurrency=concurrency, requests_per_second=requests_per_second).start()
+
+        with open(f"{output_dir}/spoj.json") as f:
+            return json.load(f), journal_size
+
+
+def scrape_and_refresh(server, concurrency, requests_per_second, changed_problems_count):
+    with tempfile.TemporaryDirectory() as output_dir, stubbed_scrapper(server, output_dir):
+        scrapper.Scrapper(concurrency=concurrency, requests_per_second=requests_per_second).start()
+
+        with open(f"{output_dir}/spoj.json") as f:
+            problems_before = json.load(f)
+
+        changed_problems = range(0, server.problems_count, server.problems_count // changed_problems_count)
+        server.revisions.update(changed_problems)
+        server.status_counts.clear()
+
+        start = time.perf_counter()
+        scrapper.Scrapper(concurrency=concurrency, requests_per_second=requests_per_second).start(
+            refresh_older_than_days=0
+        )
+        elapsed = time.perf_counter() - start
+
+        with open(f"{output_dir}/spoj.json") as f:
+            problems_after = json.load(f)
+
+    updated_problems = [i for i, (a, b) in enumerate(zip(problems_before, problems_after)) if a != b]
+    assert updated_problems == list(changed_problems), "refresh must update exactly the changed problems"
+
+    return elapsed, dict(server.status_counts)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--problems', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--fail-every', type=int, default=25)
+    parser.add_argument('--requests-per-second', type=float, default=200)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    args = parser.parse_args()
+
+    results = []
+
+    with SpojStubServer(args.problems, args.latency, args.fail_every) as server, open(os.devnull, 'w') as devnull:
+        for concurrency in args.concurrency:
+            requests_before = server.requests_count
+
+            with mock.patch('sys.stdout', devnull):
+                problems, elapsed = scrape(server, concurrency, args.requests_per_second)
+
+            requests_count = server.requests_count - requests_before
+            results.append(problems)
+            print(f"concurrency {concurrency:>3}: {elapsed:8.2f}s {requests_count / elapsed:8.1f} requests/sec "
+                  f"({requests_count} requests, {len(problems)} problems)")
+
+        with mock.patch('sys.stdout', devnull):
+            problems, journal_size = scrape_with_interruption(server, args.concurrency[-1], args.requests_per_second)
+
+        results.append(problems)
+        print(f"interrupted and resumed: journal had {journal_size} bytes when interrupted")
+
+        with mock.patch('sys.stdout', devnull):
+            elapsed, status_counts = scrape_and_refresh(server, args.concurrency[-1], args.requests_per_second, 5)
+
+        print(f"refresh with 5 changed problems: {elapsed:.2f}s, responses by status: {status_counts}")
+
+    assert all(problems == results[0] for problems in results), "scraped problems differ"
+    assert len(results[0]) == args.problems, "not all problems are scraped"
+    print("scraped problems are identical")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#
+# Sends bursts of concurrent single-problem requests to the classification service and reports
+# throughput, latency percentiles and batch sizes, with micro-batching and without it (batches of 1).
+# Labels returned by the service are checked against the Predictor.
+#
+# Usage: python -m benchmarks.service_load_test [--requests N] [--concurrency N] [--max-wait-ms N] [--url http://127.0.0.1:8080]
+#
+# Without --url the service is started in this process with a small randomly initialized BERT
+# (or --model/--mlb), so the load test runs offline.
+#
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+import aiohttp
+import numpy as np
+from aiohttp import web
+
+from benchmarks.synthetic import make_skewed_texts
+from benchmarks.synthetic_model import make_model_dir
+from classifier.predict import INFERENCE_BATCH_SIZE, Predictor
+from classifier.service import MAX_WAIT_MS, MicroBatcher, make_app
+
+
+async def send_requests(url, texts, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = [0.0] * len(texts)
+    labels = [None] * len(texts)
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        async def send(idx):
+            async with semaphore:
+                start = time.perf_counter()
+
+                async with session.post(f"{url}/classify", json={'description': texts[idx]}) as response:
+                    response.raise_for_status()
+                    labels[idx] = (await response.json())['labels']
+
+                latencies[idx] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send(idx) for idx in range(len(texts))))
+        elapsed = time.perf_counter() - start
+
+        async with session.get(f"{url}/stats") as response:
+            stats = await response.json()
+
+    return labels, np.array(latencies) * 1000, elapsed, stats
+
+
+def report(name, latencies_ms, elapsed, stats):
+    requests_count = len(latencies_ms)
+    print(
+        f"{name:<28} {requests_count / elapsed:8.1f} requests/sec, "
+        f"client latency p50 {np.percentile(latencies_ms, 50):7.1f}ms p99 {np.percentile(latencies_ms, 99):7.1f}ms, "
+        f"server p50 {stats['latency_ms']['p50']:7.1f}ms p99 {stats['latency_ms']['p99']:7.1f}ms"
+    )
+    print(f"{'':<28} batch sizes: {stats['batch_sizes']}")
+
+
+async def run_local_service(predictor, max_batch_size, max_wait, texts, concurrency):
+    app = make_app(MicroBatcher(predictor, max_batch_size=max_batch_size, max_wait=max_wait))
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+
+    port = site._server.sockets[0].getsockname()[1]
+
+    try:
+        return await send_requests(f"http://127.0.0.1:{port}", texts, concurrency)
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=512)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--max-batch-size', type=int, default=INFERENCE_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS)
+    parser.add_argument('--url', default=None, help="URL of a running service")
+    parser.add_argument('--model', default=None)
+    parser.add_argument('--mlb', default=None)
+    args = parser.parse_args()
+
+    texts = make_skewed_texts(args.requests)
+    print(f"=== {len(texts)} requests, {args.concurrency} concurrent")
+
+    if args.url is not None:
+        _, latencies_ms, elapsed, stats = asyncio.run(send_requests(args.url, texts, args.concurrency))
+        report("service", latencies_ms, elapsed, stats)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.model is None:
+            args.model, args.mlb = make_model_dir(tmp_dir)
+
+        predictor = Predictor(args.model, mlb_filepath=args.mlb, batch_size=args.max_batch_size)
+        expected_labels = predictor.predict(texts)
+
+        for name, max_batch_size in [("one at a time (before)", 1), ("micro-batched (after)", args.max_batch_size)]:
+            labels, latencies_ms, elapsed, stats = asyncio.run(
+                run_local_service(predictor, max_batch_size, args.max_wait_ms / 1000, texts, args.concurrency)
+            )
+            report(name, latencies_ms, elapsed, stats)
+
+            assert labels == expected_labels, f"{name} service returns different labels than the Predictor"
+
+    print("service returns the same labels as the Predictor")
+
+
+if __name__ == '__main__':
+    main()
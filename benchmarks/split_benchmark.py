@@ -0,0 +1,125 @@
+#
+# Compares the vectorized iterative-stratified split with the classic one, which assigns
+# problems one by one, and with a random split. Reports time and how far the validation
+# share of every label is from the desired one.
+#
+# Usage: python -m benchmarks.split_benchmark [--rows N]
+#
+# Labels of data_manager/dataset/problems.parquet are used when it exists, otherwise synthetic
+# labels with a skewed frequency of every label.
+#
+
+import argparse
+import os
+import time
+
+import numpy as np
+from sklearn.preprocessing import MultiLabelBinarizer
+
+from data_manager.preprocess import VAL_SIZE, SPLIT_SEED, iterative_stratified_split
+from data_manager.utils import PROBLEM_LABELS, get_dataset_filepath, read_dataset
+
+
+def load_labels(rows_count):
+    problems_filepath = get_dataset_filepath('problems.parquet')
+
+    if os.path.exists(problems_filepath):
+        labels = MultiLabelBinarizer().fit_transform(read_dataset(problems_filepath)['labels']).astype(np.uint8)
+        print(f"=== labels of {len(labels)} problems of problems.parquet")
+        return labels
+
+    rng = np.random.default_rng(0)
+    # label frequencies from 40% down to 0.1%
+    frequencies = np.geomspace(0.4, 0.001, len(PROBLEM_LABELS))
+    labels = (rng.random((rows_count, len(PROBLEM_LABELS))) < frequencies).astype(np.uint8)
+    print(f"=== synthetic labels of {rows_count} problems")
+
+    return labels
+
+
+def classic_iterative_split(labels, val_size, seed):
+    # Sechidis et al., 2011: every problem is assigned to the part, which needs its label more
+    labels = np.asarray(labels, dtype=bool)
+    rng = np.random.default_rng(seed)
+    ratios = np.array([1 - val_size, val_size])
+    desired_labels = ratios[:, None] * labels.sum(axis=0)
+    desired_samples = ratios * len(labels)
+    is_val = np.zeros(len(labels), dtype=bool)
+    remaining = set(range(len(labels)))
+
+    while remaining:
+        remaining_rows = np.array(sorted(remaining))
+        remaining_counts = labels[remaining_rows].sum(axis=0)
+
+        if not remaining_counts.any():
+            break
+
+        label = np.argmin(np.where(remaining_counts > 0, remaining_counts, np.iinfo(remaining_counts.dtype).max))
+
+        for row in rng.permutation(remaining_rows[labels[remaining_rows, label]]):
+            part_desired = desired_labels[:, label]
+            part = int(np.argmax(part_desired)) if part_desired[0] != part_desired[1] else int(np.argmax(desired_samples))
+
+            is_val[row] = part == 1
+            desired_labels[part] -= labels[row]
+            desired_samples[part] -= 1
+            remaining.discard(row)
+
+    for row in rng.permutation(sorted(remaining)):
+        part = int(np.argmax(desired_samples))
+        is_val[row] = part == 1
+        desired_samples[part] -= 1
+
+    return np.flatnonzero(~is_val), np.flatnonzero(is_val)
+
+
+def random_split(labels, val_size, seed):
+    order = np.random.default_rng(seed).permutation(len(labels))
+    val_count = int(round(len(labels) * val_size))
+
+    return np.sort(order[val_count:]), np.sort(order[:val_count])
+
+
+def report(name, labels, split, elapsed):
+    train_index, val_index = split
+    label_counts = labels.sum(axis=0)
+    present = label_counts > 0
+    val_shares = labels[val_index].sum(axis=0)[present] / label_counts[present]
+    deviations = np.abs(val_shares - VAL_SIZE)
+
+    print(
+        f"{name:<30} {elapsed:8.3f}s  val {len(val_index) / len(labels):.3f} of problems, "
+        f"label share deviation mean {deviations.mean():.4f} max {deviations.max():.4f}, "
+        f"labels missing in val {int((val_shares == 0).sum())}"
+    )
+
+
+def run(name, split_function, labels):
+    start = time.perf_counter()
+    split = split_function(labels, VAL_SIZE, SPLIT_SEED)
+    elapsed = time.perf_counter() - start
+
+    assert len(np.intersect1d(*split)) == 0 and len(split[0]) + len(split[1]) == len(labels), f"{name} split is not a partition"
+    report(name, labels, split, elapsed)
+
+    return split
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+
+    labels = load_labels(args.rows)
+
+    run("random", random_split, labels)
+    run("iterative, classic (before)", classic_iterative_split, labels)
+    split = run("iterative, vectorized (after)", iterative_stratified_split, labels)
+
+    repeated_split = iterative_stratified_split(labels, VAL_SIZE, SPLIT_SEED)
+    assert all(np.array_equal(a, b) for a, b in zip(split, repeated_split)), "split with the same seed differs"
+    print("split with the same seed is the same")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+#
+# Local stub of the SPOJ website, serving generated problem list and problem pages
+# with the same markup the scrapper parses.
+#
+
+import hashlib
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.synthetic import WORDS
+
+SPOJ_TAGS = ['dynamic-programming', 'graph-theory', 'math', 'number-theory', 'greedy', 'strings', 'sorting']
+
+PROBLEMS_PER_PAGE = 50
+
+
+def problem_code(problem_index):
+    return f"PRB{problem_index:05d}"
+
+
+def _text(rng, min_words, max_words):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words)))
+
+
+def make_problems_page(base_url, page_index, problems_count):
+    rows = []
+
+    for problem_index in range(page_index * PROBLEMS_PER_PAGE, min((page_index + 1) * PROBLEMS_PER_PAGE, problems_count)):
+        rng = random.Random(problem_index)
+        code = problem_code(problem_index)
+        quality = (
+            f'<span title="(+{rng.randint(0, 500)} -{rng.randint(0, 50)})">{rng.randint(0, 500)}</span>'
+            if rng.random() < 0.8 else ''
+        )
+
+        rows.append(
+            f'<tr class="problemrow">\n'
+            f'  <td>{problem_index + 1}</td>\n'
+            f'  <td><a href="{base_url}/problems/{code}"><b>{_text(rng, 2, 5).title()}</b></a></td>\n'
+            f'  <td>{quality}</td>\n'
+            f'  <td><a href="/ranks/{code}">{rng.randint(1, 100000)}</a></td>\n'
+            f'  <td><a href="/ranks/{code}">{rng.randint(100, 9999) / 100}</a></td>\n'
+            f'</tr>'
+        )
+
+    return (
+        '<!DOCTYPE html><html><head><title>Classical problems</title></head><body>\n'
+        '<table class="problems table table-condensed table-hover">\n'
+        '<thead><tr><th>ID</th><th>NAME</th><th>QUALITY</th><th>USERS</th><th>ACC %</th></tr></thead>\n'
+        f'<tbody>\n{chr(10).join(rows)}\n</tbody>\n'
+        '</table></body></html>'
+    )
+
+
+def make_problem_page(problem_index, revision=0):
+    rng = random.Random(problem_index)
+    tags = rng.sample(SPOJ_TAGS, rng.randint(0, 3))
+    tags_html = " ".join(f'<a href="/problems/tag/{tag}"><span class="problem-tag">#{tag}</span></a>' for tag in tags)
+
+    sections = [f'<p>{_text(rng, 20, 120)}</p>\n<p>{_text(rng, 10, 60)}&nbsp;</p>']
+
+    if rng.random() < 0.3:
+        # real statements often have unclosed paragraphs and line breaks
+        sections.append(f'<p>{_text(rng, 5, 20)}<br>{_text(rng, 5, 20)}<br/>\n<b>{_text(rng, 1, 3)}</b> &lt;= N &amp;&amp; &#8804; 10<sup>5</sup>')
+
+    if revision:
+        sections.append(f'<p>Statement is updated (revision {revision}).</p>')
+
+    if rng.random() < 0.3:
+        sections.append(f'<h3>Task</h3>\n<p>{_text(rng, 10, 60)}</p>')
+
+    sections.append(f'<h3>Input</h3>\n<p>{_text(rng, 10, 60)}</p>\n<p>\t{_text(rng, 5, 20)}</p>')
+    sections.append(f'<h3>Output</h3>\n<p>{_text(rng, 5, 40)}</p>')
+    sections.append(f'<h3>Example</h3>\n<pre>\n<b>Input:</b>\n{rng.randint(1, 99)}\n\n<b>Output:</b>\n{rng.randint(1, 99)}\n</pre>')
+
+    return (
+        '<!DOCTYPE html><html><head><title>SPOJ problem</title></head><body>\n'
+        f'<h2 id="problem-name">{problem_code(problem_index)}</h2>\n'
+        f'<div id="problem-tags">{tags_html or "no tags"}</div>\n'
+        f'<div id="problem-body">\n{chr(10).join(sections)}\n</div>\n'
+        '<table id="problem-meta"><tbody>\n'
+        f'<tr><td>Added by:</td><td><a href="/users/user{problem_index % 97}">User {problem_index % 97}</a></td></tr>\n'
+        f'<tr><td>Date:</td><td>2004-05-{problem_index % 28 + 1:02d}</td></tr>\n'
+        f'<tr><td>Time limit:</td><td>{rng.randint(1, 10)}s</td></tr>\n'
+        '<tr><td>Source limit:</td><td>50000B</td></tr>\n'
+        '<tr><td>Memory limit:</td><td>1536MB</td></tr>\n'
+        '<tr><td>Cluster:</td><td> Cube (Intel G860) </td></tr>\n'
+        '<tr><td>Languages:</td><td>All except: ASM64</td></tr>\n'
+        f'<tr><td>Resource:</td><td>{_text(rng, 1, 4)}</td></tr>\n'
+        '</tbody></table></body></html>'
+    )
+
+
+class SpojStubServer:
+    """
+    Serves `problems_count` generated problems. Every request waits `latency` seconds,
+    and every `fail_every`-th request is answered with 503, so that retries are exercised.
+    Paths added to `missing_once_paths` are answered with 404 once, which interrupts scrapping.
+    Pages have ETags, so conditional requests of unchanged pages are answered with 304,
+    problem statements are changed by increasing their `revisions`.
+    """
+
+    def __init__(self, problems_count, latency=0.0, fail_every=0):
+        self.problems_count = problems_count
+        self.latency = latency
+        self.fail_every = fail_every
+        self.missing_once_paths = set()
+        self.revisions = Counter()
+        self.status_counts = Counter()
+        self.requests_count = 0
+        self.lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    @property
+    def pages_count(self):
+        return (self.problems_count + PROBLEMS_PER_PAGE - 1) // PROBLEMS_PER_PAGE
+
+    def render(self, path):
+        if path.startswith('/problems/classical/sort=0,start='):
+            start = int(path.rsplit('=', 1)[1])
+            return make_problems_page(self.base_url, start // PROBLEMS_PER_PAGE, self.problems_count)
+
+        if path.startswith('/problems/PRB'):
+            problem_index = int(path[len('/problems/PRB'):])
+            return make_problem_page(problem_index, self.revisions[problem_index])
+
+        return None
+
+    def _handle(self, request):
+        with self.lock:
+            self.requests_count += 1
+            should_fail = self.fail_every and self.requests_count % self.fail_every == 0
+            is_missing = not should_fail and request.path in self.missing_once_paths
+
+            if is_missing:
+                self.missing_once_paths.discard(request.path)
+
+        time.sleep(self.latency)
+        body = None if should_fail or is_missing else self.render(request.path)
+        etag = None if body is None else f'"{hashlib.sha1(body.encode()).hexdigest()}"'
+
+        if should_fail:
+            status = 503
+        elif body is None:
+            status = 404
+        elif request.headers.get('If-None-Match') == etag:
+            status = 304
+            body = None
+        else:
+            status = 200
+
+        with self.lock:
+            self.status_counts[status] += 1
+
+        request.send_response(status)
+
+        if status == 503:
+            request.send_header('Retry-After', '0')
+
+        if etag is not None:
+            request.send_header('ETag', etag)
+
+        if body is not None:
+            request.send_header('Content-Type', 'text/html; charset=utf-8')
+
+        encoded_body = (body or '').encode()
+        request.send_header('Content-Length', str(len(encoded_body)))
+        request.end_headers()
+        request.wfile.write(encoded_body)
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,109 @@
+#
+# Runs a pipeline shaped like prepare_dataset.py, with stages sleeping instead of downloading and
+# formatting, in sequence and with independent stages in parallel, and checks that unchanged stages
+# are skipped on the next run and that changing a raw dataset runs only the stages depending on it.
+# Digests of stage inputs are cached in the temporary directory, so dataset/cache is left untouched.
+#
+# Usage: python -m benchmarks.stages_benchmark [--seconds S]
+#
+
+import argparse
+import os
+import tempfile
+import time
+
+from data_manager import cache
+from data_manager.stages import Stage, print_summary, run_stages, select_stages
+
+SOURCES = ['codeforces', 'leetcode', 'spoj']
+
+
+def make_stages(data_dir, seconds):
+    def write(filepath, text):
+        with open(filepath, "w") as f:
+            f.write(text)
+
+    def read(filepath):
+        with open(filepath, "r") as f:
+            return f.read()
+
+    def load(source):
+        time.sleep(seconds)
+        write(f"{data_dir}/{source}.raw", source)
+
+    def format_source(source):
+        time.sleep(seconds)
+        write(f"{data_dir}/{source}.formatted", read(f"{data_dir}/{source}.raw").upper())
+
+    def merge():
+        time.sleep(seconds / 4)
+        write(f"{data_dir}/problems", "\n".join(read(f"{data_dir}/{source}.formatted") for source in SOURCES))
+
+    stages = [Stage(f"load_{source}", lambda source=source: load(source), outputs=[f"{data_dir}/{source}.raw"]) for source in SOURCES]
+    stages += [
+        Stage(f"format_{source}", lambda source=source: format_source(source),
+              inputs=[f"{data_dir}/{source}.raw"], outputs=[f"{data_dir}/{source}.formatted"])
+        for source in SOURCES
+    ]
+    stages += [
+        Stage("dedup", merge, inputs=[f"{data_dir}/{source}.formatted" for source in SOURCES], outputs=[f"{data_dir}/problems"]),
+        Stage("plot", lambda: time.sleep(seconds / 4), inputs=[f"{data_dir}/problems"], outputs=[]),
+    ]
+
+    return stages
+
+
+def run(name, stages, selected=None, workers=4, state_filepath=None):
+    print(f"=== {name}")
+    start = time.perf_counter()
+    results = run_stages(stages, selected, workers=workers, state_filepath=state_filepath)
+    print_summary(results, time.perf_counter() - start)
+
+    return {result.name: result.status for result in results}
+
+
+def run_benchmark(data_dir, seconds):
+    stages = make_stages(data_dir, seconds)
+    state_filepath = f"{data_dir}/stages.json"
+
+    run("sequential stages (before)", stages, workers=1, state_filepath=f"{data_dir}/sequential_stages.json")
+    for source in SOURCES:
+        os.remove(f"{data_dir}/{source}.raw")
+
+    statuses = run("parallel independent stages (after)", stages, state_filepath=state_filepath)
+    assert set(statuses.values()) == {'done'}
+
+    statuses = run("second run", stages, state_filepath=state_filepath)
+    assert set(statuses.values()) == {'skipped'}, "unchanged stages must be skipped"
+
+    with open(f"{data_dir}/leetcode.raw", "w") as f:
+        f.write("changed")
+
+    statuses = run("changed leetcode dataset", stages, state_filepath=state_filepath)
+    assert [name for name, status in statuses.items() if status == 'done'] == ['format_leetcode', 'dedup', 'plot']
+
+    statuses = run("--from dedup", stages, select_stages(stages, start='dedup'), state_filepath=state_filepath)
+    assert list(statuses) == ['dedup', 'plot']
+
+    statuses = run("--only format", stages, select_stages(stages, only=['format']), state_filepath=state_filepath)
+    assert list(statuses) == [f"format_{source}" for source in SOURCES]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=0.5, help="duration of loading and formatting stages")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        cache.cache_dir = data_dir
+
+        try:
+            run_benchmark(data_dir, args.seconds)
+        finally:
+            cache.cache_dir = None
+
+    print("\nunchanged stages are skipped, changed inputs run only the stages depending on them")
+
+
+if __name__ == '__main__':
+    main()
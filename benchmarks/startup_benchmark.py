@@ -0,0 +1,106 @@
+#
+# Checks the cold-start budget of cpclassify: runs `cpclassify --help` and `cpclassify predict` on a tiny
+# input in fresh interpreters with `python -X importtime`, and fails when their import time is over
+# the budget or when they import dependencies of other subcommands.
+#
+# Usage: python -m benchmarks.startup_benchmark [--help-budget SECONDS] [--predict-budget SECONDS]
+#
+# predict uses a small randomly initialized BERT, so the check runs offline.
+#
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_model import make_model_dir
+
+CPCLASSIFY_SCRIPT = f"{os.path.dirname(os.path.dirname(os.path.abspath(__file__)))}/cpclassify.py"
+
+# --help imports only argparse, predict imports torch and transformers (about 7s on a CPU machine),
+# so importing dependencies of other subcommands eagerly makes them go over the budget
+HELP_IMPORT_BUDGET = 0.3
+PREDICT_IMPORT_BUDGET = 10.0
+# problems classified by predict
+TINY_INPUT = "\n".join(json.dumps(text) for text in ["Find the shortest path in a graph.", "Sort the array."])
+
+# dependencies of subcommands, none of them is needed by --help
+HEAVY_MODULES = ['torch', 'transformers', 'datasets', 'matplotlib', 'bs4', 'requests', 'sklearn', 'pandas']
+# dependencies of dataset subcommands, predict doesn't need them
+DATASET_MODULES = ['datasets', 'matplotlib', 'bs4', 'requests']
+
+
+def run_with_importtime(args, stdin=None):
+    """
+    :return: wall time, import time of all modules in seconds and names of imported top-level packages
+    """
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", CPCLASSIFY_SCRIPT] + args,
+        input=stdin, capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - start
+
+    if process.returncode != 0:
+        raise RuntimeError(f"cpclassify {' '.join(args)} failed:\n{process.stderr[-2000:]}")
+
+    import_time, packages = 0, set()
+
+    # lines are "import time: <self us> | <cumulative us> | <indentation><module>"
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, module = line.split("|")
+        packages.add(module.strip().split(".")[0])
+
+        # modules imported directly by the script include modules they import
+        if not module[1:].startswith(" "):
+            import_time += int(cumulative) / 1e6
+
+    return elapsed, import_time, packages
+
+
+def check(name, args, budget, forbidden_modules, stdin=None):
+    elapsed, import_time, packages = run_with_importtime(args, stdin)
+    imported = [module for module in forbidden_modules if module in packages]
+    print(f"{name:<28} {elapsed:7.2f}s wall, {import_time:7.2f}s imports (budget {budget:.2f}s), "
+          f"{len(packages)} packages, imported heavy modules: {imported or 'none'}")
+
+    failures = []
+
+    if import_time > budget:
+        failures.append(f"{name}: imports take {import_time:.2f}s, over the budget of {budget:.2f}s")
+
+    if imported:
+        failures.append(f"{name}: imports {', '.join(imported)}")
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--help-budget', type=float, default=HELP_IMPORT_BUDGET)
+    parser.add_argument('--predict-budget', type=float, default=PREDICT_IMPORT_BUDGET)
+    args = parser.parse_args()
+
+    failures = check("cpclassify --help", ["--help"], args.help_budget, HEAVY_MODULES)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_dir, mlb_filepath = make_model_dir(tmp_dir)
+
+        failures += check("cpclassify predict (2 texts)", ["predict", "--model", model_dir, "--mlb", mlb_filepath],
+                          args.predict_budget, DATASET_MODULES, stdin=TINY_INPUT)
+
+    if failures:
+        print("\n".join(failures))
+        sys.exit(1)
+
+    print("cold starts are within the budget")
+
+
+if __name__ == '__main__':
+    main()
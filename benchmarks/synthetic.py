@@ -0,0 +1,88 @@
+#
+# Synthetic raw datasets shaped like the huggingface CSVs, used by the benchmarks
+# when the real datasets are not downloaded
+#
+
+import random
+
+import pandas as pd
+
+from data_manager.problem_types import codeforces_to_standard, leetcode_to_standard
+
+WORDS = [
+    'array', 'integer', 'query', 'graph', 'vertex', 'edge', 'string', 'substring', 'sum',
+    'minimum', 'maximum', 'print', 'each', 'test', 'case', 'contains', 'number', 'given',
+    'you', 'are', 'the', 'of', 'and', 'to', 'in', 'is', 'a', 'that', 'such', 'find',
+]
+
+HTML_TAGS = ['p', 'strong', 'em', 'code', 'li', 'pre', 'sup']
+
+
+def _text(rng, min_words, max_words):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words)))
+
+
+def _multiline_text(rng, min_words, max_words):
+    return "\n".join(_text(rng, min_words // 4 + 1, max_words // 4 + 1) for _ in range(4))
+
+
+def make_text_of_size(seed, size):
+    text = _text(random.Random(seed), 10, 20)
+
+    return (text * (size // len(text) + 1))[:size]
+
+
+def make_skewed_texts(rows_count, seed=0, log_mean=4.5):
+    # lengths are log-normal like lengths of problem statements: most texts are short, a few are very long
+    rng = random.Random(seed)
+
+    return [" ".join(rng.choice(WORDS) for _ in range(int(rng.lognormvariate(log_mean, 0.8)))) for _ in range(rows_count)]
+
+
+def _labels(rng, labels_map, max_count=4):
+    return rng.sample(list(labels_map), rng.randint(0, max_count))
+
+
+def make_codeforces_df(rows_count, seed=0):
+    rng = random.Random(seed)
+    rows = []
+
+    for i in range(rows_count):
+        rows.append({
+            'id': f"{i}A",
+            'title': _text(rng, 2, 5),
+            'labels': _labels(rng, codeforces_to_standard),
+            'time_limit_per_test': 1.0,
+            'memory_limit_per_test': 256.0,
+            'description': None if rng.random() < 0.02 else _multiline_text(rng, 40, 800),
+            'input_format': _multiline_text(rng, 10, 80),
+            'output_format': _multiline_text(rng, 5, 40),
+            'interaction_format': _multiline_text(rng, 5, 40) if rng.random() < 0.05 else None,
+            'note': _multiline_text(rng, 5, 60) if rng.random() < 0.5 else None,
+            'examples': None,
+        })
+
+    return pd.DataFrame(rows)
+
+
+def make_leetcode_df(rows_count, seed=0):
+    rng = random.Random(seed)
+    rows = []
+
+    for i in range(rows_count):
+        paragraphs = []
+
+        for _ in range(rng.randint(2, 8)):
+            tag = rng.choice(HTML_TAGS)
+            paragraphs.append(f"<{tag}>{_text(rng, 5, 60)}</{tag}>&nbsp;&lt;x&gt;\n")
+
+        rows.append({
+            'id': i + 1,
+            'title': _text(rng, 2, 5),
+            'titleKebabCase': f"problem-{i + 1}",
+            'labels': _labels(rng, leetcode_to_standard),
+            'difficulty': rng.choice(['Easy', 'Medium', 'Hard']),
+            'description': None if rng.random() < 0.02 else "".join(paragraphs),
+        })
+
+    return pd.DataFrame(rows)
@@ -0,0 +1,42 @@
+#
+# Randomly initialized small BERT classifier saved like train_bert.py saves the trained one,
+# together with its tokenizer and a MultiLabelBinarizer, used by the inference benchmarks
+#
+
+import joblib
+import torch
+from sklearn.preprocessing import MultiLabelBinarizer
+from transformers import BertConfig, BertForSequenceClassification
+
+from benchmarks.synthetic_tokenizer import make_tokenizer
+from classifier.tokenization import MAX_LENGTH
+from data_manager.utils import PROBLEM_LABELS
+
+
+def make_model_dir(directory, hidden_size=128, layers=2, seed=0):
+    """
+    :return: paths of the model directory and of the saved MultiLabelBinarizer
+    """
+    model_dir = f"{directory}/model"
+    mlb_filepath = f"{directory}/mlb.joblib"
+
+    tokenizer = make_tokenizer(directory)
+    mlb = MultiLabelBinarizer().fit([PROBLEM_LABELS])
+
+    torch.manual_seed(seed)
+    config = BertConfig(
+        vocab_size=tokenizer.vocab_size,
+        hidden_size=hidden_size,
+        num_hidden_layers=layers,
+        num_attention_heads=max(1, hidden_size // 64),
+        intermediate_size=hidden_size * 4,
+        max_position_embeddings=MAX_LENGTH,
+        num_labels=len(mlb.classes_),
+        problem_type="multi_label_classification",
+    )
+
+    BertForSequenceClassification(config).save_pretrained(model_dir)
+    tokenizer.save_pretrained(model_dir)
+    joblib.dump(mlb, mlb_filepath)
+
+    return model_dir, mlb_filepath
@@ -0,0 +1,33 @@
+#
+# WordPiece BERT tokenizer over the synthetic WORDS, used by the benchmarks
+# instead of a downloaded checkpoint
+#
+
+import string
+
+from transformers import BertTokenizerFast
+
+try:
+    # transformers 5 keeps the pure-Python tokenizer under this name
+    from transformers import BertTokenizerLegacy as SlowBertTokenizer
+except ImportError:
+    from transformers import BertTokenizer as SlowBertTokenizer
+
+from benchmarks.synthetic import WORDS
+
+SPECIAL_TOKENS = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]']
+
+# word pieces, so words like "queries" or "vertices" are split into several tokens
+WORD_PIECES = ['##s', '##es', '##ed', '##ing', '##ices', '##ies', '##er', '##y', '##ex', '##a', '##n', '##t']
+
+
+def make_tokenizer(directory, fast=True):
+    vocab_filepath = f"{directory}/vocab.txt"
+    vocab = SPECIAL_TOKENS + WORDS + ['quer', 'vert', 'integ'] + WORD_PIECES + list(string.punctuation) + list(string.digits)
+
+    with open(vocab_filepath, "w") as f:
+        f.write("\n".join(vocab) + "\n")
+
+    tokenizer_class = BertTokenizerFast if fast else SlowBertTokenizer
+
+    return tokenizer_class(vocab_filepath)
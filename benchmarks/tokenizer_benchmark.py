@@ -0,0 +1,89 @@
+#
+# Compares encoding texts one at a time with the pure-Python BERT tokenizer (as before)
+# with `encode_corpus` over the Rust-backed fast tokenizer, and checks that token ids match exactly.
+#
+# Usage: python -m benchmarks.tokenizer_benchmark [--rows N] [--workers N] [--checkpoint bert-base-uncased]
+#
+# Descriptions of data_manager/dataset/problems.parquet are used when it exists, otherwise synthetic texts.
+# Without --checkpoint a WordPiece tokenizer over synthetic words is used, so the benchmark runs offline.
+#
+
+import argparse
+import os
+import tempfile
+import time
+
+from transformers import BertTokenizerFast
+
+from benchmarks.synthetic import make_codeforces_df
+from benchmarks.synthetic_tokenizer import SlowBertTokenizer, make_tokenizer
+from classifier.tokenization import MAX_LENGTH, encode_corpus
+from data_manager.utils import get_dataset_filepath, read_dataset
+
+EDGE_CASES = [
+    "",
+    "   \n\t ",
+    "Queries VERTICES integer's sum, (a+b)*c <= 10^9; print \"YES\"!",
+    "Café naïve résumé — ≤ ≥ ∑ µ",
+    "给定一个数组 array 的 sum",
+    "1234567890 3.14159 -42 1e9+7",
+    "query" * 200,
+    " ".join(["vertex"] * 2000),
+]
+
+
+def load_texts(rows_count):
+    problems_filepath = get_dataset_filepath('problems.parquet')
+
+    if os.path.exists(problems_filepath):
+        texts = read_dataset(problems_filepath)['description'].tolist()[:rows_count]
+        print(f"=== {len(texts)} descriptions of problems.parquet")
+    else:
+        texts = make_codeforces_df(rows_count)['description'].fillna('').tolist()
+        print(f"=== {len(texts)} synthetic descriptions")
+
+    return texts + EDGE_CASES
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--checkpoint', default=None)
+    args = parser.parse_args()
+
+    texts = load_texts(args.rows)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.checkpoint:
+            slow_tokenizer = SlowBertTokenizer.from_pretrained(args.checkpoint)
+            fast_tokenizer = BertTokenizerFast.from_pretrained(args.checkpoint)
+        else:
+            slow_tokenizer = make_tokenizer(tmp_dir, fast=False)
+            fast_tokenizer = make_tokenizer(tmp_dir, fast=True)
+
+        start = time.perf_counter()
+        expected = [slow_tokenizer(text, truncation=True, max_length=MAX_LENGTH)['input_ids'] for text in texts]
+        slow_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        encoded_corpus = encode_corpus(texts, fast_tokenizer, num_workers=args.workers)
+        fast_time = time.perf_counter() - start
+
+    tokens_count = len(encoded_corpus.input_ids)
+    print(f"slow tokenizer, one text at a time (before) {slow_time:8.2f}s {len(texts) / slow_time:10.1f} texts/sec")
+    print(f"fast tokenizer, encode_corpus (after)       {fast_time:8.2f}s {len(texts) / fast_time:10.1f} texts/sec ({tokens_count} tokens)")
+
+    mismatches = 0
+
+    for idx, text in enumerate(texts):
+        if encoded_corpus[idx].tolist() != expected[idx]:
+            mismatches += 1
+            print(f"MISMATCH of text {idx}: {text[:80]!r}\n  slow: {expected[idx][:20]}\n  fast: {encoded_corpus[idx][:20].tolist()}")
+
+    assert mismatches == 0, f"{mismatches} texts are encoded differently"
+    print("fast and slow tokenizers produce the same token ids")
+
+
+if __name__ == '__main__':
+    main()
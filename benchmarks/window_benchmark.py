@@ -0,0 +1,114 @@
+#
+# Compares classifying truncated problem statements with classifying them in overlapping windows
+# with max and mean pooling: cost per problem, computed tokens and padding, and the share of
+# statement tokens the model sees. Checks that WindowPoolingTrainer pools windows of a training
+# corpus like the Predictor pools windows of texts, and that it can train.
+#
+# Usage: python -m benchmarks.window_benchmark [--rows N] [--log-mean N]
+#
+# Statements are longer than in other benchmarks, but not longer than the Formatter allows.
+# A small randomly initialized BERT is used (or --model/--mlb), so the benchmark runs offline.
+#
+
+import argparse
+import tempfile
+import time
+
+import joblib
+import numpy as np
+from transformers import AutoModelForSequenceClassification, TrainingArguments
+
+from benchmarks.synthetic import make_skewed_texts
+from benchmarks.synthetic_model import make_model_dir
+from classifier.batching import WindowPoolingTrainer, collate_windows
+from classifier.corpus import CorpusDataset, build_corpus
+from classifier.predict import Predictor
+from classifier.tokenization import encode_corpus
+from classifier.windows import split_into_windows
+from data_manager.format import MAX_PROBLEM_DESCRIPTION_LENGTH
+
+TRAINING_STEPS = 2
+
+
+def count_tokens(predictor, texts):
+    """
+    :return: numbers of windows, of statement tokens seen by the model, of tokens of windows,
+        of computed tokens (padding included) and of statement tokens, special tokens are not counted
+    """
+    encoded_corpus = encode_corpus(texts, predictor.tokenizer, max_length=None)
+    max_windows = 1 if predictor.pooling is None else predictor.max_windows
+    windows, window_offsets = split_into_windows(encoded_corpus, predictor.max_length, overlap=predictor.overlap, max_windows=max_windows)
+
+    lengths = windows.lengths
+    computed_tokens_count = sum(
+        len(batch_index) * int(lengths[batch_index].max())
+        for batch_index in predictor._get_batches(np.argsort(lengths, kind="stable"), lengths)
+    )
+
+    # windows of a text overlap, unless their count is capped
+    body_lengths = encoded_corpus.lengths - 2
+    seen_tokens_count = np.minimum(body_lengths, np.diff(window_offsets) * (predictor.max_length - 2)).sum()
+
+    return len(windows), int(seen_tokens_count), int(lengths.sum()), computed_tokens_count, int(body_lengths.sum())
+
+
+def check_trainer(model_dir, mlb_filepath, texts, tmp_dir):
+    labels = (np.random.default_rng(0).random((len(texts), len(joblib.load(mlb_filepath).classes_))) < 0.2).astype(np.float32)
+    predictor = Predictor(model_dir, mlb_filepath=mlb_filepath, pooling='max')
+
+    build_corpus(texts, labels, predictor.tokenizer, f"{tmp_dir}/corpus", windowed=True)
+    dataset = CorpusDataset(f"{tmp_dir}/corpus")
+
+    trainer = WindowPoolingTrainer(
+        model=AutoModelForSequenceClassification.from_pretrained(model_dir),
+        args=TrainingArguments(output_dir=f"{tmp_dir}/checkpoints", per_device_train_batch_size=8, per_device_eval_batch_size=8,
+                               max_steps=TRAINING_STEPS, report_to=[], use_cpu=True),
+        data_collator=collate_windows,
+        train_dataset=dataset,
+        processing_class=predictor.tokenizer,
+        pooling='max',
+    )
+
+    max_diff = np.abs(trainer.predict(dataset).predictions - predictor.predict_logits(texts)).max()
+    assert max_diff < 1e-4, f"trainer pools windows differently than the Predictor, max logit diff {max_diff}"
+
+    trainer.train()
+    print(f"WindowPoolingTrainer pools like the Predictor (max logit diff {max_diff:.1e}) and trains")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=512)
+    parser.add_argument('--log-mean', type=float, default=5.5, help="mean of the log of the words count of a statement")
+    parser.add_argument('--model', default=None)
+    parser.add_argument('--mlb', default=None)
+    args = parser.parse_args()
+
+    texts = [text for text in make_skewed_texts(args.rows, log_mean=args.log_mean) if len(text) <= MAX_PROBLEM_DESCRIPTION_LENGTH]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.model is None:
+            args.model, args.mlb = make_model_dir(tmp_dir)
+
+        print(f"=== {len(texts)} problems")
+
+        for name, pooling in [("truncation (before)", None), ("windows, max pooling", 'max'), ("windows, mean pooling", 'mean')]:
+            predictor = Predictor(args.model, mlb_filepath=args.mlb, pooling=pooling)
+            windows_count, seen_tokens_count, window_tokens_count, computed_tokens_count, tokens_count = count_tokens(predictor, texts)
+
+            start = time.perf_counter()
+            predictor.predict_logits(texts)
+            elapsed = time.perf_counter() - start
+
+            print(
+                f"{name:<24} {1000 * elapsed / len(texts):6.2f}ms per problem, {windows_count / len(texts):4.2f} windows per problem, "
+                f"{computed_tokens_count / len(texts):5.0f} computed tokens per problem "
+                f"({100 * (1 - window_tokens_count / computed_tokens_count):.0f}% padding), "
+                f"model sees {100 * seen_tokens_count / tokens_count:.0f}% of statement tokens"
+            )
+
+        check_trainer(args.model, args.mlb, texts[:64], tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#
+# This code trains a fast baseline classifier: TF-IDF (or hashed) word n-grams in sparse CSR matrices
+# and one-vs-rest logistic regressions, trained in parallel across labels. It trains in seconds on CPU,
+# so it is a fallback for the BERT model and a quick check of the dataset.
+#
+# Usage: python -m classifier.baseline [--vectorizer tfidf] [--jobs -1] [--output ./model/baseline.joblib]
+#
+# The baseline is trained and evaluated on the same split as train_bert.py, with the same metrics.
+#
+
+import argparse
+import os
+import time
+from typing import Dict, List, Union
+
+import joblib
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import classification_report
+from sklearn.multiclass import OneVsRestClassifier
+from sklearn.pipeline import make_pipeline
+
+from classifier.constants import DEFAULT_THRESHOLD, MODEL_DIR
+from classifier.metrics import multi_labels_metrics
+from classifier.thresholds import get_thresholds
+from data_manager.preprocess import MLB_FILE, PREPROCESSED_DATA_FILE, unpack_labels
+from data_manager.problem_types import ProblemLabel
+from data_manager.utils import get_dataset_filepath
+
+BASELINE_FILE = "baseline.joblib"
+VECTORIZERS = ['tfidf', 'hashing']
+
+NGRAM_RANGE = (1, 2)
+MAX_FEATURES = 200000
+HASHING_FEATURES = 2 ** 20
+# inverse regularization strength of logistic regressions
+REGULARIZATION_C = 4.0
+
+
+def make_baseline(vectorizer='tfidf', n_jobs=-1):
+    """
+    :param vectorizer: 'tfidf' learns a vocabulary of n-grams, 'hashing' hashes n-grams
+        without a vocabulary, which needs less memory and is fitted in one pass
+    :param n_jobs: number of labels trained at once, all CPU cores with -1
+    """
+    if vectorizer == 'tfidf':
+        steps = [TfidfVectorizer(ngram_range=NGRAM_RANGE, max_features=MAX_FEATURES, min_df=2, sublinear_tf=True, dtype=np.float32)]
+    else:
+        steps = [
+            HashingVectorizer(ngram_range=NGRAM_RANGE, n_features=HASHING_FEATURES, alternate_sign=False, norm=None, dtype=np.float32),
+            TfidfTransformer(sublinear_tf=True),
+        ]
+
+    # liblinear trains a binary model of a label on sparse features in a single thread
+    classifier = OneVsRestClassifier(LogisticRegression(C=REGULARIZATION_C, solver='liblinear'), n_jobs=n_jobs)
+
+    return make_pipeline(*steps, classifier)
+
+
+class BaselinePredictor:
+    """
+    Classifies problem statements with a baseline saved by `python -m classifier.baseline`,
+    has the same methods as the Predictor of the BERT model.
+    """
+
+    def __init__(self, model_filepath=f"{MODEL_DIR}/{BASELINE_FILE}", thresholds: Union[float, Dict[str, float]] = DEFAULT_THRESHOLD):
+        saved = joblib.load(model_filepath)
+
+        self.pipeline = saved['pipeline']
+        self.label_names = np.array(saved['label_names'], dtype=object)
+        self.thresholds = get_thresholds(thresholds, self.label_names)
+
+    def predict(self, texts) -> List[List[ProblemLabel]]:
+        predicted = self.predict_proba(texts) >= self.thresholds
+
+        return [self.label_names[row].tolist() for row in predicted]
+
+    def predict_proba(self, texts) -> np.ndarray:
+        return 1 / (1 + np.exp(-self.predict_logits(texts)))
+
+    def predict_logits(self, texts) -> np.ndarray:
+        # decision functions of logistic regressions are log-odds, like logits of the BERT model
+        return self.pipeline.decision_function([str(text) for text in texts]).astype(np.float32)
+
+
+def train_baseline(train_texts, train_labels, vectorizer='tfidf', n_jobs=-1):
+    pipeline = make_baseline(vectorizer, n_jobs=n_jobs)
+    pipeline.fit([str(text) for text in train_texts], train_labels)
+
+    return pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the TF-IDF baseline classifier")
+    parser.add_argument('--vectorizer', choices=VECTORIZERS, default='tfidf')
+    parser.add_argument('--jobs', type=int, default=-1, help="number of labels trained at once, all CPU cores with -1")
+    parser.add_argument('--output', default=f"{MODEL_DIR}/{BASELINE_FILE}")
+    args = parser.parse_args()
+
+    print("Loading preprocessed data...")
+    # made by the preprocessing stage of data_manager/prepare_dataset.py
+    data = joblib.load(get_dataset_filepath(PREPROCESSED_DATA_FILE))
+    train_labels = unpack_labels(data["train_labels"], data["labels_count"])
+    val_labels = unpack_labels(data["val_labels"], data["labels_count"])
+    label_names = joblib.load(get_dataset_filepath(MLB_FILE)).classes_
+
+    print(f"Training on {len(data['train_texts'])} problems...")
+    start = time.perf_counter()
+    pipeline = train_baseline(data["train_texts"], train_labels, vectorizer=args.vectorizer, n_jobs=args.jobs)
+    print(f"Trained in {time.perf_counter() - start:.1f}s")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    joblib.dump({'pipeline': pipeline, 'label_names': list(label_names)}, args.output)
+
+    print("Evaluating...")
+    predictor = BaselinePredictor(args.output)
+
+    start = time.perf_counter()
+    logits = predictor.predict_logits(data["val_texts"])
+    elapsed = time.perf_counter() - start
+    print(f"Classified {len(logits)} problems in {elapsed:.2f}s ({len(logits) / max(elapsed, 1e-9):.0f} problems/sec)")
+
+    print(multi_labels_metrics(logits, val_labels))
+    print("\nClassification Report:")
+    print(classification_report(val_labels, (predictor.predict_proba(data["val_texts"]) >= DEFAULT_THRESHOLD).astype(int),
+                                target_names=label_names, zero_division=0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+#
+# This code groups samples of similar length into batches and pads every batch only
+# to its longest sample, so short problem statements are not padded to MAX_LENGTH tokens
+#
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Sampler
+from transformers import Trainer
+
+from classifier.windows import pool_window_logits
+
+# samples are sorted by length inside buckets of this many batches
+BUCKET_SIZE_IN_BATCHES = 50
+
+
+class LengthBucketBatchSampler(Sampler):
+    """
+    Yields batches of sample indices. With `shuffle=True` samples are shuffled, split into
+    buckets of `bucket_size_in_batches` batches and sorted by length inside each bucket,
+    then the order of batches is shuffled. Every iteration is a new epoch with a new order.
+    With `shuffle=False` all samples are sorted by length, see `get_order`.
+    """
+
+    def __init__(self, lengths, batch_size, shuffle=True, bucket_size_in_batches=BUCKET_SIZE_IN_BATCHES, seed=0):
+        self.lengths = np.asarray(lengths)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.bucket_size = batch_size * bucket_size_in_batches
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def get_order(self):
+        # stable sort, so the order does not depend on anything but lengths
+        return np.argsort(self.lengths, kind="stable")
+
+    def __len__(self):
+        return (len(self.lengths) + self.batch_size - 1) // self.batch_size
+
+    def __iter__(self):
+        if not self.shuffle:
+            order = self.get_order()
+            batches = [order[i:i + self.batch_size] for i in range(0, len(order), self.batch_size)]
+        else:
+            rng = np.random.default_rng((self.seed, self.epoch))
+            self.epoch += 1
+
+            indices = rng.permutation(len(self.lengths))
+            batches = []
+
+            for start in range(0, len(indices), self.bucket_size):
+                bucket = indices[start:start + self.bucket_size]
+                bucket = bucket[np.argsort(self.lengths[bucket], kind="stable")]
+                batches.extend(bucket[i:i + self.batch_size] for i in range(0, len(bucket), self.batch_size))
+
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+
+        for batch in batches:
+            yield batch.tolist()
+
+
+def collate_to_longest(samples):
+    """
+    Stacks samples of `CorpusDataset` into a batch, cutting padding
+    which is not needed by the longest sample of the batch.
+    """
+    attention_mask = torch.stack([sample['attention_mask'] for sample in samples])
+    max_length = int(attention_mask.sum(dim=1).max())
+
+    return {
+        'input_ids': torch.stack([sample['input_ids'][:max_length] for sample in samples]),
+        'attention_mask': attention_mask[:, :max_length],
+        'labels': torch.stack([sample['labels'] for sample in samples]),
+    }
+
+
+def collate_windows(samples):
+    """
+    Concatenates windows of samples of a windowed `CorpusDataset` into a batch, cutting padding
+    which is not needed by the longest window. `window_problems` is the sample of every window.
+    """
+    max_length = max(int(sample['attention_mask'].sum(dim=1).max()) for sample in samples)
+    windows_counts = torch.tensor([len(sample['input_ids']) for sample in samples])
+
+    return {
+        'input_ids': torch.cat([sample['input_ids'][:, :max_length] for sample in samples]),
+        'attention_mask': torch.cat([sample['attention_mask'][:, :max_length] for sample in samples]),
+        'labels': torch.stack([sample['labels'] for sample in samples]),
+        'window_problems': torch.repeat_interleave(torch.arange(len(samples)), windows_counts),
+    }
+
+
+class BucketedTrainer(Trainer):
+    """
+    Trainer, which batches samples of `CorpusDataset` with `LengthBucketBatchSampler`.
+    Evaluation batches are sorted by length, predictions are returned in the dataset order.
+    """
+
+    def get_train_dataloader(self):
+        return self._get_bucketed_dataloader(self.train_dataset, self._train_batch_size, shuffle=True)
+
+    def get_eval_dataloader(self, eval_dataset=None):
+        if eval_dataset is None:
+            eval_dataset = self.eval_dataset
+        elif isinstance(eval_dataset, str):
+            eval_dataset = self.eval_dataset[eval_dataset]
+
+        return self._get_bucketed_dataloader(eval_dataset, self.args.eval_batch_size, shuffle=False)
+
+    def get_test_dataloader(self, test_dataset):
+        return self._get_bucketed_dataloader(test_dataset, self.args.eval_batch_size, shuffle=False)
+
+    def predict(self, test_dataset, *args, **kwargs):
+        output = super().predict(test_dataset, *args, **kwargs)
+
+        # position of every sample of the dataset in the sorted batches
+        order = LengthBucketBatchSampler(test_dataset.get_lengths(), self.args.eval_batch_size, shuffle=False).get_order()
+        positions = np.empty_like(order)
+        positions[order] = np.arange(len(order))
+
+        def restore_order(arrays):
+            if isinstance(arrays, tuple):
+                return tuple(restore_order(array) for array in arrays)
+
+            return None if arrays is None else arrays[positions]
+
+        return output._replace(predictions=restore_order(output.predictions), label_ids=restore_order(output.label_ids))
+
+    def _get_bucketed_dataloader(self, dataset, batch_size, shuffle):
+        batch_sampler = LengthBucketBatchSampler(dataset.get_lengths(), batch_size, shuffle=shuffle, seed=self.args.seed)
+
+        dataloader = DataLoader(
+            dataset,
+            batch_sampler=batch_sampler,
+            collate_fn=self.data_collator,
+            num_workers=self.args.dataloader_num_workers,
+            pin_memory=self.args.dataloader_pin_memory,
+        )
+
+        return self.accelerator.prepare(dataloader)
+
+
+class WindowPoolingTrainer(BucketedTrainer):
+    """
+    BucketedTrainer of a windowed `CorpusDataset` batched by `collate_windows`. All windows of
+    a batch are classified at once, their logits are pooled per problem with `pooling` ('max' or 'mean'),
+    and the loss and predictions are computed from pooled logits.
+    """
+
+    def __init__(self, *args, pooling='max', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pooling = pooling
+
+    def compute_loss(self, model, inputs, return_outputs=False, num_items_in_batch=None):
+        labels = inputs.pop('labels')
+        window_problems = inputs.pop('window_problems')
+
+        window_logits = model(**inputs).logits
+        logits = pool_window_logits(window_logits, window_problems, len(labels), self.pooling)
+        loss = torch.nn.functional.binary_cross_entropy_with_logits(logits, labels.to(logits.dtype))
+
+        return (loss, {'loss': loss, 'logits': logits}) if return_outputs else loss
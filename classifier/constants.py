@@ -0,0 +1,8 @@
+#
+# Defaults shared by the BERT model and the baseline, kept free of dependencies,
+# so modules using them don't import torch and transformers.
+#
+
+# the trained model and its tokenizer are saved here by train_bert.py
+MODEL_DIR = "./model"
+DEFAULT_THRESHOLD = 0.5
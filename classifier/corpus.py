@@ -0,0 +1,165 @@
+#
+# This code tokenizes training texts once and saves tokens to memory-mapped files,
+# so training epochs read them from the page cache instead of tokenizing texts again
+#
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+from classifier.tokenization import ENCODING_BATCH_SIZE, MAX_LENGTH, encode_corpus
+from classifier.windows import MAX_WINDOWS, WINDOW_OVERLAP, split_into_windows
+
+# corpora are saved in data_manager/dataset/corpus
+CORPUS_DIR_NAME = "corpus"
+
+# files of a corpus, labels have one row per text, other arrays have one row per text or per window
+CORPUS_ARRAYS = ['input_ids', 'attention_mask', 'labels', 'lengths']
+# offsets of windows of every text in a windowed corpus
+WINDOW_OFFSETS_ARRAY = 'window_offsets'
+META_FILE = "meta.json"
+
+
+def get_corpus_key(texts, labels, tokenizer, max_length, windows=None) -> str:
+    # corpus must be tokenized again, when texts, labels or tokenization change
+    digest = hashlib.sha256()
+
+    for text in texts:
+        digest.update(str(text).encode())
+        digest.update(b"\0")
+
+    digest.update(np.ascontiguousarray(labels, dtype=np.float32).tobytes())
+    digest.update(json.dumps([type(tokenizer).__name__, tokenizer.name_or_path, max_length, windows]).encode())
+
+    return digest.hexdigest()
+
+
+def build_corpus(texts, labels, tokenizer, corpus_dir, max_length=MAX_LENGTH, batch_size=ENCODING_BATCH_SIZE, num_workers=None,
+                 windowed=False, overlap=WINDOW_OVERLAP, max_windows=MAX_WINDOWS) -> bool:
+    """
+    Tokenizes `texts` into `corpus_dir`, unless it already has the same corpus.
+    Texts are encoded with `encode_corpus` and padded to `max_length` when they are written.
+
+    :param windowed: texts are not truncated, but split into overlapping windows with `split_into_windows`
+    :return: True when the corpus was tokenized, False when the saved one is up to date
+    """
+    labels = np.asarray(labels, dtype=np.float32)
+    windows = [overlap, max_windows] if windowed else None
+    key = get_corpus_key(texts, labels, tokenizer, max_length, windows)
+
+    if _read_meta(corpus_dir).get('key') == key:
+        return False
+
+    encoded_corpus = encode_corpus(
+        texts, tokenizer, batch_size=batch_size, num_workers=num_workers, max_length=None if windowed else max_length
+    )
+
+    if windowed:
+        encoded_corpus, window_offsets = split_into_windows(encoded_corpus, max_length, overlap=overlap, max_windows=max_windows)
+
+    tmp_dir = f"{corpus_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    rows_count = len(encoded_corpus)
+    input_ids = _open_array(tmp_dir, 'input_ids', np.int32, (rows_count, max_length))
+    attention_mask = _open_array(tmp_dir, 'attention_mask', np.int8, (rows_count, max_length))
+    lengths = _open_array(tmp_dir, 'lengths', np.int32, (rows_count,))
+
+    # tokens of every row fill its first `length` positions, the rest is padding
+    lengths[:] = encoded_corpus.lengths
+    attention_mask[:] = np.arange(max_length) < lengths[:, None]
+    input_ids[:] = tokenizer.pad_token_id
+    input_ids[attention_mask.astype(bool)] = encoded_corpus.input_ids
+
+    np.save(f"{tmp_dir}/labels.npy", labels)
+
+    if windowed:
+        np.save(f"{tmp_dir}/{WINDOW_OFFSETS_ARRAY}.npy", window_offsets)
+
+    for array in [input_ids, attention_mask, lengths]:
+        array.flush()
+
+    with open(f"{tmp_dir}/{META_FILE}", "w") as f:
+        json.dump({'key': key, 'rows_count': rows_count, 'texts_count': len(labels), 'max_length': max_length, 'windowed': windowed}, f)
+
+    shutil.rmtree(corpus_dir, ignore_errors=True)
+    os.replace(tmp_dir, corpus_dir)
+
+    return True
+
+
+def _open_array(corpus_dir, name, dtype, shape):
+    return np.lib.format.open_memmap(f"{corpus_dir}/{name}.npy", mode="w+", dtype=dtype, shape=shape)
+
+
+def _read_meta(corpus_dir):
+    meta_filepath = f"{corpus_dir}/{META_FILE}"
+
+    if not os.path.exists(meta_filepath):
+        return {}
+
+    with open(meta_filepath, "r") as f:
+        return json.load(f)
+
+
+class CorpusDataset(Dataset):
+    """
+    Serves samples of a corpus saved by `build_corpus`. Returned tensors are views of
+    memory-mapped files, so samples are not copied and DataLoader workers share the same pages.
+    A sample of a windowed corpus has all windows of its text, `input_ids` and `attention_mask`
+    have a row per window.
+    """
+
+    def __init__(self, corpus_dir):
+        meta = _read_meta(corpus_dir)
+
+        self.corpus_dir = corpus_dir
+        # corpora saved before windows were added have a row per text
+        self.texts_count = meta.get('texts_count', meta['rows_count'])
+        self.windowed = meta.get('windowed', False)
+        self.arrays = None
+
+    def __len__(self):
+        return self.texts_count
+
+    def __getitem__(self, idx):
+        arrays = self._get_arrays()
+        rows = slice(*arrays[WINDOW_OFFSETS_ARRAY][idx:idx + 2]) if self.windowed else idx
+
+        return {
+            'input_ids': torch.from_numpy(arrays['input_ids'][rows]),
+            'attention_mask': torch.from_numpy(arrays['attention_mask'][rows]),
+            'labels': torch.from_numpy(arrays['labels'][idx]),
+        }
+
+    def get_lengths(self):
+        # numbers of tokens of texts without padding, of all their windows in a windowed corpus
+        lengths = self._get_arrays()['lengths']
+
+        if not self.windowed:
+            return lengths
+
+        return np.add.reduceat(lengths, self._get_arrays()[WINDOW_OFFSETS_ARRAY][:-1])
+
+    def __getstate__(self):
+        # workers open files themselves, instead of receiving pickled copies of the arrays
+        state = self.__dict__.copy()
+        state['arrays'] = None
+
+        return state
+
+    def _get_arrays(self):
+        if self.arrays is None:
+            # copy-on-write mapping, torch needs writable arrays, but they are never written
+            self.arrays = {
+                name: np.load(f"{self.corpus_dir}/{name}.npy", mmap_mode="c")
+                for name in CORPUS_ARRAYS + ([WINDOW_OFFSETS_ARRAY] if self.windowed else [])
+            }
+
+        return self.arrays
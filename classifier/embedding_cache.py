@@ -0,0 +1,157 @@
+#
+# This code caches encoder embeddings of problem statements on disk, so classifying the same
+# statement again (re-scrapes, duplicates across sources, re-evaluations) runs only the classifier head.
+#
+# Embeddings are stored in a memory-mapped float16 matrix, a side index maps hashes of normalized texts
+# to its rows. The cache is cleared, when it was filled by another checkpoint.
+#
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+CACHE_MAX_ENTRIES = 100000
+KEY_SIZE = 16
+
+# the matrix of embeddings and its side index, all of them have a row per cache slot
+EMBEDDINGS_ARRAY = 'embeddings'
+KEYS_ARRAY = 'keys'
+# tick of the last use of every slot, 0 marks free slots
+LAST_USED_ARRAY = 'last_used'
+META_FILE = "meta.json"
+
+
+def normalize_text(text) -> str:
+    # whitespace doesn't change tokens, so statements differing only in whitespace share an entry
+    return " ".join(str(text).split())
+
+
+def get_text_key(text) -> bytes:
+    return hashlib.blake2b(normalize_text(text).encode(), digest_size=KEY_SIZE).digest()
+
+
+class EmbeddingCache:
+    """
+    Persistent cache of embeddings of at most `max_entries` texts, least recently used
+    entries are evicted to make room for new ones. A cache is used by a single process.
+
+    :param checkpoint_id: id of the model and of encoding settings, which made the embeddings,
+        entries of another checkpoint are dropped when the cache is opened
+    """
+
+    def __init__(self, cache_dir, checkpoint_id, dim, max_entries=CACHE_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.checkpoint_id = checkpoint_id
+        self.dim = dim
+        self.max_entries = max_entries
+        self.hits_count = 0
+        self.misses_count = 0
+
+        meta = {'checkpoint_id': checkpoint_id, 'dim': dim, 'max_entries': max_entries}
+
+        if _read_meta(cache_dir) != meta:
+            self._create(meta)
+
+        self.embeddings = np.load(f"{cache_dir}/{EMBEDDINGS_ARRAY}.npy", mmap_mode="r+")
+        self.keys = np.load(f"{cache_dir}/{KEYS_ARRAY}.npy", mmap_mode="r+")
+        self.last_used = np.load(f"{cache_dir}/{LAST_USED_ARRAY}.npy", mmap_mode="r+")
+
+        used_slots = np.flatnonzero(self.last_used)
+        self.slots = dict(zip(_to_keys(self.keys[used_slots]), used_slots.tolist()))
+        self.tick = int(self.last_used.max(initial=0))
+
+    def __len__(self):
+        return len(self.slots)
+
+    def get(self, keys):
+        """
+        :return: float32 embeddings with a row per key, rows of missing keys are zeros,
+            and a mask of found keys
+        """
+        self.tick += 1
+        slots = np.array([self.slots.get(key, -1) for key in keys], dtype=np.int64)
+        found = slots >= 0
+
+        embeddings = np.zeros((len(keys), self.dim), dtype=np.float32)
+        embeddings[found] = self.embeddings[slots[found]]
+        self.last_used[slots[found]] = self.tick
+
+        self.hits_count += int(found.sum())
+        self.misses_count += int((~found).sum())
+
+        return embeddings, found
+
+    def put(self, keys, embeddings):
+        """
+        :param keys: keys, which are not in the cache yet
+        """
+        keys = list(keys)[-self.max_entries:]
+        embeddings = embeddings[len(embeddings) - len(keys):]
+
+        if not keys:
+            return
+
+        self.tick += 1
+        slots = self._get_free_slots(len(keys))
+
+        self.embeddings[slots] = embeddings
+        self.keys[slots] = np.frombuffer(b"".join(keys), dtype=np.uint8).reshape(-1, KEY_SIZE)
+        self.last_used[slots] = self.tick
+        self.slots.update(zip(keys, slots.tolist()))
+
+        for array in [self.embeddings, self.keys, self.last_used]:
+            array.flush()
+
+    def _get_free_slots(self, count):
+        free_slots = np.flatnonzero(self.last_used == 0)
+
+        if len(free_slots) >= count:
+            return free_slots[:count]
+
+        # least recently used entries are evicted
+        evicted_count = count - len(free_slots)
+        evicted_slots = np.argpartition(np.where(self.last_used == 0, np.iinfo(np.int64).max, self.last_used), evicted_count - 1)[:evicted_count]
+
+        for key in _to_keys(self.keys[evicted_slots]):
+            del self.slots[key]
+
+        self.last_used[evicted_slots] = 0
+
+        return np.concatenate([free_slots, evicted_slots])
+
+    def _create(self, meta):
+        tmp_dir = f"{self.cache_dir}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        for name, dtype, shape in [
+            (EMBEDDINGS_ARRAY, np.float16, (self.max_entries, self.dim)),
+            # bytes of keys, numpy bytes strings would drop trailing zero bytes
+            (KEYS_ARRAY, np.uint8, (self.max_entries, KEY_SIZE)),
+            (LAST_USED_ARRAY, np.int64, (self.max_entries,)),
+        ]:
+            array = np.lib.format.open_memmap(f"{tmp_dir}/{name}.npy", mode="w+", dtype=dtype, shape=shape)
+            array.flush()
+
+        with open(f"{tmp_dir}/{META_FILE}", "w") as f:
+            json.dump(meta, f)
+
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.replace(tmp_dir, self.cache_dir)
+
+
+def _to_keys(keys_array):
+    return [row.tobytes() for row in keys_array]
+
+
+def _read_meta(cache_dir):
+    meta_filepath = f"{cache_dir}/{META_FILE}"
+
+    if not os.path.exists(meta_filepath):
+        return {}
+
+    with open(meta_filepath, "r") as f:
+        return json.load(f)
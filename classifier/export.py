@@ -0,0 +1,148 @@
+#
+# This code exports the trained model for CPU inference: a dynamically quantized (INT8) PyTorch
+# model and an ONNX graph optimized by onnxruntime, optionally with INT8 weights.
+# Exported models are saved to the model directory and used by Predictor backends.
+#
+# Usage: python -m classifier.export [--model ./model] [--onnx-int8] [--check] [--val-rows N]
+#
+# --check compares macro-F1 of every exported backend with the fp32 model on the validation split
+# and fails, when F1 drops by more than MAX_F1_DROP.
+#
+
+import argparse
+import sys
+
+import joblib
+import torch
+from transformers import AutoConfig, AutoModelForSequenceClassification
+
+from classifier.metrics import multi_labels_metrics
+from classifier.predict import MODEL_DIR, ONNX_INT8_MODEL_FILE, ONNX_MODEL_FILE, QUANTIZED_MODEL_FILE, Predictor
+from data_manager.preprocess import PREPROCESSED_DATA_FILE, unpack_labels
+from data_manager.utils import get_dataset_filepath
+
+ONNX_OPSET_VERSION = 17
+MAX_F1_DROP = 0.01
+
+
+class _LogitsModel(torch.nn.Module):
+    # the exported graph takes token ids and the attention mask, and returns only logits
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+def export_quantized(model_dir=MODEL_DIR):
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir).eval()
+    quantized_model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    torch.save(quantized_model, f"{model_dir}/{QUANTIZED_MODEL_FILE}")
+
+
+def export_onnx(model_dir=MODEL_DIR, int8=False):
+    # onnx and onnxruntime are needed only for ONNX export
+    from onnx import TensorProto
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from onnxruntime.transformers.optimizer import optimize_model
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    config = AutoConfig.from_pretrained(model_dir)
+    onnx_filepath = f"{model_dir}/{ONNX_MODEL_FILE}"
+
+    # the example mask has padding, otherwise the traced graph would skip masking
+    input_ids = torch.ones((2, 8), dtype=torch.long)
+    attention_mask = torch.ones((2, 8), dtype=torch.long)
+    attention_mask[1, 4:] = 0
+
+    torch.onnx.export(
+        _LogitsModel(model).eval(),
+        (input_ids, attention_mask),
+        onnx_filepath,
+        input_names=['input_ids', 'attention_mask'],
+        output_names=['logits'],
+        dynamic_axes={
+            'input_ids': {0: 'batch', 1: 'sequence'},
+            'attention_mask': {0: 'batch', 1: 'sequence'},
+            'logits': {0: 'batch'},
+        },
+        opset_version=ONNX_OPSET_VERSION,
+        dynamo=False,
+    )
+
+    # fuses attention and layer normalization subgraphs of BERT
+    optimized_model = optimize_model(
+        onnx_filepath,
+        model_type='bert',
+        num_heads=config.num_attention_heads,
+        hidden_size=config.hidden_size,
+    )
+    optimized_model.save_model_to_file(onnx_filepath)
+
+    if int8:
+        # shape inference doesn't know types of fused onnxruntime operators, they are all float
+        quantize_dynamic(
+            onnx_filepath,
+            f"{model_dir}/{ONNX_INT8_MODEL_FILE}",
+            weight_type=QuantType.QInt8,
+            extra_options={'DefaultTensorType': TensorProto.FLOAT},
+        )
+
+
+def check_accuracy(model_dir, backends, texts, labels, mlb_filepath=None, max_f1_drop=MAX_F1_DROP) -> bool:
+    """
+    Compares macro-F1 of `backends` with the fp32 torch model, with the same metric as training uses.
+
+    :return: True when no backend has F1 lower by more than `max_f1_drop`
+    """
+    reference_f1 = None
+    is_passed = True
+
+    for backend in ['torch'] + [b for b in backends if b != 'torch']:
+        predictor = Predictor(model_dir, mlb_filepath=mlb_filepath, backend=backend)
+        f1 = multi_labels_metrics(predictor.predict_logits(texts), labels)['f1']
+
+        if reference_f1 is None:
+            reference_f1 = f1
+
+        f1_drop = reference_f1 - f1
+        is_backend_passed = f1_drop <= max_f1_drop
+        is_passed = is_passed and is_backend_passed
+
+        print(f"{backend:<12} macro-F1 {f1:.4f} (drop {f1_drop:+.4f}) {'OK' if is_backend_passed else 'REGRESSION'}")
+
+    return is_passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the trained model for CPU inference")
+    parser.add_argument('--model', default=MODEL_DIR)
+    parser.add_argument('--onnx-int8', action='store_true', help="also export ONNX graph with INT8 weights")
+    parser.add_argument('--check', action='store_true', help="check macro-F1 of exported backends on the validation split")
+    parser.add_argument('--val-rows', type=int, default=None, help="check only this many validation problems")
+    args = parser.parse_args()
+
+    print("Exporting dynamically quantized PyTorch model...")
+    export_quantized(args.model)
+
+    print("Exporting ONNX graph...")
+    export_onnx(args.model, int8=args.onnx_int8)
+
+    if not args.check:
+        return
+
+    data = joblib.load(get_dataset_filepath(PREPROCESSED_DATA_FILE))
+    texts = data["val_texts"][:args.val_rows]
+    labels = unpack_labels(data["val_labels"], data["labels_count"])[:args.val_rows]
+    backends = ['torch-int8', 'onnx'] + (['onnx-int8'] if args.onnx_int8 else [])
+
+    print(f"Checking macro-F1 on {len(texts)} validation problems...")
+
+    if not check_accuracy(args.model, backends, texts, labels):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
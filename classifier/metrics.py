@@ -0,0 +1,49 @@
+#
+# Multi-label classification metrics, shared by training, the exported backends check and baselines
+#
+
+import numpy as np
+from scipy.special import expit
+from sklearn.metrics import roc_auc_score, f1_score, hamming_loss
+
+from data_manager.utils import PROBLEM_LABELS, masks_to_matrix
+
+
+def multi_labels_metrics(predictions, labels, threshold=0.3, label_names=None):
+    """
+    :param predictions: logits with a row per problem
+    :param labels: binary matrix of true labels, with columns in the order of predictions,
+        or label bitmasks of problems.parquet, with the bit i for PROBLEM_LABELS[i]
+    :param label_names: labels of prediction columns (`mlb.classes_`), needed with label bitmasks
+    """
+    probs = expit(np.asarray(predictions, dtype=np.float32))
+
+    y_pred = np.zeros(probs.shape)
+    y_pred[np.where(probs >= threshold)] = 1
+    y_true = labels if np.ndim(labels) != 1 else _masks_to_columns(labels, label_names)
+
+    f1 = f1_score(y_true, y_pred, average='macro')
+    roc_auc = roc_auc_score(y_true, y_pred, average='macro')
+    hamming = hamming_loss(y_true, y_pred)
+
+    metrics = {
+        "roc_auc": roc_auc,
+        "hamming_loss": hamming,
+        "f1": f1
+    }
+
+    return metrics
+
+
+def _masks_to_columns(masks, label_names):
+    if label_names is None:
+        raise ValueError("label_names of prediction columns are needed with label bitmasks")
+
+    bits = {label: bit for bit, label in enumerate(PROBLEM_LABELS)}
+    unknown_labels = set(label_names) - set(bits)
+
+    if unknown_labels:
+        raise ValueError(f"unknown labels: {sorted(unknown_labels)}")
+
+    # bits of masks are in PROBLEM_LABELS order, columns of predictions in the order of label_names
+    return masks_to_matrix(masks, len(PROBLEM_LABELS))[:, [bits[label] for label in label_names]]
@@ -0,0 +1,332 @@
+#
+# This code classifies problem statements with the trained model on CPU.
+# Texts are sorted by length and classified in micro-batches, padded only to their longest text.
+#
+# Usage: python -m classifier.predict [--input problems.jsonl] [--model ./model] [--backend torch] [--pooling max] [--threshold 0.5] [--thresholds thresholds.json]
+#
+# Backends other than "torch" use models made by `python -m classifier.export`.
+# With --pooling long texts are classified in overlapping windows instead of being truncated.
+# With --cache-dir embeddings of texts are cached, texts classified before run only the classifier head.
+# Every input line is a JSON string or a JSON object with a "description" field,
+# labels of every problem are printed as a JSON list per line.
+#
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Union
+
+import joblib
+import numpy as np
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+from classifier.constants import DEFAULT_THRESHOLD, MODEL_DIR
+from classifier.embedding_cache import CACHE_MAX_ENTRIES, EmbeddingCache, get_text_key
+from classifier.thresholds import get_thresholds
+from classifier.tokenization import MAX_LENGTH, encode_corpus
+from classifier.windows import MAX_WINDOWS, POOLINGS, WINDOW_OVERLAP, pool_logits, split_into_windows
+from data_manager.preprocess import MLB_FILE
+from data_manager.problem_types import ProblemLabel
+from data_manager.utils import get_dataset_filepath
+
+INFERENCE_BATCH_SIZE = 32
+# padded tokens of a batch, long texts are classified in smaller batches
+INFERENCE_BATCH_TOKENS = 2048
+
+# backends and files of their models in the model directory
+BACKENDS = ['torch', 'torch-int8', 'onnx', 'onnx-int8']
+# backends running the encoder and the classifier head separately, which can use the embedding cache
+TORCH_BACKENDS = ['torch', 'torch-int8']
+QUANTIZED_MODEL_FILE = "model.int8.pt"
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model.int8.onnx"
+
+
+class Predictor:
+    def __init__(self, model_dir=MODEL_DIR, mlb_filepath=None, batch_size=INFERENCE_BATCH_SIZE, max_batch_tokens=INFERENCE_BATCH_TOKENS,
+                 thresholds: Union[float, Dict[str, float]] = DEFAULT_THRESHOLD, max_length=MAX_LENGTH, num_threads=None, backend='torch',
+                 pooling: Optional[str] = None, overlap=WINDOW_OVERLAP, max_windows=MAX_WINDOWS,
+                 cache_dir: Optional[str] = None, cache_max_entries=CACHE_MAX_ENTRIES):
+        """
+        :param batch_size: max number of texts classified at once
+        :param max_batch_tokens: max number of tokens of a batch, padding included
+        :param thresholds: probability threshold of all labels, or thresholds of some labels,
+            other labels have DEFAULT_THRESHOLD
+        :param num_threads: number of inference threads, torch/onnxruntime default when None
+        :param backend: one of BACKENDS
+        :param pooling: one of POOLINGS to split long texts into windows and pool their logits, None truncates texts
+        :param cache_dir: directory of the EmbeddingCache of pooled encoder outputs of BERT, None disables the cache.
+            Needs one of TORCH_BACKENDS, windows can be pooled only by 'mean' with the cache
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"unknown backend {backend}, expected one of {BACKENDS}")
+
+        if pooling is not None and pooling not in POOLINGS:
+            raise ValueError(f"unknown pooling {pooling}, expected one of {POOLINGS}")
+
+        if cache_dir is not None and (backend not in TORCH_BACKENDS or pooling == 'max'):
+            raise ValueError(f"embedding cache needs one of {TORCH_BACKENDS} backends and no max pooling")
+
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+
+        self.backend = backend
+        self.torch_model = None
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.run_model = self._load_model(model_dir, backend, num_threads)
+        self.mlb = joblib.load(mlb_filepath or get_dataset_filepath(MLB_FILE))
+        self.label_names = np.array(self.mlb.classes_, dtype=object)
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_length = max_length
+        self.thresholds = get_thresholds(thresholds, self.label_names)
+        self.pooling = pooling
+        self.overlap = overlap
+        self.max_windows = max_windows
+        self.embedding_cache = None
+
+        if cache_dir is not None:
+            self.embedding_cache = EmbeddingCache(
+                cache_dir, self._get_checkpoint_id(model_dir), self.torch_model.config.hidden_size, max_entries=cache_max_entries
+            )
+
+    def predict(self, texts) -> List[List[ProblemLabel]]:
+        predicted = self.predict_proba(texts) >= self.thresholds
+
+        return [self.label_names[row].tolist() for row in predicted]
+
+    def predict_proba(self, texts) -> np.ndarray:
+        """
+        :return: probabilities of labels with a row per text, columns are in `mlb.classes_` order
+        """
+        return 1 / (1 + np.exp(-self.predict_logits(texts)))
+
+    def predict_logits(self, texts) -> np.ndarray:
+        if self.embedding_cache is None:
+            return self._run_texts(texts, self.run_model)
+
+        keys = [get_text_key(text) for text in texts]
+        embeddings, found = self.embedding_cache.get(keys)
+
+        # texts missing from the cache, a text repeated in `texts` is encoded once
+        missing_indices = {}
+
+        for idx in np.flatnonzero(~found):
+            missing_indices.setdefault(keys[idx], []).append(idx)
+
+        if missing_indices:
+            texts_to_encode = [texts[indices[0]] for indices in missing_indices.values()]
+            # rounded like cached embeddings, so logits don't depend on cache hits
+            missing_embeddings = self._run_texts(texts_to_encode, self._run_encoder).astype(np.float16)
+            self.embedding_cache.put(list(missing_indices), missing_embeddings)
+
+            for indices, embedding in zip(missing_indices.values(), missing_embeddings):
+                embeddings[indices] = embedding
+
+        return self._run_head(embeddings)
+
+    def _run_texts(self, texts, run):
+        """
+        :param run: function returning outputs of a padded batch of token ids, e.g. `run_model`
+        :return: outputs with a row per text
+        """
+        if self.pooling is None:
+            return self._run_encoded(encode_corpus(texts, self.tokenizer, max_length=self.max_length), run)
+
+        encoded_corpus = encode_corpus(texts, self.tokenizer, max_length=None)
+        windows, window_offsets = split_into_windows(encoded_corpus, self.max_length, overlap=self.overlap, max_windows=self.max_windows)
+
+        # windows of all texts are batched together, like texts are
+        return pool_logits(self._run_encoded(windows, run), window_offsets, self.pooling)
+
+    def _run_encoded(self, encoded_corpus, run):
+        lengths = encoded_corpus.lengths
+        outputs = None
+
+        # texts of similar length are classified together, so batches have little padding
+        order = np.argsort(lengths, kind="stable")
+
+        for batch_index in self._get_batches(order, lengths):
+            input_ids, attention_mask = self._pad_batch(encoded_corpus, batch_index, int(lengths[batch_index].max()))
+            batch_outputs = run(input_ids, attention_mask)
+
+            if outputs is None:
+                outputs = np.zeros((len(encoded_corpus), batch_outputs.shape[1]), dtype=np.float32)
+
+            outputs[batch_index] = batch_outputs
+
+        if outputs is None:
+            return np.zeros((0, len(self.label_names)), dtype=np.float32)
+
+        return outputs
+
+    def _run_encoder(self, input_ids, attention_mask):
+        with torch.inference_mode():
+            outputs = self.torch_model.base_model(input_ids=torch.from_numpy(input_ids), attention_mask=torch.from_numpy(attention_mask))
+
+            return outputs.pooler_output.numpy()
+
+    def _run_head(self, embeddings):
+        # BERT classifier head, dropout is disabled in eval mode
+        with torch.inference_mode():
+            return self.torch_model.classifier(torch.from_numpy(embeddings)).numpy()
+
+    def _get_checkpoint_id(self, model_dir):
+        # cached embeddings change with weights of the model and with encoding of texts
+        if self.backend == 'torch':
+            model_files = sorted(glob.glob(f"{model_dir}/*.safetensors") + glob.glob(f"{model_dir}/*.bin"))
+        else:
+            model_files = [f"{model_dir}/{QUANTIZED_MODEL_FILE}"]
+
+        model_files_stats = [
+            [os.path.basename(filepath), os.stat(filepath).st_size, os.stat(filepath).st_mtime_ns]
+            for filepath in model_files + [f"{model_dir}/config.json"]
+        ]
+        settings = [self.backend, self.max_length, self.pooling, self.overlap, self.max_windows]
+
+        return hashlib.sha256(json.dumps([model_files_stats, settings]).encode()).hexdigest()
+
+    def _load_model(self, model_dir, backend, num_threads):
+        """
+        :return: function, which returns logits of a padded batch of token ids
+        """
+        if backend in ['torch', 'torch-int8']:
+            if backend == 'torch':
+                model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+            else:
+                # a whole pickled module, quantized modules can't be loaded from a state dict
+                model = torch.load(f"{model_dir}/{QUANTIZED_MODEL_FILE}", weights_only=False)
+
+            model.eval()
+            self.torch_model = model
+
+            def run_torch_model(input_ids, attention_mask):
+                with torch.inference_mode():
+                    return model(input_ids=torch.from_numpy(input_ids), attention_mask=torch.from_numpy(attention_mask)).logits.numpy()
+
+            return run_torch_model
+
+        # onnxruntime is needed only for ONNX backends
+        import onnxruntime
+
+        session_options = onnxruntime.SessionOptions()
+
+        if num_threads is not None:
+            session_options.intra_op_num_threads = num_threads
+
+        model_file = ONNX_MODEL_FILE if backend == 'onnx' else ONNX_INT8_MODEL_FILE
+        session = onnxruntime.InferenceSession(f"{model_dir}/{model_file}", session_options, providers=['CPUExecutionProvider'])
+
+        def run_onnx_model(input_ids, attention_mask):
+            return session.run(['logits'], {'input_ids': input_ids, 'attention_mask': attention_mask})[0]
+
+        return run_onnx_model
+
+    def _get_batches(self, order, lengths):
+        # texts are sorted by length, so the last text of a batch is the longest one
+        start = 0
+
+        while start < len(order):
+            end = start + 1
+
+            while (end < len(order) and end - start < self.batch_size
+                   and (end - start + 1) * lengths[order[end]] <= self.max_batch_tokens):
+                end += 1
+
+            yield order[start:end]
+            start = end
+
+    def _pad_batch(self, encoded_corpus, batch_index, max_length):
+        input_ids = np.full((len(batch_index), max_length), self.tokenizer.pad_token_id, dtype=np.int64)
+        attention_mask = np.zeros((len(batch_index), max_length), dtype=np.int64)
+
+        for row, idx in enumerate(batch_index):
+            text_ids = encoded_corpus[idx]
+            input_ids[row, :len(text_ids)] = text_ids
+            attention_mask[row, :len(text_ids)] = 1
+
+        return input_ids, attention_mask
+
+
+@lru_cache(maxsize=None)
+def get_predictor(model_dir=MODEL_DIR, backend='torch') -> Predictor:
+    # the model is loaded once per process
+    return Predictor(model_dir, backend=backend)
+
+
+def predict(texts, model_dir=MODEL_DIR, backend='torch') -> List[List[ProblemLabel]]:
+    return get_predictor(model_dir, backend).predict(texts)
+
+
+def _read_texts(lines) -> List[str]:
+    texts = []
+
+    for line in lines:
+        if not line.strip():
+            continue
+
+        value = json.loads(line)
+        texts.append(value['description'] if isinstance(value, dict) else value)
+
+    return texts
+
+
+def _read_thresholds(thresholds_filepath: Optional[str], threshold: float):
+    if thresholds_filepath is None:
+        return threshold
+
+    with open(thresholds_filepath, "r") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify problem statements with the trained model")
+    parser.add_argument('--input', default=None, help="JSONL file with problem statements, stdin by default")
+    parser.add_argument('--model', default=MODEL_DIR)
+    parser.add_argument('--backend', choices=BACKENDS, default='torch')
+    parser.add_argument('--mlb', default=None, help=f"fitted MultiLabelBinarizer, dataset/{MLB_FILE} by default")
+    parser.add_argument('--batch-size', type=int, default=INFERENCE_BATCH_SIZE)
+    parser.add_argument('--max-batch-tokens', type=int, default=INFERENCE_BATCH_TOKENS)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="threshold of all labels")
+    parser.add_argument('--thresholds', default=None, help="JSON file with a threshold per label")
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--pooling', choices=POOLINGS, default=None, help="classify long texts in overlapping windows pooled this way")
+    parser.add_argument('--cache-dir', default=None, help="directory of the embedding cache")
+    args = parser.parse_args(argv)
+
+    predictor = Predictor(
+        args.model,
+        mlb_filepath=args.mlb,
+        batch_size=args.batch_size,
+        max_batch_tokens=args.max_batch_tokens,
+        thresholds=_read_thresholds(args.thresholds, args.threshold),
+        num_threads=args.threads,
+        backend=args.backend,
+        pooling=args.pooling,
+        cache_dir=args.cache_dir,
+    )
+
+    if args.input is None:
+        texts = _read_texts(sys.stdin)
+    else:
+        with open(args.input, "r", encoding="utf-8") as f:
+            texts = _read_texts(f)
+
+    start = time.perf_counter()
+    predicted_labels = predictor.predict(texts)
+    elapsed = time.perf_counter() - start
+
+    for labels in predicted_labels:
+        print(json.dumps(labels))
+
+    print(f"Classified {len(texts)} problems in {elapsed:.2f}s ({len(texts) / max(elapsed, 1e-9):.1f} problems/sec)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
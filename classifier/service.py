@@ -0,0 +1,194 @@
+#
+# This code serves the trained classifier over HTTP. Concurrent requests are collected into
+# micro-batches, which are classified by a dedicated inference thread.
+#
+# Usage: python -m classifier.service [--model ./model] [--backend torch] [--cache-dir ./dataset/embedding_cache] [--port 8080] [--max-batch-size 32] [--max-wait-ms 10]
+#
+# POST /classify with {"description": "..."} returns {"labels": [...]},
+# GET /stats returns request latency percentiles and the batch size histogram.
+#
+
+import argparse
+import asyncio
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from aiohttp import web
+
+from classifier.predict import BACKENDS, DEFAULT_THRESHOLD, INFERENCE_BATCH_SIZE, INFERENCE_BATCH_TOKENS, MODEL_DIR, Predictor
+
+MAX_WAIT_MS = 10
+# latency percentiles are computed over this many last requests
+LATENCY_WINDOW = 10000
+
+
+class ServiceStats:
+    def __init__(self, latency_window=LATENCY_WINDOW):
+        self.latencies = deque(maxlen=latency_window)
+        self.batch_sizes = Counter()
+        self.requests_count = 0
+
+    def add_batch(self, batch_size):
+        self.batch_sizes[batch_size] += 1
+
+    def add_request(self, latency):
+        self.latencies.append(latency)
+        self.requests_count += 1
+
+    def to_dict(self):
+        latencies_ms = np.array(self.latencies) * 1000
+
+        return {
+            'requests': self.requests_count,
+            'latency_ms': {
+                'p50': float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else None,
+                'p99': float(np.percentile(latencies_ms, 99)) if len(latencies_ms) else None,
+            },
+            'batch_sizes': {str(size): count for size, count in sorted(self.batch_sizes.items())},
+        }
+
+
+class MicroBatcher:
+    """
+    Collects texts of concurrent requests into a batch, until it has `max_batch_size` texts or
+    `max_wait` seconds pass since its first text. While a batch is classified, next requests
+    are collected into the next batch.
+    """
+
+    def __init__(self, predictor, max_batch_size=INFERENCE_BATCH_SIZE, max_wait=MAX_WAIT_MS / 1000, stats=None):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.stats = stats or ServiceStats()
+
+        self.queue = asyncio.Queue()
+        # the model is used by a single thread, so batches never compete for CPU cores
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+        self.executor.shutdown(wait=True)
+
+    async def classify(self, text):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, future))
+
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+
+                if timeout <= 0:
+                    break
+
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            self.stats.add_batch(len(batch))
+
+            try:
+                predicted_labels = await loop.run_in_executor(self.executor, self.predictor.predict, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+                continue
+
+            for (_, future), labels in zip(batch, predicted_labels):
+                # the request may be cancelled, when its client disconnects
+                if not future.done():
+                    future.set_result(labels)
+
+
+def make_app(batcher: MicroBatcher) -> web.Application:
+    async def classify(request):
+        start = time.perf_counter()
+
+        try:
+            body = await request.json()
+            description = body['description']
+        except (ValueError, KeyError, TypeError):
+            raise web.HTTPBadRequest(text='expected JSON object with a "description" field')
+
+        if not isinstance(description, str):
+            raise web.HTTPBadRequest(text='"description" must be a string')
+
+        labels = await batcher.classify(description)
+        batcher.stats.add_request(time.perf_counter() - start)
+
+        return web.json_response({'labels': labels})
+
+    async def stats(request):
+        return web.json_response(batcher.stats.to_dict())
+
+    async def on_startup(app):
+        batcher.start()
+
+    async def on_cleanup(app):
+        await batcher.stop()
+
+    app = web.Application()
+    app.router.add_post('/classify', classify)
+    app.router.add_get('/stats', stats)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the trained classifier over HTTP")
+    parser.add_argument('--model', default=MODEL_DIR)
+    parser.add_argument('--backend', choices=BACKENDS, default='torch')
+    parser.add_argument('--mlb', default=None)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-batch-size', type=int, default=INFERENCE_BATCH_SIZE)
+    parser.add_argument('--max-batch-tokens', type=int, default=INFERENCE_BATCH_TOKENS)
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--cache-dir', default=None, help="directory of the embedding cache")
+    args = parser.parse_args()
+
+    predictor = Predictor(
+        args.model,
+        mlb_filepath=args.mlb,
+        batch_size=args.max_batch_size,
+        max_batch_tokens=args.max_batch_tokens,
+        thresholds=args.threshold,
+        num_threads=args.threads,
+        backend=args.backend,
+        cache_dir=args.cache_dir,
+    )
+
+    batcher = MicroBatcher(predictor, max_batch_size=args.max_batch_size, max_wait=args.max_wait_ms / 1000)
+    web.run_app(make_app(batcher), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
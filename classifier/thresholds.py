@@ -0,0 +1,25 @@
+#
+# Per-label thresholds of predicted probabilities, shared by the BERT predictor and the baseline.
+#
+
+from typing import Dict, Union
+
+import numpy as np
+
+from classifier.constants import DEFAULT_THRESHOLD
+
+
+def get_thresholds(thresholds: Union[float, Dict[str, float]], label_names) -> np.ndarray:
+    """
+    :param thresholds: a threshold of all labels, or thresholds of some labels, DEFAULT_THRESHOLD of the others
+    :return: threshold of every label, in the order of `label_names`
+    """
+    if not isinstance(thresholds, dict):
+        return np.full(len(label_names), thresholds, dtype=np.float32)
+
+    unknown_labels = set(thresholds) - set(label_names)
+
+    if unknown_labels:
+        raise ValueError(f"thresholds of unknown labels: {sorted(unknown_labels)}")
+
+    return np.array([thresholds.get(label, DEFAULT_THRESHOLD) for label in label_names], dtype=np.float32)
@@ -0,0 +1,71 @@
+#
+# This code encodes whole lists of texts with batched tokenizer calls.
+# Fast (Rust-backed) tokenizers release the GIL, so batches are encoded by several threads.
+#
+
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+MAX_LENGTH = 512
+ENCODING_BATCH_SIZE = 1000
+
+
+@dataclass
+class EncodedCorpus:
+    """
+    Token ids of all texts without padding, concatenated into one array.
+    Tokens of the text `i` are `input_ids[offsets[i]:offsets[i + 1]]`.
+    """
+    input_ids: np.ndarray
+    offsets: np.ndarray
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        return self.input_ids[self.offsets[idx]:self.offsets[idx + 1]]
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+
+def encode_corpus(texts, tokenizer, batch_size=ENCODING_BATCH_SIZE, num_workers=None, max_length=MAX_LENGTH) -> EncodedCorpus:
+    """
+    :param batch_size: number of texts encoded by a single tokenizer call
+    :param num_workers: number of threads encoding batches, all CPU cores by default
+    :param max_length: texts are truncated to this number of tokens, special tokens included, None disables truncation
+    """
+    texts = [str(text) for text in texts]
+
+    def encode_batch(start):
+        encoding = tokenizer(
+            texts[start:start + batch_size],
+            truncation=max_length is not None,
+            max_length=max_length,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+        )
+
+        return encoding['input_ids']
+
+    starts = range(0, len(texts), batch_size)
+
+    if len(starts) <= 1:
+        # e.g. a few texts of an inference request, starting threads would take longer
+        batches = [encode_batch(start) for start in starts]
+    else:
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            batches = list(executor.map(encode_batch, starts))
+
+    ids = list(itertools.chain.from_iterable(batches))
+    lengths = np.fromiter((len(text_ids) for text_ids in ids), dtype=np.int64, count=len(ids))
+    offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    input_ids = np.fromiter(itertools.chain.from_iterable(ids), dtype=np.int32, count=int(offsets[-1]))
+
+    return EncodedCorpus(input_ids, offsets)
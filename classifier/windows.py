@@ -0,0 +1,89 @@
+#
+# This code splits long encoded texts into overlapping windows, so the model sees whole problem
+# statements instead of their first MAX_LENGTH tokens, and pools logits of windows per problem.
+#
+
+from typing import Tuple
+
+import numpy as np
+import torch
+
+from classifier.tokenization import MAX_LENGTH, EncodedCorpus
+
+# min number of tokens shared by neighbouring windows of a text
+WINDOW_OVERLAP = 128
+# longer texts are covered by this many windows, which overlap less or skip some tokens
+MAX_WINDOWS = 4
+POOLINGS = ['max', 'mean']
+
+
+def split_into_windows(encoded_corpus: EncodedCorpus, max_length=MAX_LENGTH, overlap=WINDOW_OVERLAP,
+                       max_windows=MAX_WINDOWS) -> Tuple[EncodedCorpus, np.ndarray]:
+    """
+    Splits texts encoded without truncation into windows of at most `max_length` tokens. Every window
+    starts and ends with the first and the last (special) token of its text, like a BERT input does.
+    Windows of a text are evenly spaced and the last one ends with the text, so all windows of
+    a long text are full and only texts shorter than `max_length` need padding.
+
+    :return: windows, and offsets of windows of every text,
+        windows of the text `i` are `window_offsets[i]:window_offsets[i + 1]`
+    """
+    texts_count = len(encoded_corpus)
+    body_max_length = max_length - 2
+    # tokens of every text without its first and last tokens
+    body_lengths = encoded_corpus.lengths - 2
+
+    # windows count of a text, the windows overlap by at least `overlap` tokens, when it isn't capped
+    extra_lengths = np.maximum(body_lengths - body_max_length, 0)
+    windows_counts = np.minimum(-(-extra_lengths // (body_max_length - overlap)) + 1, max_windows)
+
+    window_offsets = np.zeros(texts_count + 1, dtype=np.int64)
+    np.cumsum(windows_counts, out=window_offsets[1:])
+
+    # text of every window and the index of the window inside its text
+    window_texts = np.repeat(np.arange(texts_count), windows_counts)
+    window_positions = np.arange(window_offsets[-1]) - window_offsets[:-1][window_texts]
+
+    starts = np.rint(
+        window_positions * extra_lengths[window_texts] / np.maximum(windows_counts[window_texts] - 1, 1)
+    ).astype(np.int64)
+    window_lengths = np.minimum(body_lengths, body_max_length)[window_texts] + 2
+
+    offsets = np.zeros(len(window_lengths) + 1, dtype=np.int64)
+    np.cumsum(window_lengths, out=offsets[1:])
+
+    # token `p` of a window is the token `start + p` of its text, except the first and the last ones
+    token_positions = np.arange(offsets[-1]) - np.repeat(offsets[:-1], window_lengths)
+    text_positions = np.repeat(starts, window_lengths) + token_positions
+    text_positions[offsets[:-1]] = 0
+    text_positions[offsets[1:] - 1] = np.repeat(encoded_corpus.lengths - 1, windows_counts)
+
+    input_ids = encoded_corpus.input_ids[np.repeat(encoded_corpus.offsets[:-1][window_texts], window_lengths) + text_positions]
+
+    return EncodedCorpus(input_ids, offsets), window_offsets
+
+
+def pool_logits(logits: np.ndarray, window_offsets: np.ndarray, pooling) -> np.ndarray:
+    """
+    :param logits: logits of windows, windows of every text are consecutive rows
+    :return: logits of texts
+    """
+    if len(window_offsets) <= 1:
+        return np.zeros((0,) + logits.shape[1:], dtype=logits.dtype)
+
+    if pooling == 'max':
+        return np.maximum.reduceat(logits, window_offsets[:-1], axis=0)
+
+    return np.add.reduceat(logits, window_offsets[:-1], axis=0) / np.diff(window_offsets)[:, None]
+
+
+def pool_window_logits(logits: torch.Tensor, window_problems: torch.Tensor, problems_count, pooling) -> torch.Tensor:
+    """
+    Differentiable pooling of a training batch.
+
+    :param window_problems: index of the problem of every window in the batch
+    """
+    pooled = logits.new_zeros((problems_count, logits.shape[1]))
+    index = window_problems[:, None].expand_as(logits)
+
+    return pooled.scatter_reduce(0, index, logits, reduce='amax' if pooling == 'max' else 'mean', include_self=False)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+#
+# Command line interface of the classifier with a subcommand per task.
+# Subcommands import their dependencies (torch, transformers, datasets, matplotlib, bs4, requests)
+# only when they run, so `--help` and light tasks start without paying for heavy imports.
+#
+# Usage: python cpclassify.py {load,scrape,format,plot,train,predict} [options]
+#
+# load, scrape, format and plot run stages of data_manager/prepare_dataset.py, skipping stages
+# whose inputs haven't changed. Options after `predict` are options of `python -m classifier.predict`.
+#
+
+import argparse
+import os
+import sys
+
+# stages of prepare_dataset.py run by every dataset command
+COMMAND_STAGES = {
+    'load': ['load'],
+    'scrape': ['scrape'],
+    'format': ['format', 'dedup', 'preprocess'],
+    'plot': ['plot'],
+}
+COMMAND_HELPS = {
+    'load': "download the Codeforces and LeetCode datasets",
+    'scrape': "scrape SPOJ problems",
+    'format': "format the datasets, remove near-duplicate problems and split them for training",
+    'plot': "plot figures of the dataset",
+    'train': "fine-tune BERT with train_bert.py",
+    'predict': "classify problem statements, see `cpclassify predict --help`",
+}
+TRAIN_SCRIPT = f"{os.path.dirname(os.path.abspath(__file__))}/train_bert.py"
+
+
+def run_dataset_command(args, _):
+    import time
+
+    from data_manager.prepare_dataset import get_stages
+    from data_manager.stages import STAGE_WORKERS, print_summary, run_stages, select_stages
+
+    stages = get_stages()
+
+    start = time.perf_counter()
+    results = run_stages(stages, select_stages(stages, only=COMMAND_STAGES[args.command]), workers=args.workers or STAGE_WORKERS, force=args.force)
+    print_summary(results, time.perf_counter() - start)
+
+    return 0 if all(result.status in ('done', 'skipped') for result in results) else 1
+
+
+def run_train(args, _):
+    import runpy
+
+    runpy.run_path(TRAIN_SCRIPT, run_name="__main__")
+
+    return 0
+
+
+def run_predict(args, predict_argv):
+    from classifier.predict import main
+
+    main(predict_argv)
+
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cpclassify", description="Competitive programming problems classifier")
+    commands = parser.add_subparsers(dest='command', required=True, metavar='command')
+
+    for command in COMMAND_STAGES:
+        command_parser = commands.add_parser(command, help=COMMAND_HELPS[command], description=COMMAND_HELPS[command])
+        command_parser.add_argument('--force', action='store_true', help="run stages even when their inputs haven't changed")
+        command_parser.add_argument('--workers', type=int, default=None, help="number of stages run at once, 4 by default")
+        command_parser.set_defaults(run=run_dataset_command)
+
+    commands.add_parser('train', help=COMMAND_HELPS['train']).set_defaults(run=run_train)
+    # options of predict, --help too, are parsed by classifier.predict
+    commands.add_parser('predict', help=COMMAND_HELPS['predict'], add_help=False).set_defaults(run=run_predict)
+
+    args, rest = parser.parse_known_args(argv)
+
+    if rest and args.command != 'predict':
+        parser.error(f"unrecognized arguments: {' '.join(rest)}")
+
+    return args.run(args, rest)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#
+# This code caches formatted datasets on disk, so that unchanged sources are not formatted again.
+# Cache entries are addressed by a hash of everything the formatted dataset depends on.
+#
+
+import glob
+import hashlib
+import json
+import os
+import threading
+
+import pandas as pd
+
+from data_manager.utils import get_dataset_filepath, read_dataset, write_dataset
+
+CACHE_DIR_NAME = "cache"
+FILE_DIGESTS_FILENAME = "file_digests.json"
+
+HASHING_BLOCK_SIZE = 1024 * 1024
+
+# digests are updated by stages running in threads
+_file_digests_lock = threading.Lock()
+
+# directory of cache files, dataset/cache when None, benchmarks set it to a temporary directory
+cache_dir = None
+
+
+def _get_cache_filepath(cache_filename: str) -> str:
+    if cache_dir is None:
+        return get_dataset_filepath(f"{CACHE_DIR_NAME}/{cache_filename}")
+
+    os.makedirs(cache_dir, exist_ok=True)
+
+    return f"{cache_dir}/{cache_filename}"
+
+
+def _compute_file_digest(filepath: str) -> str:
+    digest = hashlib.sha256()
+
+    with open(filepath, "rb") as f:
+        while block := f.read(HASHING_BLOCK_SIZE):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def get_file_digest(filepath: str) -> str:
+    """
+    Returns sha256 of the file content. Digests are remembered together with the file
+    size and modification time, so big raw datasets are hashed only after they change.
+    """
+    with _file_digests_lock:
+        digests_filepath = _get_cache_filepath(FILE_DIGESTS_FILENAME)
+        digests = {}
+
+        if os.path.exists(digests_filepath):
+            with open(digests_filepath, "r") as f:
+                digests = json.load(f)
+
+        stat = os.stat(filepath)
+        filepath = os.path.abspath(filepath)
+        saved = digests.get(filepath)
+
+        if saved is not None and saved['size'] == stat.st_size and saved['mtime_ns'] == stat.st_mtime_ns:
+            return saved['digest']
+
+        digest = _compute_file_digest(filepath)
+        digests[filepath] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': digest}
+
+        tmp_filepath = f"{digests_filepath}.tmp"
+
+        with open(tmp_filepath, "w") as f:
+            json.dump(digests, f, indent=4)
+
+        os.replace(tmp_filepath, digests_filepath)
+
+    return digest
+
+
+def get_modules_digest(modules) -> str:
+    digest = hashlib.sha256()
+
+    for module in modules:
+        digest.update(_compute_file_digest(module.__file__).encode())
+
+    return digest.hexdigest()
+
+
+def make_cache_key(key_parts: dict) -> str:
+    serialized_key_parts = json.dumps(key_parts, sort_keys=True, default=str)
+
+    return hashlib.sha256(serialized_key_parts.encode()).hexdigest()
+
+
+def load_formatted_dataset(name: str, cache_key: str):
+    cache_filepath = _get_cache_filepath(f"{name}-{cache_key}.parquet")
+
+    if not os.path.exists(cache_filepath):
+        return None
+
+    return read_dataset(cache_filepath)
+
+
+def save_formatted_dataset(name: str, cache_key: str, formatted_df: pd.DataFrame):
+    cache_filepath = _get_cache_filepath(f"{name}-{cache_key}.parquet")
+
+    # cache entries made with other keys are outdated
+    for outdated_filepath in glob.glob(_get_cache_filepath(f"{name}-*.parquet")):
+        os.remove(outdated_filepath)
+
+    write_dataset(formatted_df, cache_filepath)
+
+
+def load_cached_json(name: str, cache_key: str):
+    cache_filepath = _get_cache_filepath(f"{name}-{cache_key}.json")
+
+    if not os.path.exists(cache_filepath):
+        return None
+
+    with open(cache_filepath, "r") as f:
+        return json.load(f)
+
+
+def save_cached_json(name: str, cache_key: str, data):
+    cache_filepath = _get_cache_filepath(f"{name}-{cache_key}.json")
+
+    for outdated_filepath in glob.glob(_get_cache_filepath(f"{name}-*.json")):
+        os.remove(outdated_filepath)
+
+    with open(cache_filepath, "w") as f:
+        json.dump(data, f, indent=4)
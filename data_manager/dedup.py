@@ -0,0 +1,207 @@
+#
+# This code finds near-duplicate problems (e.g. the same classic problem on Codeforces, LeetCode and SPOJ),
+# so duplicates don't leak across the training/validation split.
+#
+# Descriptions are normalized and split into word shingles, MinHash signatures of their shingle sets
+# are computed with NumPy, and problems sharing a band of their signatures (LSH) are compared,
+# so the work grows linearly with the number of problems instead of quadratically.
+#
+
+import json
+import re
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from data_manager.utils import get_dataset_filepath
+
+SHINGLE_SIZE = 3
+PERMUTATIONS_COUNT = 128
+# signatures are split into bands of BAND_SIZE values, problems sharing a band are candidates
+BAND_SIZE = 4
+# min estimated Jaccard similarity of shingle sets of duplicates
+SIMILARITY_THRESHOLD = 0.7
+SIGNATURE_SEED = 42
+
+# problems and permutations hashed at once, hashes of a chunk take
+# about DEDUP_CHUNK_SIZE * <shingles per problem> * PERMUTATIONS_BLOCK_SIZE * 8 bytes
+DEDUP_CHUNK_SIZE = 1000
+PERMUTATIONS_BLOCK_SIZE = 32
+# candidate pairs compared at once
+PAIRS_CHUNK_SIZE = 100000
+# all pairs of problems of a bucket are candidates up to this bucket size, problems of bigger buckets
+# are paired with the first problem of the bucket, so they don't make quadratic pairs
+MAX_ALL_PAIRS_BUCKET_SIZE = 16
+
+DUPLICATES_REPORT_FILE = "duplicates.json"
+
+# signature of problems without words, they are never duplicates
+EMPTY_SIGNATURE_VALUE = np.iinfo(np.uint32).max
+# odd multiplier combining hashes of words of a shingle
+SHINGLE_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+# "\n<field> = " tags of fields merged into descriptions by formatters, e.g. "\ninput_format = "
+FIELD_TAG_PATTERN = re.compile(r"\n[a-z_]+ = ")
+
+
+def get_shingle_hashes(texts: pd.Series):
+    """
+    :return: 32-bit hashes of word shingles of all texts, and offsets of shingles of every text,
+        shingles of the text `i` are `hashes[offsets[i]:offsets[i + 1]]`. A text shorter than
+        SHINGLE_SIZE words has a single shingle of all its words.
+    """
+    # normalized words: lowercase letters and digits, field tags, markup and punctuation are dropped
+    words = texts.fillna("").str.replace(FIELD_TAG_PATTERN, " ", regex=True).str.lower().str.findall(r"[a-z0-9]+")
+    words_counts = words.str.len().to_numpy(dtype=np.int64)
+    word_hashes = pd.util.hash_array(np.array([word for text_words in words for word in text_words], dtype=object))
+
+    word_offsets = np.zeros(len(words_counts) + 1, dtype=np.int64)
+    np.cumsum(words_counts, out=word_offsets[1:])
+
+    shingles_counts = np.where(words_counts > 0, np.maximum(words_counts - SHINGLE_SIZE + 1, 1), 0)
+    offsets = np.zeros(len(words_counts) + 1, dtype=np.int64)
+    np.cumsum(shingles_counts, out=offsets[1:])
+
+    # first word and number of words of every shingle
+    shingle_texts = np.repeat(np.arange(len(words_counts)), shingles_counts)
+    starts = word_offsets[:-1][shingle_texts] + np.arange(offsets[-1]) - offsets[:-1][shingle_texts]
+    lengths = np.minimum(words_counts[shingle_texts], SHINGLE_SIZE)
+
+    hashes = np.zeros(offsets[-1], dtype=np.uint64)
+
+    for position in range(SHINGLE_SIZE):
+        is_in_shingle = position < lengths
+        word_hash = word_hashes[np.where(is_in_shingle, starts + position, 0)] if len(word_hashes) else 0
+        hashes = np.where(is_in_shingle, hashes * SHINGLE_HASH_MULTIPLIER + word_hash, hashes)
+
+    return ((hashes >> np.uint64(32)) ^ hashes).astype(np.uint32), offsets
+
+
+def compute_signatures(texts: pd.Series, permutations_count=PERMUTATIONS_COUNT, seed=SIGNATURE_SEED, chunk_size=DEDUP_CHUNK_SIZE) -> np.ndarray:
+    """
+    MinHash signatures of shingle sets of texts, with a row per text. Every permutation is
+    a multiply-shift hash `(a * x + b) >> 32` of 32-bit shingle hashes in 64-bit arithmetic.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 63, size=permutations_count, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=permutations_count, dtype=np.uint64)
+
+    signatures = np.full((len(texts), permutations_count), EMPTY_SIGNATURE_VALUE, dtype=np.uint32)
+
+    for start in range(0, len(texts), chunk_size):
+        hashes, offsets = get_shingle_hashes(texts.iloc[start:start + chunk_size])
+        has_shingles = np.diff(offsets) > 0
+
+        if not has_shingles.any():
+            continue
+
+        rows = start + np.flatnonzero(has_shingles)
+        x = hashes.astype(np.uint64)
+
+        for block_start in range(0, permutations_count, PERMUTATIONS_BLOCK_SIZE):
+            block = slice(block_start, block_start + PERMUTATIONS_BLOCK_SIZE)
+            permuted = (a[block, None] * x + b[block, None]) >> np.uint64(32)
+
+            signatures[rows, block] = np.minimum.reduceat(permuted, offsets[:-1][has_shingles], axis=1).T
+
+    return signatures
+
+
+def find_candidate_pairs(signatures: np.ndarray, band_size=BAND_SIZE, max_all_pairs_bucket_size=MAX_ALL_PAIRS_BUCKET_SIZE) -> np.ndarray:
+    """
+    :return: pairs of rows sharing at least one band of signatures, all pairs of problems of buckets
+        of up to `max_all_pairs_bucket_size` problems, and every problem of a bigger bucket paired with
+        the first problem of the bucket
+    """
+    rows = np.flatnonzero(signatures[:, 0] != EMPTY_SIGNATURE_VALUE)
+    multipliers = np.random.default_rng(SIGNATURE_SEED).integers(1, 2 ** 63, size=band_size, dtype=np.uint64) | np.uint64(1)
+    pairs = []
+
+    for band_start in range(0, signatures.shape[1] - band_size + 1, band_size):
+        band = signatures[rows, band_start:band_start + band_size].astype(np.uint64)
+        # colliding keys only add candidates, which are filtered by similarity
+        keys = (band * multipliers).sum(axis=1)
+
+        # stable sort keeps rows of a bucket in ascending order
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        is_bucket_start = np.ones(len(order), dtype=bool)
+        is_bucket_start[1:] = sorted_keys[1:] != sorted_keys[:-1]
+
+        bucket_starts = np.flatnonzero(is_bucket_start)
+        bucket_sizes = np.diff(bucket_starts, append=len(order))
+        bucket_ids = np.cumsum(is_bucket_start) - 1
+        is_small = bucket_sizes[bucket_ids] <= max_all_pairs_bucket_size
+
+        # every problem of a small bucket is paired with the problems `distance` positions after it
+        small_sizes = bucket_sizes[bucket_sizes <= max_all_pairs_bucket_size]
+        for distance in range(1, small_sizes.max() if len(small_sizes) else 0):
+            starts = np.flatnonzero(is_small[:-distance] & (bucket_ids[:-distance] == bucket_ids[distance:]))
+            pairs.append(np.stack([rows[order[starts]], rows[order[starts + distance]]], axis=1))
+
+        firsts = order[bucket_starts[bucket_ids]]
+        is_paired = ~is_bucket_start & ~is_small
+        pairs.append(np.stack([rows[firsts[is_paired]], rows[order[is_paired]]], axis=1))
+
+    if not pairs:
+        return np.zeros((0, 2), dtype=np.int64)
+
+    return np.unique(np.concatenate(pairs), axis=0)
+
+
+def find_duplicate_clusters(texts: pd.Series, threshold=SIMILARITY_THRESHOLD, band_size=BAND_SIZE) -> np.ndarray:
+    """
+    :return: cluster id of every text, texts with the same id are near-duplicates
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    signatures = compute_signatures(texts)
+    pairs = find_candidate_pairs(signatures, band_size=band_size)
+
+    # share of equal signature values estimates Jaccard similarity of shingle sets
+    similarities = np.concatenate([
+        (signatures[pairs[start:start + PAIRS_CHUNK_SIZE, 0]] == signatures[pairs[start:start + PAIRS_CHUNK_SIZE, 1]]).mean(axis=1)
+        for start in range(0, len(pairs), PAIRS_CHUNK_SIZE)
+    ] or [np.zeros(0)])
+    edges = pairs[similarities >= threshold]
+
+    graph = coo_matrix((np.ones(len(edges), dtype=np.int8), (edges[:, 0], edges[:, 1])), shape=(len(texts), len(texts)))
+    _, cluster_ids = connected_components(graph, directed=False)
+
+    return cluster_ids
+
+
+def deduplicate_problems(problems_df: pd.DataFrame, threshold=SIMILARITY_THRESHOLD, report_filepath=None) -> pd.DataFrame:
+    """
+    Keeps the first problem of every cluster of near-duplicate descriptions and writes clusters
+    of more than one problem to `report_filepath`, dataset/duplicates.json by default.
+    """
+    cluster_ids = find_duplicate_clusters(problems_df['description'], threshold=threshold)
+    _, first_rows, cluster_sizes = np.unique(cluster_ids, return_index=True, return_counts=True)
+
+    clusters = _get_clusters(problems_df, cluster_ids, cluster_sizes)
+
+    with open(report_filepath or get_dataset_filepath(DUPLICATES_REPORT_FILE), "w") as f:
+        json.dump(clusters, f, indent=4, ensure_ascii=False)
+
+    cross_source_count = sum(len({problem['source'] for problem in cluster}) > 1 for cluster in clusters)
+    removed_count = len(problems_df) - len(first_rows)
+    print(f"Found {len(clusters)} clusters of near-duplicate problems ({cross_source_count} across sources), removed {removed_count} problems")
+
+    return problems_df.iloc[np.sort(first_rows)]
+
+
+def _get_clusters(problems_df, cluster_ids, cluster_sizes) -> List[List[dict]]:
+    duplicate_rows = np.flatnonzero(cluster_sizes[cluster_ids] > 1)
+    # rows of a cluster are consecutive and in the dataset order
+    duplicate_rows = duplicate_rows[np.argsort(cluster_ids[duplicate_rows], kind="stable")]
+    cluster_starts = np.flatnonzero(np.diff(cluster_ids[duplicate_rows], prepend=-1))
+
+    sources = problems_df['source'].to_numpy()
+    titles = problems_df['title'].to_numpy()
+
+    return [
+        [{'row': int(row), 'source': sources[row], 'title': titles[row]} for row in rows]
+        for rows in np.split(duplicate_rows, cluster_starts[1:])
+    ] if len(duplicate_rows) else []
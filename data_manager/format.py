@@ -2,112 +2,224 @@
 # This code maps dataset from huggingface to desired format for training
 #
 
+import sys
+from collections import Counter
+
 import pandas as pd
-import ast
-from bs4 import BeautifulSoup  
-from utils import get_dataset_filepath, convert_codeforces_labels, convert_leetcode_labels
+from data_manager import cache, html_cleaner, problem_types, utils
+from data_manager.cache import get_file_digest, get_modules_digest, make_cache_key, load_formatted_dataset, save_formatted_dataset
+from data_manager.html_cleaner import clean_html_column, HTML_CLEANING_CHUNK_SIZE
+from data_manager.problem_types import codeforces_to_standard, leetcode_to_standard, spoj_to_standard
+from data_manager.utils import (
+    get_dataset_filepath, read_dataset, iter_json_records, convert_labels_to_masks, count_mask_labels, masks_to_labels,
+    CODEFORCES_LABEL_TABLE, LEETCODE_LABEL_TABLE, SPOJ_LABEL_TABLE
+)
 
 MAX_PROBLEM_DESCRIPTION_LENGTH = 6000
 MAX_LABELS_COUNT = 7
+SPOJ_BATCH_SIZE = 1000
+# number of the most common unknown tags printed after formatting
+REPORTED_UNKNOWN_TAGS_COUNT = 10
+FORMATTED_COLUMNS = ['source', 'title', 'description', 'labels', 'label_mask']
 
 class Formatter:
+    source = None
+    labels_map = None
+    # labels_map compiled into label bitmasks
+    label_table = None
+
     def __init__(self, dataset_filepath):
         self.dataset_filepath = dataset_filepath
+        self.unknown_tags = Counter()
+
+    def format(self, use_cache=True):
+        if use_cache:
+            cache_key = self._get_cache_key()
+            formatted_df = load_formatted_dataset(self.source, cache_key)
+
+            if formatted_df is not None:
+                return formatted_df
+
+        # tags missing in labels_map are skipped and reported, instead of failing the whole run
+        self.unknown_tags = Counter()
+        formatted_df = self._format()
+        self._report_unknown_tags()
+
+        if use_cache:
+            save_formatted_dataset(self.source, cache_key, formatted_df)
+
+        return formatted_df
+
+    def _report_unknown_tags(self):
+        if not self.unknown_tags:
+            return
+
+        most_common = ", ".join(f"{tag!r} ({count})" for tag, count in self.unknown_tags.most_common(REPORTED_UNKNOWN_TAGS_COUNT))
+        print(f"{self.source}: skipped {self.unknown_tags.total()} unknown tags ({len(self.unknown_tags)} distinct), most common: {most_common}")
+
+    def _get_cache_key(self):
+        # formatted dataset must be made again, when any of these parts changes
+        return make_cache_key({
+            'source': self.source,
+            'dataset': get_file_digest(self.dataset_filepath),
+            'code': get_modules_digest([sys.modules[__name__], cache, html_cleaner, problem_types, utils]),
+            'labels_map': self.labels_map,
+            'max_problem_description_length': MAX_PROBLEM_DESCRIPTION_LENGTH,
+            'max_labels_count': MAX_LABELS_COUNT,
+        })
 
-    def format(self):
-        loaded_df = pd.read_csv(self.dataset_filepath)
-        loaded_df['labels'] = loaded_df['labels'].apply(ast.literal_eval)
+    def _format(self):
+        loaded_df = read_dataset(self.dataset_filepath)
+
+        return self._format_df(loaded_df)
+
+    def _format_df(self, loaded_df):
+        # every step works on whole columns, rows are dropped with a single mask at the end
+        label_masks = convert_labels_to_masks(loaded_df['labels'], self.label_table, self.unknown_tags)
+        description = self._get_descriptions(loaded_df)
+
+        labels_count = pd.Series(count_mask_labels(label_masks), index=loaded_df.index)
+        description_length = description.str.len()
+
+        mask = (
+            (labels_count > 0)
+            & (labels_count <= MAX_LABELS_COUNT)
+            & description.notna()
+            & (description_length > 0)
+            & (description_length <= MAX_PROBLEM_DESCRIPTION_LENGTH)
+            & loaded_df['title'].notna()
+        )
+
+        mask = mask.to_numpy()
+        index = loaded_df.index[mask]
+
+        # lists of labels are made only for kept rows, `label_mask` keeps their bitmasks
+        return pd.DataFrame({
+            'source': self.source,
+            'title': loaded_df['title'][mask],
+            'description': description[mask],
+            'labels': masks_to_labels(label_masks[mask], index=index),
+            'label_mask': label_masks[mask],
+        }, index=index, columns=FORMATTED_COLUMNS)
+
+    def _get_descriptions(self, loaded_df):
+        raise NotImplementedError()
 
-        loaded_df = loaded_df.apply(self._format_row, axis=1)
-        loaded_df = loaded_df.dropna()
+    def _merge_descriptions(self, loaded_df, fields):
+        # every present field is appended to the description as "\n<field> = <text>"
+        result = loaded_df['description'].str.replace('\n', ' ')
 
-        return loaded_df
+        for field in fields:
+            text = loaded_df[field].str.replace('\n', ' ')
+            result = result + (f"\n{field} = " + text).fillna('')
 
-    def _format_row(self, row):
-        raise NotImplementedError()
+        return result
 
 
 class OpenR1CodeforcesFormatter(Formatter):
+    source = 'codeforces'
+    labels_map = codeforces_to_standard
+    label_table = CODEFORCES_LABEL_TABLE
+
     def __init__(self):
-        dataset_filepath = get_dataset_filepath(f"huggingface/open-r1_codeforces.csv")
+        dataset_filepath = get_dataset_filepath(f"huggingface/open-r1_codeforces.parquet")
         super().__init__(dataset_filepath)
 
-    def _format_row(self, row):
-        labels = convert_codeforces_labels(row['labels'])
+    def _get_descriptions(self, loaded_df):
+        return self._merge_descriptions(loaded_df, ['input_format', 'output_format', 'interaction_format', 'note'])
 
-        if len(labels) == 0 or len(labels) > MAX_LABELS_COUNT:
-            return None
 
-        description = self._get_description(row)
+class KaysssLeetcodeFormatter(Formatter):
+    source = 'leetcode'
+    labels_map = leetcode_to_standard
+    label_table = LEETCODE_LABEL_TABLE
+
+    def __init__(self, workers=None, chunk_size=HTML_CLEANING_CHUNK_SIZE, fast_html_cleaning=False):
+        """
+        :param workers: number of processes cleaning HTML descriptions, all CPU cores by default
+        :param chunk_size: number of descriptions cleaned by a process at once
+        :param fast_html_cleaning: strip tags with a streaming parser instead of BeautifulSoup
+        """
+        dataset_filepath = get_dataset_filepath(f"huggingface/kaysss_leetcode-problem-detailed.parquet")
+        super().__init__(dataset_filepath)
 
-        if not description or len(description) > MAX_PROBLEM_DESCRIPTION_LENGTH:
-            return None
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.fast_html_cleaning = fast_html_cleaning
 
-        return pd.Series({
-            'source': 'codeforces',
-            'title': row['title'],
-            'description': description,
-            'labels': labels,
+    def _get_cache_key(self):
+        return make_cache_key({
+            'formatter': super()._get_cache_key(),
+            'fast_html_cleaning': self.fast_html_cleaning,
         })
 
-    def _get_description(self, row):
-        if pd.isna(row['description']):
-            return None
+    def _get_descriptions(self, loaded_df):
+        raw_descriptions = loaded_df['description'].str.replace('\n', ' ')
 
-        result = row['description'].replace('\n', ' ')
-        fields = ['input_format', 'output_format', 'interaction_format', 'note']
+        return clean_html_column(
+            raw_descriptions,
+            workers=self.workers,
+            chunk_size=self.chunk_size,
+            fast=self.fast_html_cleaning,
+        )
 
-        for field in fields:
-            if not pd.isna(row[field]):
-                text = row[field].replace('\n', ' ')
-                result += f"\n{field} = {text}"
+class SpojFormatter(Formatter):
+    source = 'spoj'
+    labels_map = spoj_to_standard
+    label_table = SPOJ_LABEL_TABLE
 
-        return result
+    columns = ['title', 'tags', 'description', 'task_description', 'input_format', 'output_format']
+    description_fields = ['task_description', 'input_format', 'output_format']
 
+    def __init__(self, batch_size=SPOJ_BATCH_SIZE):
+        """
+        :param batch_size: number of scrapped problems formatted at once
+        """
+        super().__init__(get_dataset_filepath("scrapper/spoj.json"))
 
-class KaysssLeetcodeFormatter(Formatter):
-    def __init__(self):
-        dataset_filepath = get_dataset_filepath(f"huggingface/kaysss_leetcode-problem-detailed.csv")
-        super().__init__(dataset_filepath)
+        self.batch_size = batch_size
 
-    def _format_row(self, row):
-        labels = convert_leetcode_labels(row['labels'])
+    def _format(self):
+        # scrapped problems are streamed, so only one batch of them is held in memory
+        formatted_batches = [self._format_df(batch_df) for batch_df in self._read_batches()]
 
-        if len(labels) == 0 or len(labels) > MAX_LABELS_COUNT:
-            return None
+        if not formatted_batches:
+            # formatted empty batch has the same column types as formatted problems
+            return self._format_df(self._get_batch_df([], 0))
 
-        description = self._get_description(row)
+        return pd.concat(formatted_batches)
 
-        if not description or len(description) > MAX_PROBLEM_DESCRIPTION_LENGTH:
-            return None
+    def _read_batches(self):
+        batch = []
+        start = 0
 
-        return pd.Series({
-            'source': 'leetcode',
-            'title': row['title'],
-            'description': description,
-            'labels': labels,
-        })
+        for record in iter_json_records(self.dataset_filepath):
+            batch.append(record)
 
-    def _get_description(self, row):
-        
-        if pd.isna(row['description']):
-            return None
+            if len(batch) >= self.batch_size:
+                yield self._get_batch_df(batch, start)
+                start += len(batch)
+                batch = []
 
-        # Use BeautifulSoup to clean HTML tags
-        raw_description = row['description'].replace('\n', ' ')
-        clean_description = BeautifulSoup(raw_description, "html.parser").get_text()
-        # remove extra spaces
-        result = " ".join(clean_description.split())           
-        return result
+        if batch:
+            yield self._get_batch_df(batch, start)
 
-# TODO:
-class SpojFormatter(Formatter):
-    def __init__(self):
-        super().__init__("scrapper/spoj.json")
+    def _get_batch_df(self, batch, start):
+        batch_df = pd.DataFrame.from_records(batch, columns=self.columns, index=range(start, start + len(batch)))
+
+        return batch_df.rename(columns={'tags': 'labels'})
+
+    def _get_descriptions(self, loaded_df):
+        # scrapped sections are empty strings, when a problem does not have them
+        loaded_df = loaded_df.copy()
 
-    def _format_row(self, row):
-        pass
+        for field in ['description'] + self.description_fields:
+            text = loaded_df[field].str.strip()
+            loaded_df[field] = text.mask(text == '')
 
-    def _get_description(self, row):
-        pass
+        # problems without a preamble are kept, their description starts with the first present section,
+        # problems without any section are dropped
+        loaded_df['description'] = loaded_df['description'].fillna('')
+        descriptions = self._merge_descriptions(loaded_df, self.description_fields)
 
+        return descriptions.mask(descriptions == '')
@@ -0,0 +1,120 @@
+#
+# This code converts HTML problem descriptions to plain text using all CPU cores
+#
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+
+import pandas as pd
+
+from data_manager.utils import get_process_pool_context
+
+HTML_CLEANING_CHUNK_SIZE = 500
+
+# BeautifulSoup.get_text() doesn't return text of these tags
+SKIPPED_TAGS = {'script', 'style', 'template'}
+
+DECIMAL_REFERENCE_REGEX = re.compile(r"^([0-9]+)(.*)")
+HEX_REFERENCE_REGEX = re.compile(r"^([0-9a-fA-F]+)(.*)")
+
+
+class _TextExtractor(HTMLParser):
+    """
+    Streaming tag stripper, which collects text nodes the same way as
+    BeautifulSoup(html, "html.parser").get_text() does, without building a tree.
+    """
+
+    def __init__(self):
+        # references are resolved by handlers below, the same way BeautifulSoup resolves them
+        super().__init__(convert_charrefs=False)
+        self.parts = []
+        self.skipped_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skipped_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self.skipped_depth > 0:
+            self.skipped_depth -= 1
+
+    def handle_data(self, data):
+        if self.skipped_depth == 0:
+            self.parts.append(data)
+
+    def handle_entityref(self, name):
+        # bs4 is imported when descriptions are cleaned, so importing formatters is cheap
+        from bs4.dammit import EntitySubstitution
+
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self.handle_data(character if character is not None else f"&{name}")
+
+    def handle_charref(self, name):
+        if name[:1] in ('x', 'X'):
+            match = HEX_REFERENCE_REGEX.match(name[1:])
+            base = 16
+        else:
+            match = DECIMAL_REFERENCE_REGEX.match(name)
+            base = 10
+
+        if match is None:
+            self.handle_data(name)
+            return
+
+        from bs4.dammit import UnicodeDammit
+
+        character, _ = UnicodeDammit.numeric_character_reference(int(match.group(1), base))
+        self.handle_data(character + match.group(2))
+
+    def unknown_decl(self, data):
+        # CDATA sections are kept by BeautifulSoup.get_text()
+        if data.upper().startswith('CDATA['):
+            self.parts.append(data[len('CDATA['):])
+
+    def get_text(self):
+        return "".join(self.parts)
+
+
+def clean_html(raw_description, fast=False):
+    if fast:
+        parser = _TextExtractor()
+        parser.feed(raw_description)
+        parser.close()
+        clean_description = parser.get_text()
+    else:
+        from bs4 import BeautifulSoup
+
+        clean_description = BeautifulSoup(raw_description, "html.parser").get_text()
+
+    # remove extra spaces
+    return " ".join(clean_description.split())
+
+
+def _clean_html_chunk(raw_descriptions, fast):
+    return [clean_html(raw_description, fast) for raw_description in raw_descriptions]
+
+
+def clean_html_column(raw_descriptions: pd.Series, workers=None, chunk_size=HTML_CLEANING_CHUNK_SIZE, fast=False):
+    """
+    Cleans every non-null description of the column. The column is split into chunks
+    of `chunk_size` descriptions, which are cleaned by `workers` processes
+    (all CPU cores by default, 1 means cleaning in the current process).
+    """
+    not_null = raw_descriptions.dropna()
+    values = not_null.tolist()
+    workers = workers or os.cpu_count() or 1
+
+    chunks = [values[i:i + chunk_size] for i in range(0, len(values), chunk_size)]
+
+    if workers == 1 or len(chunks) <= 1:
+        cleaned_chunks = [_clean_html_chunk(chunk, fast) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=get_process_pool_context()) as executor:
+            cleaned_chunks = list(executor.map(_clean_html_chunk, chunks, [fast] * len(chunks)))
+
+    cleaned = [description for chunk in cleaned_chunks for description in chunk]
+    cleaned = pd.Series(cleaned, index=not_null.index, dtype=object)
+
+    return cleaned.reindex(raw_descriptions.index)
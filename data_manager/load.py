@@ -2,36 +2,97 @@
 # This code downloads datasets from huggingface and saves only needed columns
 #
 
-from datasets import load_dataset
 import pandas as pd
+import ast
 import os
+import tempfile
 import numpy as np
-from utils import get_dataset_filepath
+import pyarrow as pa
+import pyarrow.parquet as pq
+from data_manager.utils import get_dataset_filepath, write_dataset, write_dataset_parts
+
+STREAMING_BATCH_SIZE = 1000
+
+def _to_list(labels):
+    if isinstance(labels, np.ndarray):
+        return labels.tolist()
+
+    if isinstance(labels, str):
+        return ast.literal_eval(labels)
+
+    return labels
+
 
 class DatasetLoader:
+    # columns used by _map_row, other columns are never loaded
+    columns = None
+
     def __init__(self, dataset_name, dataset_filepath):
         self.dataset_name = dataset_name
         self.dataset_filepath = dataset_filepath
 
-    def download(self, force=False):
+    def download(self, force=False, export_csv=False, streaming=False, batch_size=STREAMING_BATCH_SIZE):
+        """
+        :param streaming: map the dataset batch by batch and write it incrementally,
+            so that memory usage doesn't depend on the dataset size
+        :param batch_size: number of rows mapped at once in streaming mode
+        """
         if os.path.exists(self.dataset_filepath):
             if force:
                 os.remove(self.dataset_filepath)
             else:
                 return
 
+        if streaming:
+            self._download_streaming(export_csv, batch_size)
+            return
+
         dataset_df = self._load()
         dataset_df = self._map(dataset_df)
-        dataset_df.to_csv(self.dataset_filepath, index=False)
+        write_dataset(dataset_df, self.dataset_filepath, export_csv=export_csv)
+
+    def _download_streaming(self, export_csv, batch_size):
+        dataset_dir = os.path.dirname(self.dataset_filepath)
+
+        # every mapped batch is written to its own part file, parts are merged at the end
+        with tempfile.TemporaryDirectory(dir=dataset_dir) as parts_dir:
+            part_filepaths = []
+
+            for batch_df in self._load_batches(batch_size):
+                part_filepath = f"{parts_dir}/part-{len(part_filepaths):05d}.parquet"
+                table = pa.Table.from_pandas(self._map(batch_df), preserve_index=False)
+                pq.write_table(table, part_filepath)
+                part_filepaths.append(part_filepath)
+
+            write_dataset_parts(part_filepaths, self.dataset_filepath, export_csv=export_csv)
+
+    def _load_batches(self, batch_size):
+        # imported here, datasets takes a second to import
+        from datasets import load_dataset
+
+        # datasets keeps the downloaded dataset in a memory-mapped Arrow cache,
+        # so only the current batch is held in memory
+        dataset = load_dataset(self.dataset_name)
+
+        for split in ["train", "test"]:
+            if split not in dataset:
+                continue
+
+            split_data = dataset[split].select_columns(self.columns)
+
+            for batch in split_data.iter(batch_size=batch_size):
+                yield pd.DataFrame(batch)
 
     def _load(self):
+        from datasets import load_dataset
+
         dataset = load_dataset(self.dataset_name)
 
-        train_data = dataset["train"]
+        train_data = dataset["train"].select_columns(self.columns)
         train_data_df = train_data.to_pandas()
 
         if 'test' in dataset:
-            test_data = dataset["test"]
+            test_data = dataset["test"].select_columns(self.columns)
             test_data_df = test_data.to_pandas()
 
             combined_df = pd.concat([train_data_df, test_data_df], ignore_index=True)
@@ -43,6 +104,9 @@ class DatasetLoader:
     def _map(self, loaded_df):
         result_df = loaded_df.apply(self._map_row, axis=1)
 
+        # labels are saved as a list column, so that readers don't need to parse them
+        result_df['labels'] = result_df['labels'].apply(_to_list)
+
         return result_df
 
     def _map_row(self, row):
@@ -50,20 +114,17 @@ class DatasetLoader:
 
 
 class OpenR1CodeforcesLoader(DatasetLoader):
+    columns = [
+        'id', 'title', 'tags', 'time_limit', 'memory_limit', 'description', 'input_format',
+        'output_format', 'interaction_format', 'note', 'examples',
+    ]
+
     def __init__(self):
         super().__init__(
             "open-r1/codeforces",
-            get_dataset_filepath("huggingface/open-r1_codeforces.csv")
+            get_dataset_filepath("huggingface/open-r1_codeforces.parquet")
         )
 
-    def _load(self):
-        df = super()._load()
-
-        # convert to list, so that tags will be saved in list format
-        df["tags"] = df["tags"].apply(lambda x: list(x) if isinstance(x, np.ndarray) else x)
-
-        return df
-
     def _map_row(self, row):
         return pd.Series({
             'id': row['id'],
@@ -81,10 +142,12 @@ class OpenR1CodeforcesLoader(DatasetLoader):
 
 
 class KaysssLeetcodeLoader(DatasetLoader):
+    columns = ['questionFrontendId', 'questionTitle', 'TitleSlug', 'topicTags', 'difficulty', 'content']
+
     def __init__(self):
         super().__init__(
             "kaysss/leetcode-problem-detailed",
-            get_dataset_filepath("huggingface/kaysss_leetcode-problem-detailed.csv")
+            get_dataset_filepath("huggingface/kaysss_leetcode-problem-detailed.parquet")
         )
 
     def _map_row(self, row):
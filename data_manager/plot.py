@@ -1,36 +1,144 @@
-import matplotlib.pyplot as plt
-import pandas as pd
+#
+# This code plots figures of the prepared dataset. Statistics of all figures are computed in a single
+# vectorized pass into DatasetStats, which is cached as JSON next to formatted datasets, and figures
+# are rendered from the statistics in a process pool with the non-interactive Agg backend.
+#
+# Usage: python -m data_manager.plot
+#
+
 import os
-import ast
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from data_manager import utils
+from data_manager.cache import get_file_digest, get_modules_digest, load_cached_json, make_cache_key, save_cached_json
+from data_manager.utils import PROBLEM_LABELS, compile_labels_map, convert_labels_to_masks, count_mask_labels, get_dataset_filepath, get_process_pool_context, masks_to_matrix, read_dataset
+
+FIGURES_DIR = f"{os.path.dirname(os.path.abspath(__file__))}/figures"
+STATS_CACHE_NAME = "plot_stats"
+# key of statistics of all sources
+TOTAL = "total"
+
+# converts lists of standard labels of datasets without the label_mask column
+STANDARD_LABEL_TABLE = compile_labels_map({label: [label] for label in PROBLEM_LABELS})
+
+
+@dataclass
+class DatasetStats:
+    """
+    Statistics of the dataset by source, histograms and label counts have also a TOTAL entry.
+
+    :param label_counts: number of problems with every label, labels without problems are omitted
+    :param labels_count_counts: the item i is the number of problems with i labels
+    :param description_length_histograms: 'counts' and bin 'edges' of description lengths
+    """
+    sources: List[str]
+    problems_counts: Dict[str, int]
+    label_counts: Dict[str, Dict[str, int]]
+    labels_count_counts: Dict[str, List[int]]
+    description_length_histograms: Dict[str, Dict[str, list]]
+
+
+def compute_stats(problems_df: pd.DataFrame) -> DatasetStats:
+    source_ids, sources = pd.factorize(problems_df['source'], sort=False)
+    sources = [str(source) for source in sources]
+
+    if 'label_mask' in problems_df:
+        masks = problems_df['label_mask'].to_numpy(dtype=utils.LABEL_MASK_DTYPE)
+    else:
+        masks = convert_labels_to_masks(problems_df['labels'], STANDARD_LABEL_TABLE)
+
+    # problems of a source are a contiguous slice of sorted rows
+    order = np.argsort(source_ids, kind="stable")
+    source_ends = np.cumsum(np.bincount(source_ids, minlength=len(sources)))
+    source_starts = source_ends - np.bincount(source_ids, minlength=len(sources))
+
+    label_matrix = masks_to_matrix(masks, len(PROBLEM_LABELS))
+    # number of problems with every label by source
+    source_label_counts = np.zeros((len(sources), len(PROBLEM_LABELS)), dtype=np.int64)
+    np.add.at(source_label_counts, source_ids, label_matrix)
+
+    labels_counts = count_mask_labels(masks).astype(np.int64)
+    max_labels_count = int(labels_counts.max(initial=0))
+    source_labels_count_counts = np.zeros((len(sources), max_labels_count + 1), dtype=np.int64)
+    np.add.at(source_labels_count_counts, (source_ids, labels_counts), 1)
 
-FIGURES_DIR_NAME = "figures"
+    # like str(description), missing descriptions are 'nan'
+    description_lengths = problems_df['description'].astype(str).str.len().to_numpy()[order]
 
-df = pd.read_csv('./dataset/problems.csv')
-df["description_length"] = df["description"].astype(str).apply(len)
-df["labels"] = df["labels"].apply(ast.literal_eval)
-df["label_count"] = df["labels"].apply(len)
+    keys = sources + [TOTAL]
+    label_counts_rows = list(source_label_counts) + [source_label_counts.sum(axis=0)]
+    labels_count_counts_rows = list(source_labels_count_counts) + [source_labels_count_counts.sum(axis=0)]
+    lengths = [description_lengths[start:end] for start, end in zip(source_starts, source_ends)] + [description_lengths]
 
-sources = df["source"].unique()
+    return DatasetStats(
+        sources=sources,
+        problems_counts={source: int(end - start) for source, start, end in zip(sources, source_starts, source_ends)},
+        label_counts={
+            key: {PROBLEM_LABELS[i]: int(count) for i, count in enumerate(row) if count > 0}
+            for key, row in zip(keys, label_counts_rows)
+        },
+        labels_count_counts={key: row.tolist() for key, row in zip(keys, labels_count_counts_rows)},
+        description_length_histograms={key: _get_histogram(key_lengths) for key, key_lengths in zip(keys, lengths)},
+    )
 
-def save_plot(plot_name):
-    file_name = f"{plot_name}.png"
-    file_path = f"./{FIGURES_DIR_NAME}/{file_name}"
 
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+def _get_histogram(values: np.ndarray):
+    counts, edges = np.histogram(values, bins='auto')
 
-    plt.savefig(file_path)
+    return {'counts': counts.tolist(), 'edges': edges.tolist()}
 
-    plt.close()
 
-def plot_problems_count_per_source():
-    plt.figure(figsize=(8, 6))
+def get_stats(dataset_filepath=None, use_cache=True) -> DatasetStats:
+    dataset_filepath = dataset_filepath or get_dataset_filepath('problems.parquet')
 
-    source_counts = df['source'].value_counts()
-    bars = plt.bar(source_counts.index, source_counts.values)
+    if not use_cache:
+        return compute_stats(read_dataset(dataset_filepath))
+
+    cache_key = make_cache_key({
+        'dataset': get_file_digest(dataset_filepath),
+        'code': get_modules_digest([sys.modules[__name__], utils]),
+    })
+    cached_stats = load_cached_json(STATS_CACHE_NAME, cache_key)
+
+    if cached_stats is not None:
+        return DatasetStats(**cached_stats)
+
+    stats = compute_stats(read_dataset(dataset_filepath))
+    save_cached_json(STATS_CACHE_NAME, cache_key, asdict(stats))
+
+    return stats
+
+
+def _new_figure(figsize=None):
+    # figures are drawn on their own Agg canvas, without the global pyplot state
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=figsize)
+
+    return figure, figure.add_subplot()
+
+
+def _save_figure(figure, figures_dir, plot_name):
+    os.makedirs(figures_dir, exist_ok=True)
+    figure.savefig(f"{figures_dir}/{plot_name}.png")
+
+
+def render_problems_count_per_source(problems_counts: Dict[str, int], figures_dir):
+    figure, ax = _new_figure(figsize=(8, 6))
+
+    # sources with more problems first, like value_counts()
+    source_counts = pd.Series(problems_counts).sort_values(ascending=False, kind="stable")
+    bars = ax.bar(source_counts.index, source_counts.values)
 
     for bar in bars:
         height = bar.get_height()
-        plt.text(
+        ax.text(
             bar.get_x() + bar.get_width() / 2,
             height,
             f'{int(height)}',
@@ -38,95 +146,115 @@ def plot_problems_count_per_source():
             va='bottom'
         )
 
-    plt.title('Number of Problems per Source')
-    plt.xlabel('Source')
-    plt.ylabel('Number of Problems')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
+    ax.set_title('Number of Problems per Source')
+    ax.set_xlabel('Source')
+    ax.set_ylabel('Number of Problems')
+    ax.tick_params(axis='x', labelrotation=45)
+    figure.tight_layout()
 
-    save_plot("problems_count_per_source")
+    _save_figure(figure, figures_dir, "problems_count_per_source")
 
-def plot_problems_per_description_length():
-    def plot_for_df(source_df, source = None):
-        if source is None:
-            title = "Total Description Length Distribution"
-            plot_name = "problems_per_description_length_total"
-        else:
-            title = f"Description Length Distribution for {source}"
-            plot_name = f"problems_per_description_length_for_{source}"
-
-        plt.figure()
-        plt.hist(source_df["description_length"], bins='auto', edgecolor="black")
-        plt.title(title)
-        plt.xlabel("Description Length")
-        plt.ylabel("Number of Problems")
-        plt.grid(True)
-        save_plot(plot_name)
-
-    for source in sources:
-        source_df = df[df["source"] == source]
-        plot_for_df(source_df, source)
-
-    plot_for_df(df)
-
-def plot_problems_count_per_label():
-    def plot_for_df(source_df, source = None):
-        if source is None:
-            title = "Total Label Distribution"
-            plot_name = "problems_count_per_label_total"
-        else:
-            title = f"Label Distribution for {source}"
-            plot_name = f"problems_count_per_label_for_{source}"
-
-        label_counts = source_df["labels"].value_counts().sort_values(ascending=True)
-
-        plt.figure(figsize=(10, 6))
-        label_counts.plot(kind="bar")
-        plt.title(title)
-        plt.xlabel("Label")
-        plt.ylabel("Number of Problems")
-        plt.xticks(rotation=45, ha="right")
-        plt.tight_layout()
-        plt.grid(True)
-        save_plot(plot_name)
-
-    exploded_df = df.explode("labels")
-
-    for source in sources:
-        source_df = exploded_df[exploded_df["source"] == source]
-        plot_for_df(source_df, source)
-
-    plot_for_df(exploded_df)
-
-def plot_labels_count_per_problem():
-    def plot_for_df(source_df, source = None):
-        if source is None:
-            title = "Total Label Count Distribution"
-            plot_name = "labels_count_per_problem_total"
+
+def render_description_length_histogram(histogram, title, plot_name, figures_dir):
+    figure, ax = _new_figure()
+
+    edges = np.array(histogram['edges'])
+    ax.hist(edges[:-1], bins=edges, weights=histogram['counts'], edgecolor="black")
+    ax.set_title(title)
+    ax.set_xlabel("Description Length")
+    ax.set_ylabel("Number of Problems")
+    ax.grid(True)
+
+    _save_figure(figure, figures_dir, plot_name)
+
+
+def render_label_counts(label_counts: Dict[str, int], title, plot_name, figures_dir):
+    figure, ax = _new_figure(figsize=(10, 6))
+
+    label_counts = pd.Series(label_counts, dtype=np.int64).sort_values(ascending=True)
+    ax.bar(label_counts.index, label_counts.values)
+    ax.set_title(title)
+    ax.set_xlabel("Label")
+    ax.set_ylabel("Number of Problems")
+    ax.tick_params(axis='x', labelrotation=45)
+
+    for tick_label in ax.get_xticklabels():
+        tick_label.set_horizontalalignment("right")
+
+    figure.tight_layout()
+    ax.grid(True)
+
+    _save_figure(figure, figures_dir, plot_name)
+
+
+def render_labels_count_counts(labels_count_counts: List[int], title, plot_name, figures_dir):
+    figure, ax = _new_figure(figsize=(8, 5))
+
+    # only numbers of labels some problem has, like value_counts()
+    labels_counts = [str(i) for i, count in enumerate(labels_count_counts) if count > 0]
+    ax.bar(labels_counts, [count for count in labels_count_counts if count > 0])
+    ax.set_title(title)
+    ax.set_xlabel("Number of Labels")
+    ax.set_ylabel("Number of Problems")
+    ax.grid(True)
+    figure.tight_layout()
+
+    _save_figure(figure, figures_dir, plot_name)
+
+
+def get_render_tasks(stats: DatasetStats, figures_dir=FIGURES_DIR):
+    """
+    :return: (render function, arguments) of every figure
+    """
+    tasks = [(render_problems_count_per_source, (stats.problems_counts, figures_dir))]
+
+    for key in stats.sources + [TOTAL]:
+        if key == TOTAL:
+            titles = ["Total Label Distribution", "Total Description Length Distribution", "Total Label Count Distribution"]
+            suffix = "total"
         else:
-            title = f"Label Count Distribution for {source}"
-            plot_name = f"labels_count_per_problem_for_{source}"
-
-        count_distribution = source_df["label_count"].value_counts().sort_index()
-
-        plt.figure(figsize=(8, 5))
-        count_distribution.plot(kind="bar")
-        plt.title(title)
-        plt.xlabel("Number of Labels")
-        plt.ylabel("Number of Problems")
-        plt.xticks(rotation=0)
-        plt.grid(True)
-        plt.tight_layout()
-        save_plot(plot_name)
-
-    for source in df["source"].unique():
-        source_df = df[df["source"] == source]
-        plot_for_df(source_df, source)
-
-    plot_for_df(df)
-
-def plot_figures():
-    plot_problems_count_per_source()
-    plot_problems_count_per_label()
-    plot_problems_per_description_length()
-    plot_labels_count_per_problem()
+            titles = [f"Label Distribution for {key}", f"Description Length Distribution for {key}", f"Label Count Distribution for {key}"]
+            suffix = f"for_{key}"
+
+        tasks += [
+            (render_label_counts, (stats.label_counts[key], titles[0], f"problems_count_per_label_{suffix}", figures_dir)),
+            (render_description_length_histogram, (stats.description_length_histograms[key], titles[1], f"problems_per_description_length_{suffix}", figures_dir)),
+            (render_labels_count_counts, (stats.labels_count_counts[key], titles[2], f"labels_count_per_problem_{suffix}", figures_dir)),
+        ]
+
+    return tasks
+
+
+def _init_render_worker():
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+def _render(task):
+    function, args = task
+    function(*args)
+
+
+def render_figures(stats: DatasetStats, figures_dir=FIGURES_DIR, workers=None):
+    """
+    Renders figures of the statistics by `workers` processes
+    (all CPU cores by default, 1 means rendering in the current process).
+    """
+    tasks = get_render_tasks(stats, figures_dir)
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+
+    if workers == 1:
+        for task in tasks:
+            _render(task)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker, mp_context=get_process_pool_context()) as executor:
+            list(executor.map(_render, tasks))
+
+
+def plot_figures(dataset_filepath=None, figures_dir=FIGURES_DIR, workers=None, use_cache=True):
+    render_figures(get_stats(dataset_filepath, use_cache=use_cache), figures_dir, workers=workers)
+
+
+if __name__ == '__main__':
+    plot_figures()
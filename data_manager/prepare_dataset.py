@@ -1,51 +1,151 @@
-import os
+#
+# This code prepares the dataset: downloads and scraps problems of every source, formats them,
+# removes near-duplicates, preprocesses the dataset for training and plots its figures.
+#
+# Usage: python ./data_manager/prepare_dataset.py [--only format plot] [--from dedup] [--force] [--workers 4]
+#
+# Stages of different sources run concurrently, and stages whose inputs haven't changed since
+# they last succeeded are skipped (see data_manager/stages.py).
+#
+
+import argparse
+import sys
+import time
 
 import pandas as pd
 
+from data_manager import cache, dedup, html_cleaner, plot, preprocess, problem_types, utils
+from data_manager import format as formatting
 from data_manager.load import OpenR1CodeforcesLoader, KaysssLeetcodeLoader
 from data_manager.format import OpenR1CodeforcesFormatter, KaysssLeetcodeFormatter, SpojFormatter
-from data_manager.spoj_scrapper.scrapper import Scrapper
-from data_manager.plot import plot_figures
-from data_manager.utils import get_dataset_filepath
+from data_manager.dedup import DUPLICATES_REPORT_FILE, deduplicate_problems
+from data_manager.plot import FIGURES_DIR, plot_figures
+from data_manager.preprocess import MLB_FILE, PREPROCESSED_DATA_FILE, preprocess_dataset
+from data_manager.stages import STAGE_WORKERS, Stage, print_summary, run_stages, select_stages
+from data_manager.utils import get_dataset_filepath, read_dataset, write_dataset
+
+PROBLEMS_FILE = "problems.parquet"
+FORMATTED_DIR_NAME = "formatted"
+
+
+def _get_formatted_filepath(source):
+    return get_dataset_filepath(f"{FORMATTED_DIR_NAME}/{source}.parquet")
+
 
-absolute_path = os.path.dirname(os.path.abspath(__file__))
+def _get_code_files(*modules):
+    return [module.__file__ for module in modules]
 
-# === Loading state ====
-print("PREPARE DATASET: Dataset loading stage")
-codeforcesLoader = OpenR1CodeforcesLoader()
-leetcodeLoader = KaysssLeetcodeLoader()
 
-# set force=True, to redownload datasets
-codeforcesLoader.download(force=False)
-leetcodeLoader.download(force=False)
+# === Loading stage ====
+def download(loader):
+    # set force=True, to redownload datasets
+    # set export_csv=True, to also export downloaded datasets to CSV
+    # set streaming=True, to map and write datasets batch by batch with bounded memory usage
+    loader.download(force=False)
+
 
 # === Scrapper stage ===
-print("PREPARE DATASET: SPOJ problems scrapping stage")
+def scrape():
+    from data_manager.spoj_scrapper.scrapper import Scrapper
+
+    # set refresh_older_than_days=N, to re-crawl pages fetched more than N days ago
+    scrapper = Scrapper()
+    scrapper.start(refresh_older_than_days=None)
 
-scrapper = Scrapper()
-scrapper.start()
 
 # === Format stage ====
-print("PREPARE DATASET: Dataset formatting stage")
-codeforcesFormatter = OpenR1CodeforcesFormatter()
-leetcodeFormatter = KaysssLeetcodeFormatter()
-spojFormatter = SpojFormatter()
+def format_source(formatter):
+    # formatted datasets are cached in dataset/cache, set use_cache=False to format them again
+    write_dataset(formatter.format(), _get_formatted_filepath(formatter.source))
+
+
+# === Deduplication stage ===
+def deduplicate(sources):
+    problems_df = pd.concat([read_dataset(_get_formatted_filepath(source)) for source in sources])
+
+    # near-duplicate problems (e.g. the same problem on several sites) are kept once,
+    # so they can't leak across the training/validation split, clusters of them are written to dataset/duplicates.json
+    problems_df = deduplicate_problems(problems_df)
+
+    # problems.parquet keeps labels as lists, problems.csv is exported for convenience
+    write_dataset(problems_df, get_dataset_filepath(PROBLEMS_FILE), export_csv=True)
+
+
+# === Preprocessing stage ===
+def preprocess_problems():
+    # writes preprocessed_data.joblib and mlb.joblib, which are loaded by train_bert.py
+    preprocess_dataset(read_dataset(get_dataset_filepath(PROBLEMS_FILE)))
+
+
+def get_stages():
+    loaders = {'codeforces': OpenR1CodeforcesLoader(), 'leetcode': KaysssLeetcodeLoader()}
+    spoj_formatter = SpojFormatter()
+    formatters = [OpenR1CodeforcesFormatter(), KaysssLeetcodeFormatter(), spoj_formatter]
+    sources = [formatter.source for formatter in formatters]
+    problems_filepath = get_dataset_filepath(PROBLEMS_FILE)
+
+    stages = [
+        Stage(f"load_{source}", lambda loader=loader: download(loader), outputs=[loader.dataset_filepath])
+        for source, loader in loaders.items()
+    ]
+    # SPOJ is scrapped again on every run, only changed problems make the next stages run.
+    # The scrapper writes the dataset read by the SPOJ formatter
+    stages.append(Stage("scrape_spoj", scrape, outputs=[spoj_formatter.dataset_filepath], always_run=True))
+
+    format_code_files = _get_code_files(formatting, cache, html_cleaner, problem_types, utils)
+    stages += [
+        Stage(
+            f"format_{formatter.source}", lambda formatter=formatter: format_source(formatter),
+            inputs=[formatter.dataset_filepath] + format_code_files,
+            outputs=[_get_formatted_filepath(formatter.source)],
+        )
+        for formatter in formatters
+    ]
+
+    stages += [
+        Stage(
+            "dedup", lambda: deduplicate(sources),
+            inputs=[_get_formatted_filepath(source) for source in sources] + _get_code_files(dedup, utils),
+            outputs=[problems_filepath, get_dataset_filepath(DUPLICATES_REPORT_FILE)],
+        ),
+        Stage(
+            "preprocess", preprocess_problems,
+            inputs=[problems_filepath] + _get_code_files(preprocess, utils),
+            outputs=[get_dataset_filepath(PREPROCESSED_DATA_FILE), get_dataset_filepath(MLB_FILE)],
+        ),
+        Stage(
+            "plot", plot_figures,
+            inputs=[problems_filepath] + _get_code_files(plot, utils),
+            outputs=[f"{FIGURES_DIR}/problems_count_per_source.png"],
+        ),
+    ]
+
+    return stages
+
 
-problems_df = pd.concat([
-    codeforcesFormatter.format(),
-    leetcodeFormatter.format(),
-    # spojFormatter.format()
-])
+def main():
+    parser = argparse.ArgumentParser(description="Prepare the dataset")
+    selector = parser.add_mutually_exclusive_group()
+    selector.add_argument('--only', nargs='+', help="stages to run, e.g. 'format_leetcode' or 'format' for all format stages")
+    selector.add_argument('--from', dest='start', help="stage to start from, it and all stages depending on it run")
+    parser.add_argument('--force', action='store_true', help="run selected stages even when their inputs haven't changed")
+    parser.add_argument('--workers', type=int, default=STAGE_WORKERS, help="number of stages run at once")
+    args = parser.parse_args()
 
-dataset_filepath = get_dataset_filepath('problems.csv')
+    stages = get_stages()
 
-if os.path.exists(dataset_filepath):
-    os.remove(dataset_filepath)
+    try:
+        selected = select_stages(stages, only=args.only, start=args.start)
+    except ValueError as e:
+        parser.error(str(e))
 
-problems_df.to_csv(dataset_filepath, index=False)
+    start = time.perf_counter()
+    results = run_stages(stages, selected, workers=args.workers, force=args.force)
+    print_summary(results, time.perf_counter() - start)
 
-# === Plot stage ===
-print("PREPARE DATASET: Plotting stage")
+    if any(result.status not in ('done', 'skipped') for result in results):
+        sys.exit(1)
 
-plot_figures()
 
+if __name__ == '__main__':
+    main()
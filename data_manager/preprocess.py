@@ -0,0 +1,124 @@
+#
+# This code binarizes labels of the prepared dataset and splits it into
+# training and validation parts, which are loaded by train_bert.py
+#
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from data_manager.utils import PROBLEM_LABELS, LABEL_MASK_DTYPE, get_dataset_filepath, masks_to_matrix
+
+VAL_SIZE = 0.2
+SPLIT_SEED = 42
+
+PREPROCESSED_DATA_FILE = "preprocessed_data.joblib"
+MLB_FILE = "mlb.joblib"
+
+
+def pack_labels(labels: np.ndarray) -> np.ndarray:
+    # one bit per label, 8 labels of a row are stored in a byte
+    return np.packbits(np.asarray(labels, dtype=bool), axis=1)
+
+
+def unpack_labels(packed_labels: np.ndarray, labels_count: int) -> np.ndarray:
+    return np.unpackbits(packed_labels, axis=1, count=labels_count)
+
+
+def iterative_stratified_split(labels: np.ndarray, val_size=VAL_SIZE, seed=SPLIT_SEED):
+    """
+    Iterative stratification (Sechidis et al., 2011), so every label has about `val_size`
+    of its problems in the validation part. Labels are handled from the rarest one, and all
+    remaining problems with the current label are split at once, instead of one by one.
+
+    :param labels: binary matrix with a row per problem and a column per label, or label bitmasks
+    :return: sorted row indices of the training and the validation parts
+    """
+    labels = np.asarray(labels)
+
+    if labels.ndim == 1:
+        labels = masks_to_matrix(labels)
+
+    labels = labels.astype(bool)
+    rng = np.random.default_rng(seed)
+
+    # desired numbers of label occurrences and problems in [train, val] parts
+    ratios = np.array([1 - val_size, val_size])
+    desired_labels = ratios[:, None] * labels.sum(axis=0)
+    desired_samples = ratios * len(labels)
+
+    is_val = np.zeros(len(labels), dtype=bool)
+    is_remaining = np.ones(len(labels), dtype=bool)
+
+    while True:
+        remaining_counts = labels[is_remaining].sum(axis=0)
+
+        if not remaining_counts.any():
+            break
+
+        label = np.argmin(np.where(remaining_counts > 0, remaining_counts, np.iinfo(remaining_counts.dtype).max))
+        group = rng.permutation(np.flatnonzero(is_remaining & labels[:, label]))
+
+        # assigning problems one by one to the part, which needs the label more,
+        # ends with this number of them in the validation part
+        val_count = int(np.clip(np.rint((len(group) + desired_labels[1, label] - desired_labels[0, label]) / 2), 0, len(group)))
+        train_group, val_group = group[val_count:], group[:val_count]
+
+        is_val[val_group] = True
+        is_remaining[group] = False
+
+        desired_labels[0] -= labels[train_group].sum(axis=0)
+        desired_labels[1] -= labels[val_group].sum(axis=0)
+        desired_samples -= [len(train_group), len(val_group)]
+
+    # problems without labels only fill the validation part up to its size
+    rest = rng.permutation(np.flatnonzero(is_remaining))
+    is_val[rest[:int(np.clip(np.rint(desired_samples[1]), 0, len(rest)))]] = True
+
+    return np.flatnonzero(~is_val), np.flatnonzero(is_val)
+
+
+def _binarize_labels(problems_df: pd.DataFrame):
+    # imported here, sklearn takes a second to import and only preprocessing needs it
+    from sklearn.preprocessing import MultiLabelBinarizer
+
+    if 'label_mask' not in problems_df:
+        # datasets formatted before label bitmasks were added
+        mlb = MultiLabelBinarizer()
+
+        return mlb, mlb.fit_transform(problems_df['labels']).astype(np.uint8)
+
+    # columns of present labels in sorted order, like MultiLabelBinarizer fitted on lists of labels has
+    label_masks = problems_df['label_mask'].to_numpy(dtype=LABEL_MASK_DTYPE)
+    present = masks_to_matrix(np.bitwise_or.reduce(label_masks, keepdims=True, initial=0), len(PROBLEM_LABELS))[0].astype(bool)
+    label_names = sorted(label for label, is_present in zip(PROBLEM_LABELS, present) if is_present)
+    columns = [PROBLEM_LABELS.index(label) for label in label_names]
+
+    mlb = MultiLabelBinarizer(classes=label_names).fit([label_names])
+
+    return mlb, masks_to_matrix(label_masks, len(PROBLEM_LABELS))[:, columns]
+
+
+def preprocess_dataset(problems_df: pd.DataFrame, val_size=VAL_SIZE, seed=SPLIT_SEED):
+    """
+    Writes preprocessed_data.joblib with training and validation texts and bit-packed labels,
+    and mlb.joblib with the MultiLabelBinarizer, which gives names of label columns.
+    """
+    mlb, labels = _binarize_labels(problems_df)
+    texts = problems_df['description'].to_numpy()
+
+    train_index, val_index = iterative_stratified_split(labels, val_size=val_size, seed=seed)
+
+    data = {
+        'train_texts': texts[train_index].tolist(),
+        'val_texts': texts[val_index].tolist(),
+        'train_labels': pack_labels(labels[train_index]),
+        'val_labels': pack_labels(labels[val_index]),
+        'labels_count': len(mlb.classes_),
+    }
+
+    joblib.dump(data, get_dataset_filepath(PREPROCESSED_DATA_FILE))
+    joblib.dump(mlb, get_dataset_filepath(MLB_FILE))
+
+    print(f"Train problems: {len(train_index)}, label counts: {labels[train_index].sum(axis=0).tolist()}")
+    print(f"Val problems: {len(val_index)}, label counts: {labels[val_index].sum(axis=0).tolist()}")
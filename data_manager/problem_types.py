@@ -119,6 +119,12 @@ class KaysssLeetcodeProblem:
     topicTags: List[LeetcodeProblemLabel]
 
 
+# === SPOJ ===
+
+# SPOJ tags are added by problem setters, so there is no fixed list of them
+SpojProblemLabel = str
+
+
 # === Common problem type ===
 
 ProblemLabel = Literal[
@@ -131,7 +137,7 @@ ProblemLabel = Literal[
 
 @dataclass
 class Problem:
-    source: Literal['leetcode', 'codeforces']
+    source: Literal['leetcode', 'codeforces', 'spoj']
     title: str
     description: str
     labels: List[ProblemLabel]
@@ -347,3 +353,95 @@ leetcode_to_standard: Dict[LeetcodeProblemLabel, Optional[List[ProblemLabel]]] =
     "Rejection Sampling": [],
     "Biconnected Component": [],
 }
+
+# SPOJ tags, which are not in this map, are skipped
+spoj_to_standard: Dict[SpojProblemLabel, Optional[List[ProblemLabel]]] = {
+    "dynamic-programming": ["dynamic programming"],
+    "dp": ["dynamic programming"],
+    "knapsack": ["dynamic programming"],
+    "lis": ["dynamic programming"],
+    "bitmasking-dp": ["dynamic programming", "bit manipulation"],
+    "digit-dp": ["dynamic programming"],
+    "memoization": ["dynamic programming"],
+    "math": ["math"],
+    "simple-math": ["math"],
+    "modular-arithmetic": ["math", "number theory"],
+    "fast-fourier-transform": ["math"],
+    "fft": ["math"],
+    "matrix-exponentiation": ["math", "matrices"],
+    "matrix": ["matrices"],
+    "number-theory": ["number theory"],
+    "prime-numbers": ["number theory"],
+    "sieve": ["number theory"],
+    "gcd": ["number theory"],
+    "combinatorics": ["combinatorics"],
+    "probability-theory": ["probabilities"],
+    "probability": ["probabilities"],
+    "expected-value": ["probabilities"],
+    "game-theory": ["game theory"],
+    "sprague-grundy": ["game theory"],
+    "geometry": ["geometry"],
+    "convex-hull": ["geometry"],
+    "sweep-line": [],
+    "sorting": ["sorting"],
+    "binary-search": ["binary search"],
+    "ternary-search": ["binary search"],
+    "two-pointers": ["two pointers"],
+    "greedy": ["greedy"],
+    "graph-theory": ["graphs"],
+    "graph": ["graphs"],
+    "dfs": ["graphs"],
+    "bfs": ["graphs"],
+    "shortest-path": ["graphs", "shortest path"],
+    "dijkstra": ["graphs", "shortest path"],
+    "floyd-warshall": ["graphs", "shortest path"],
+    "bellman-ford": ["graphs", "shortest path"],
+    "minimum-spanning-tree": ["graphs"],
+    "mst": ["graphs"],
+    "topological-sorting": ["sorting", "graphs"],
+    "strongly-connected-components": ["graphs"],
+    "bipartite-matching": ["graphs"],
+    "max-flow": ["graphs"],
+    "network-flow": ["graphs"],
+    "union-find": ["union find"],
+    "disjoint-set": ["union find"],
+    "dsu": ["union find"],
+    "tree": ["trees"],
+    "trees": ["trees"],
+    "lca": ["trees"],
+    "segment-tree": ["trees"],
+    "binary-indexed-tree": ["trees"],
+    "bit": ["trees"],
+    "fenwick-tree": ["trees"],
+    "trie": ["trees"],
+    "data-structures": ["data structures"],
+    "stack": ["data structures"],
+    "queue": ["data structures"],
+    "deque": ["data structures"],
+    "heap": ["data structures"],
+    "priority-queue": ["data structures"],
+    "sqrt-decomposition": ["data structures"],
+    "suffix-array": ["data structures"],
+    "string": ["strings"],
+    "strings": ["strings"],
+    "kmp": ["strings"],
+    "z-algorithm": ["strings"],
+    "palindrome": ["strings"],
+    "hashing": ["hashing"],
+    "rolling-hash": ["hashing"],
+    "bitmasks": ["bit manipulation"],
+    "bitmasking": ["bit manipulation"],
+    "bit-manipulation": ["bit manipulation"],
+    "divide-and-conquer": ["divide and conquer"],
+    "interactive": ["interactive"],
+    "ad-hoc-1": [],
+    "adhoc": [],
+    "brute-force": [],
+    "implementation": [],
+    "recursion": [],
+    "backtracking": [],
+    "simulation": [],
+    "big-numbers": [],
+    "challenge": None,
+    "tutorial": None,
+}
@@ -0,0 +1,183 @@
+#
+# This code fetches pages concurrently, without exceeding the allowed request rate
+#
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import requests
+
+from data_manager.spoj_scrapper.http_cache import get_text_hash
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class Page:
+    url: str
+    text: str
+    # False when the page is the same as the cached one
+    changed: bool
+
+
+class FetchError(Exception):
+    def __init__(self, url, reason):
+        super().__init__(f"failed to fetch {url}: {reason}")
+        self.url = url
+
+
+class TokenBucket:
+    """
+    Allows `rate` acquisitions per second on average and bursts of up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait_time = (1 - self.tokens) / self.rate
+
+            time.sleep(wait_time)
+
+
+class Fetcher:
+    def __init__(self, headers, concurrency, requests_per_second, max_retries, backoff, timeout, cache=None):
+        """
+        :param concurrency: number of requests in flight at once
+        :param requests_per_second: request rate shared by all workers, retries included
+        :param max_retries: number of retries of a failed request before giving up
+        :param backoff: delay before the first retry in seconds, doubled after every retry
+        :param timeout: timeout of a single request in seconds
+        :param cache: ResponseCache, pages are requested conditionally when they are cached
+        """
+        self.headers = headers
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+
+        self.rate_limiter = TokenBucket(requests_per_second)
+        self.local = threading.local()
+
+    def fetch(self, url, max_age=None):
+        """
+        :param max_age: cached pages younger than this number of seconds are returned without requesting
+        """
+        cached_response = self.cache.get(url) if self.cache is not None else None
+        conditional_headers = {}
+
+        if cached_response is not None:
+            if max_age is not None and time.time() - cached_response.fetched_at < max_age:
+                return Page(url, cached_response.text, changed=False)
+
+            if cached_response.etag is not None:
+                conditional_headers['If-None-Match'] = cached_response.etag
+
+            if cached_response.last_modified is not None:
+                conditional_headers['If-Modified-Since'] = cached_response.last_modified
+
+        attempt = 0
+
+        while True:
+            self.rate_limiter.acquire()
+
+            try:
+                response = self._get_session().get(url, timeout=self.timeout, headers=conditional_headers)
+            except requests.RequestException as e:
+                reason = str(e)
+                retry_after = None
+            else:
+                if response.status_code == 304 and cached_response is not None:
+                    self.cache.touch(url)
+                    return Page(url, cached_response.text, changed=False)
+
+                if response.status_code == 200:
+                    return self._get_page(url, response, cached_response)
+
+                reason = f"status code is {response.status_code}"
+
+                if response.status_code not in RETRY_STATUS_CODES:
+                    raise FetchError(url, reason)
+
+                retry_after = response.headers.get('Retry-After')
+
+            if attempt >= self.max_retries:
+                raise FetchError(url, reason)
+
+            delay = self.backoff * 2 ** attempt
+
+            if retry_after is not None and retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+
+            print(f"Retrying {url} in {delay}s ({reason})")
+            time.sleep(delay)
+            attempt += 1
+
+    def fetch_all(self, urls, max_age=None):
+        """
+        Yields (url, page) pairs in the order of `urls`, while fetching up to
+        `concurrency` urls ahead. Responses are parsed by the caller,
+        so fetching threads only wait for the network.
+        """
+        urls = iter(urls)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            in_flight = deque()
+
+            for url in urls:
+                in_flight.append((url, executor.submit(self.fetch, url, max_age)))
+
+                if len(in_flight) >= self.concurrency:
+                    break
+
+            try:
+                while in_flight:
+                    url, future = in_flight.popleft()
+                    page = future.result()
+
+                    next_url = next(urls, None)
+
+                    if next_url is not None:
+                        in_flight.append((next_url, executor.submit(self.fetch, next_url, max_age)))
+
+                    yield url, page
+            finally:
+                # stop fetching, when the caller stops iterating or fetching fails
+                for _, future in in_flight:
+                    future.cancel()
+
+    def _get_page(self, url, response, cached_response):
+        text = response.text
+
+        if self.cache is not None:
+            self.cache.put(url, response.headers.get('ETag'), response.headers.get('Last-Modified'), text)
+
+        changed = cached_response is None or cached_response.text_hash != get_text_hash(text)
+
+        return Page(url, text, changed)
+
+    def _get_session(self):
+        # requests.Session is not thread-safe, so every thread has its own
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+            self.local.session.headers.update(self.headers)
+
+        return self.local.session
@@ -0,0 +1,77 @@
+#
+# On-disk cache of fetched pages, which allows re-crawling with conditional requests
+#
+
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    text: str
+    text_hash: str
+    fetched_at: float
+
+
+def get_text_hash(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    Keeps the last successful response of every url together with its ETag and
+    Last-Modified headers. Bodies are stored zlib compressed.
+    """
+
+    def __init__(self, filepath):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(filepath, check_same_thread=False)
+
+        with self.lock, self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, '
+                'body BLOB NOT NULL, text_hash TEXT NOT NULL, fetched_at REAL NOT NULL)'
+            )
+
+    def get(self, url) -> Optional[CachedResponse]:
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT etag, last_modified, body, text_hash, fetched_at FROM responses WHERE url = ?', (url,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        etag, last_modified, body, text_hash, fetched_at = row
+
+        return CachedResponse(url, etag, last_modified, zlib.decompress(body).decode(), text_hash, fetched_at)
+
+    def put(self, url, etag, last_modified, text) -> CachedResponse:
+        cached_response = CachedResponse(url, etag, last_modified, text, get_text_hash(text), time.time())
+        body = zlib.compress(text.encode())
+
+        with self.lock, self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+                (url, etag, last_modified, body, cached_response.text_hash, cached_response.fetched_at),
+            )
+
+        return cached_response
+
+    def touch(self, url):
+        # the page is confirmed to be unchanged
+        with self.lock, self.connection:
+            self.connection.execute('UPDATE responses SET fetched_at = ? WHERE url = ?', (time.time(), url))
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
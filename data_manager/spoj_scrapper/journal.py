@@ -0,0 +1,76 @@
+#
+# Append-only JSONL journal of scrapping progress.
+# Every record is written once, so interrupted scrapping never corrupts saved progress.
+#
+
+import json
+import os
+
+FSYNC_EVERY_RECORDS = 50
+
+
+class ProgressJournal:
+    def __init__(self, filepath, fsync_every=FSYNC_EVERY_RECORDS):
+        """
+        :param fsync_every: number of appended records, after which the journal is flushed to disk
+        """
+        self.filepath = filepath
+        self.fsync_every = fsync_every
+        self.file = None
+        self.unsynced_records_count = 0
+
+    def replay(self):
+        """
+        Returns all complete records. A partially written last record (e.g. after a crash)
+        is cut off, so that next records are appended after the last complete one.
+        """
+        records = []
+
+        if not os.path.exists(self.filepath):
+            return records
+
+        valid_size = 0
+
+        with open(self.filepath, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+
+                valid_size += len(line)
+
+        if valid_size != os.path.getsize(self.filepath):
+            with open(self.filepath, "r+b") as f:
+                f.truncate(valid_size)
+
+        return records
+
+    def append(self, record):
+        if self.file is None:
+            self.file = open(self.filepath, "a", encoding="utf-8")
+
+        self.file.write(json.dumps(record) + "\n")
+        self.unsynced_records_count += 1
+
+        if self.unsynced_records_count >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        if self.file is None:
+            return
+
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced_records_count = 0
+
+    def clear(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+        if os.path.exists(self.filepath):
+            os.remove(self.filepath)
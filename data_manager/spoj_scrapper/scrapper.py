@@ -1,14 +1,15 @@
 import json
 import os
-import time
 import math
 import re
 import shutil
-from dataclasses import asdict
-import requests
+from dataclasses import asdict, replace
 from bs4 import BeautifulSoup
 
 from data_manager.utils import get_dataset_filepath
+from data_manager.spoj_scrapper.fetcher import Fetcher, FetchError
+from data_manager.spoj_scrapper.http_cache import ResponseCache
+from data_manager.spoj_scrapper.journal import ProgressJournal
 from data_manager.spoj_scrapper.scrapper_types import ProblemPreview, Problem
 
 # get this number manually from SPOJ website
@@ -21,11 +22,29 @@ PAGE_URL = f'{BASE_URL}/problems/classical'
 absolute_path = os.path.dirname(os.path.abspath(__file__))
 PROBLEMS_PREVIEW_FILE = f"{absolute_path}/problems_preview.json"
 PROBLEMS_FILE = f"{absolute_path}/problems.json"
+PROGRESS_JOURNAL_FILE = f"{absolute_path}/progress.jsonl"
+HTTP_CACHE_FILE = f"{absolute_path}/http_cache.sqlite"
 DATASET_FILE = get_dataset_filepath("scrapper/spoj.json")
 
 PROBLEMS_PER_PAGE = 50
 
-DELAY_BETWEEN_REQUESTS = 1 # seconds
+CONCURRENCY = 8
+REQUESTS_PER_SECOND = 4
+MAX_RETRIES = 5
+RETRY_BACKOFF = 2 # seconds, doubled after every retry
+REQUEST_TIMEOUT = 30 # seconds
+
+# BeautifulSoup tree builder: 'lxml' is the fastest, 'html5lib' parses like a browser and is ~2x slower.
+# 'html.parser' nests unclosed tags differently, so it produces different problems on real pages
+PARSER = 'lxml'
+
+WHITESPACE_REGEX = re.compile(r'\s+')
+# '\n' is replaced with a space, '\t' and '\r' are removed
+TEXT_TRANSLATION = str.maketrans({'\n': ' ', '\t': None, '\r': None})
+
+class ScrapperError(Exception):
+    pass
+
 
 headers = {
     'User-Agent': (
@@ -42,83 +61,162 @@ headers = {
 
 
 class Scrapper:
-    def __init__(self):
+    def __init__(self, concurrency=CONCURRENCY, requests_per_second=REQUESTS_PER_SECOND, max_retries=MAX_RETRIES,
+                 parser=PARSER):
         self.current_page_html = None
-
-        self.session = requests.Session()
-        self.session.headers.update(headers)
+        self.parser = parser
+
+        self.fetcher = Fetcher(
+            headers,
+            concurrency=concurrency,
+            requests_per_second=requests_per_second,
+            max_retries=max_retries,
+            backoff=RETRY_BACKOFF,
+            timeout=REQUEST_TIMEOUT,
+            cache=ResponseCache(HTTP_CACHE_FILE),
+        )
+
+        # scrapped pages and problems are appended to the journal,
+        # problems_preview.json and problems.json are written only by compaction
+        self.journal = ProgressJournal(PROGRESS_JOURNAL_FILE)
 
         self.problems_preview = []
         self.problems = []
 
+        self.current_page_index = 0
+        self.current_problem_index = 0
+
         self._load_saved_data()
 
-        self.current_page_index = math.ceil(len(self.problems_preview) / PROBLEMS_PER_PAGE)
-        self.current_problem_index = len(self.problems)
+    def start(self, refresh_older_than_days=None):
+        """
+        :param refresh_older_than_days: re-crawl pages fetched more than this number of days ago,
+            pages are requested conditionally and only changed pages are parsed again
+        """
+        max_age = None if refresh_older_than_days is None else refresh_older_than_days * 24 * 60 * 60
+
+        self.request_problems_preview(max_age)
+        self.request_problems(max_age)
 
-    def start(self):
-        self.request_problems_preview()
-        self.request_problems()
+        self._compact()
 
         os.makedirs(os.path.dirname(DATASET_FILE), exist_ok=True)
         shutil.copy(PROBLEMS_FILE, DATASET_FILE)
 
-    def request_problems_preview(self):
-        while self.current_page_index < SPOJ_PAGES_COUNT:
-            print(f"Scraping page {self.current_page_index} / {SPOJ_PAGES_COUNT}")
-
-            try:
-                page_url = self._get_current_page_url()
-                response = self._request(page_url)
-                soup = BeautifulSoup(response.text, 'html5lib')
-
-                tbody = soup.select_one('table.problems > tbody')
-
-                next_problems_preview = self._parse_problems_preview_table(tbody)
-            except Exception as e:
-                print("Error occurred: when loading and parsing problems preview")
-                print(e)
-                self._save_and_exit()
-            else:
-                self.problems_preview.extend(next_problems_preview)
-                self.current_page_index += 1
-
-        self._save()
-
-    def request_problems(self):
-        while self.current_problem_index < len(self.problems_preview):
-            print(f"Scraping problem {self.current_problem_index}/{len(self.problems_preview)}")
-
-            try:
-                problem_preview = self.problems_preview[self.current_problem_index]
-                response = self._request(problem_preview.url)
-                soup = BeautifulSoup(response.text, 'html5lib')
-
-                problem = self._parse_problem(soup, problem_preview)
-            except Exception as e:
-                problem_id = self.problems_preview[self.current_problem_index].id
-                print(f"Error occured: when loading and parsing problem (id={problem_id})")
-                print(e)
-                self._save_and_exit()
+    def request_problems_preview(self, refresh_max_age=None):
+        first_page_index = self.current_page_index if refresh_max_age is None else 0
+        page_urls = [self._get_page_url(page_index) for page_index in range(first_page_index, SPOJ_PAGES_COUNT)]
+
+        try:
+            # pages are fetched concurrently, but parsed here one by one in order
+            fetched_pages = self.fetcher.fetch_all(page_urls, refresh_max_age)
+
+            for page_index, (page_url, page) in enumerate(fetched_pages, start=first_page_index):
+                if page_index < self.current_page_index and not page.changed:
+                    continue
+
+                print(f"Scraping page {page_index} / {SPOJ_PAGES_COUNT}")
+
+                try:
+                    next_problems_preview = self.parse_problems_preview_page(page.text)
+                except Exception as e:
+                    print("Error occurred: when loading and parsing problems preview")
+                    print(e)
+                    self._save_and_fail()
+                else:
+                    self._save_record({
+                        'kind': 'problems_preview_page',
+                        'page_index': page_index,
+                        'problems_preview': [asdict(p) for p in next_problems_preview],
+                    })
+        except FetchError as e:
+            print(f"Error occurred: {e}")
+            self._save_and_fail()
+
+        self.journal.sync()
+
+    def request_problems(self, refresh_max_age=None):
+        first_problem_index = self.current_problem_index if refresh_max_age is None else 0
+        problem_urls = [p.url for p in self.problems_preview[first_problem_index:]]
+
+        try:
+            fetched_pages = self.fetcher.fetch_all(problem_urls, refresh_max_age)
+
+            for problem_index, (problem_url, page) in enumerate(fetched_pages, start=first_problem_index):
+                problem_preview = self.problems_preview[problem_index]
+
+                if self._is_problem_unchanged(problem_index, page):
+                    # problem page is the same, but statistics from the problems list may change
+                    problem = self._copy_problem_preview(replace(self.problems[problem_index]), problem_preview)
+
+                    if problem != self.problems[problem_index]:
+                        self._save_problem(problem_index, problem)
+
+                    continue
+
+                print(f"Scraping problem {problem_index}/{len(self.problems_preview)}")
+
+                try:
+                    problem = self.parse_problem_page(page.text, problem_preview)
+                except Exception as e:
+                    print(f"Error occured: when loading and parsing problem (id={problem_preview.id})")
+                    print(e)
+                    self._save_and_fail()
+                else:
+                    self._save_problem(problem_index, problem)
+        except FetchError as e:
+            print(f"Error occurred: {e}")
+            self._save_and_fail()
+
+        self.journal.sync()
+
+    def _is_problem_unchanged(self, problem_index, page):
+        if problem_index >= len(self.problems) or page.changed:
+            return False
+
+        # problems list may shift, when problems are added to SPOJ
+        return self.problems[problem_index].url == self.problems_preview[problem_index].url
+
+    def _save_problem(self, problem_index, problem):
+        self._save_record({
+            'kind': 'problem',
+            'problem_index': problem_index,
+            'problem': asdict(problem),
+        })
+
+    def _save_record(self, record):
+        self.journal.append(record)
+        self._apply_record(record)
+
+    def _apply_record(self, record):
+        # applying a record again doesn't change anything, so records may be replayed safely
+        if record['kind'] == 'problems_preview_page':
+            first_problem_index = record['page_index'] * PROBLEMS_PER_PAGE
+            problems_preview = [ProblemPreview(**data) for data in record['problems_preview']]
+
+            self.problems_preview[first_problem_index:first_problem_index + PROBLEMS_PER_PAGE] = problems_preview
+            self.current_page_index = max(self.current_page_index, record['page_index'] + 1)
+        elif record['kind'] == 'problem':
+            problem_index = record['problem_index']
+            problem = Problem(**record['problem'])
+
+            if problem_index < len(self.problems):
+                self.problems[problem_index] = problem
             else:
                 self.problems.append(problem)
-                self.current_problem_index += 1
-
-            if len(self.problems) % 50: # save every 50 problems parsed, just in case
-                self._save()
 
-        self._save()
+            self.current_problem_index = len(self.problems)
 
-    def _request(self, url):
-        response = self.session.get(url)
+    def parse_problems_preview_page(self, html):
+        soup = BeautifulSoup(html, self.parser)
+        tbody = soup.select_one('table.problems > tbody')
 
-        time.sleep(DELAY_BETWEEN_REQUESTS)
+        return self._parse_problems_preview_table(tbody)
 
-        if response.status_code != 200:
-            print("Error occurred: status code is not 200")
-            self._save_and_exit()
+    def parse_problem_page(self, html, problem_preview):
+        soup = BeautifulSoup(html, self.parser)
 
-        return response
+        return self._parse_problem(soup, problem_preview)
 
     def _parse_problems_preview_table(self, tbody):
         problems = []
@@ -147,17 +245,7 @@ class Scrapper:
         return problems
 
     def _parse_problem(self, soup, problem_preview):
-        problem = Problem()
-
-        # copy values from problem_preview
-        problem.id = problem_preview.id
-        problem.title = problem_preview.title
-        problem.url = problem_preview.url
-        problem.quality = problem_preview.quality
-        problem.thumbs_up = problem_preview.thumbs_up
-        problem.thumbs_down = problem_preview.thumbs_down
-        problem.user_count = problem_preview.user_count
-        problem.acceptance_rate = problem_preview.acceptance_rate
+        problem = self._copy_problem_preview(Problem(), problem_preview)
 
         # parse tags
         tags_text = self._get_text(soup.select_one('#problem-tags'))
@@ -187,7 +275,7 @@ class Scrapper:
             elif last_heading == "Output":
                 problem.output_format += text + "\n"
             elif last_heading == "Example":
-                problem.example = child.text
+                problem.example = self._get_pre_text(child)
                 break
 
         # parse meta data
@@ -218,35 +306,63 @@ class Scrapper:
 
         return problem
 
-    def _get_current_page_url(self):
-        return f"{PAGE_URL}/sort=0,start={self.current_page_index * 50}"
+    def _copy_problem_preview(self, problem, problem_preview):
+        problem.id = problem_preview.id
+        problem.title = problem_preview.title
+        problem.url = problem_preview.url
+        problem.quality = problem_preview.quality
+        problem.thumbs_up = problem_preview.thumbs_up
+        problem.thumbs_down = problem_preview.thumbs_down
+        problem.user_count = problem_preview.user_count
+        problem.acceptance_rate = problem_preview.acceptance_rate
+
+        return problem
+
+    def _get_page_url(self, page_index):
+        return f"{PAGE_URL}/sort=0,start={page_index * PROBLEMS_PER_PAGE}"
+
+    def _get_pre_text(self, soup_element):
+        text = soup_element.text
+
+        # by HTML spec a newline right after <pre> is ignored, only html5lib follows it
+        if self.parser != 'html5lib' and soup_element.name == 'pre' and text.startswith('\n'):
+            text = text[1:]
+
+        return text
 
     def _get_text(self, soup_element):
         text = (soup_element.text
-                .replace('\n', ' ')
-                .replace('\t', '')
-                .replace('\r', '')
+                .translate(TEXT_TRANSLATION)
                 .replace('\u00c2\u00a0', ' ')
                 .strip())
 
-        text = re.sub(r'\s+', ' ', text)
+        text = WHITESPACE_REGEX.sub(' ', text)
 
         return text
 
-    def _save_and_exit(self):
-        self._save()
-        exit(1)
+    def _save_and_fail(self):
+        # progress is kept, the next start continues from the failed page
+        self.journal.sync()
+        raise ScrapperError("scrapping is interrupted, start it again to continue")
+
+    def _compact(self):
+        # write all progress to problems_preview.json and problems.json, after that the journal is not needed
+        self.journal.sync()
 
-    def _save(self):
-        with (open(PROBLEMS_PREVIEW_FILE, "w") as f):
-            serializable_problems = [asdict(p) for p in self.problems_preview]
+        self._write_json(PROBLEMS_PREVIEW_FILE, [asdict(p) for p in self.problems_preview])
+        self._write_json(PROBLEMS_FILE, [asdict(p) for p in self.problems])
 
-            json.dump(serializable_problems, f, indent=4)
+        self.journal.clear()
 
-        with (open(PROBLEMS_FILE, "w") as f):
-            serializable_problems = [asdict(p) for p in self.problems]
+    def _write_json(self, filepath, data):
+        tmp_filepath = f"{filepath}.tmp"
 
-            json.dump(serializable_problems, f, indent=4)
+        with open(tmp_filepath, "w") as f:
+            json.dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp_filepath, filepath)
 
     def _load_saved_data(self):
         if os.path.exists(PROBLEMS_PREVIEW_FILE):
@@ -258,3 +374,9 @@ class Scrapper:
             with open(PROBLEMS_FILE, "r") as f:
                 serializable_problems = json.load(f)
                 self.problems = [Problem(**data) for data in serializable_problems]
+
+        self.current_page_index = math.ceil(len(self.problems_preview) / PROBLEMS_PER_PAGE)
+        self.current_problem_index = len(self.problems)
+
+        for record in self.journal.replay():
+            self._apply_record(record)
@@ -0,0 +1,215 @@
+#
+# This code runs stages of a pipeline as a DAG. Every stage declares files it reads and writes, a stage
+# depends on the stages writing its inputs. Independent stages run concurrently, and a stage is skipped
+# when its outputs exist and its inputs have the same content as when it last succeeded.
+#
+# Stages run in threads: they wait on the network or disk, or start their own process pools,
+# e.g. for HTML cleaning and plotting, which can't be started from worker processes.
+#
+
+import json
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from data_manager.cache import CACHE_DIR_NAME, get_file_digest
+from data_manager.utils import get_dataset_filepath
+
+STAGES_STATE_FILE = f"{CACHE_DIR_NAME}/stages.json"
+STAGE_WORKERS = 4
+
+
+@dataclass
+class Stage:
+    """
+    :param inputs: files read by the stage, including its code, so changed code runs it again
+    :param outputs: files written by the stage
+    :param always_run: run the stage even when its inputs haven't changed,
+        e.g. when it reads from the network
+    """
+    name: str
+    run: Callable[[], None]
+    inputs: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+    always_run: bool = False
+
+
+@dataclass
+class StageResult:
+    name: str
+    # 'done', 'skipped', 'failed' or 'not run', when a stage it depends on failed
+    status: str
+    seconds: float = 0.0
+
+
+def get_dependencies(stages: List[Stage]) -> Dict[str, List[str]]:
+    """
+    :return: names of the stages writing inputs of every stage
+    """
+    writers = {}
+
+    for stage in stages:
+        for output in stage.outputs:
+            if output in writers:
+                raise ValueError(f"{output} is written by stages {writers[output]} and {stage.name}")
+
+            writers[output] = stage.name
+
+    return {
+        stage.name: sorted({writers[path] for path in stage.inputs if path in writers} - {stage.name})
+        for stage in stages
+    }
+
+
+def select_stages(stages: List[Stage], only: Optional[List[str]] = None, start: Optional[str] = None) -> List[Stage]:
+    """
+    A name selects the stage with this name, or a group of stages with names starting
+    with the name and '_', e.g. 'format' selects 'format_codeforces' and 'format_leetcode'.
+
+    :param only: names of the stages to run
+    :param start: name of the stage to start from, it and all stages depending on it run
+    """
+    for name in (only or []) + ([start] if start else []):
+        if not _get_stage_names(stages, name):
+            raise ValueError(f"Unknown stage {name!r}, stages are: {', '.join(stage.name for stage in stages)}")
+
+    if only:
+        selected = set().union(*(_get_stage_names(stages, name) for name in only))
+        return [stage for stage in stages if stage.name in selected]
+
+    if not start:
+        return list(stages)
+
+    dependencies = get_dependencies(stages)
+    selected = _get_stage_names(stages, start)
+
+    # stages are declared after the stages they depend on
+    for stage in stages:
+        if selected.intersection(dependencies[stage.name]):
+            selected.add(stage.name)
+
+    return [stage for stage in stages if stage.name in selected]
+
+
+def _get_stage_names(stages: List[Stage], name: str):
+    return {stage.name for stage in stages if stage.name == name or stage.name.startswith(f"{name}_")}
+
+
+def run_stages(stages: List[Stage], selected: Optional[List[Stage]] = None, workers=STAGE_WORKERS, force=False,
+               state_filepath=None) -> List[StageResult]:
+    """
+    Runs `selected` stages (all by default) in `workers` threads, a stage starts when the selected
+    stages it depends on are done. Other stages are not run, their outputs must already exist.
+
+    :param force: run selected stages even when their inputs haven't changed
+    :param state_filepath: JSON file with fingerprints of inputs of succeeded stages, dataset/cache/stages.json by default
+    :return: results of the selected stages in the order they were declared
+    """
+    selected = list(stages) if selected is None else selected
+    selected_names = {stage.name for stage in selected}
+    dependencies = {
+        name: [dependency for dependency in stage_dependencies if dependency in selected_names]
+        for name, stage_dependencies in get_dependencies(stages).items()
+    }
+    state_filepath = state_filepath or get_dataset_filepath(STAGES_STATE_FILE)
+    state = _load_state(state_filepath)
+
+    results: Dict[str, StageResult] = {}
+    pending = list(selected)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            pending_count = len(pending)
+
+            for stage in list(pending):
+                statuses = [results[name].status if name in results else None for name in dependencies[stage.name]]
+
+                if any(status in ('failed', 'not run') for status in statuses):
+                    results[stage.name] = StageResult(stage.name, 'not run')
+                    pending.remove(stage)
+                elif all(statuses):
+                    pending.remove(stage)
+                    fingerprint = _get_fingerprint(stage)
+
+                    if not force and not stage.always_run and fingerprint is not None and state.get(stage.name) == fingerprint \
+                            and all(os.path.exists(output) for output in stage.outputs):
+                        print(f"STAGE {stage.name}: skipped, inputs haven't changed")
+                        results[stage.name] = StageResult(stage.name, 'skipped')
+                    else:
+                        print(f"STAGE {stage.name}: started")
+                        running[executor.submit(_run_stage, stage)] = (stage, fingerprint)
+
+            if not running:
+                if pending and len(pending) == pending_count:
+                    raise ValueError(f"Stages {', '.join(stage.name for stage in pending)} depend on each other")
+
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                stage, fingerprint = running.pop(future)
+                results[stage.name] = future.result()
+
+                if results[stage.name].status == 'done':
+                    print(f"STAGE {stage.name}: done in {results[stage.name].seconds:.1f}s")
+
+                    # fingerprints of inputs are taken before the stage, so inputs changed meanwhile run it again
+                    if fingerprint is not None:
+                        state[stage.name] = fingerprint
+                        _save_state(state_filepath, state)
+
+    return [results[stage.name] for stage in selected]
+
+
+def _run_stage(stage: Stage) -> StageResult:
+    start = time.perf_counter()
+
+    try:
+        stage.run()
+    # SystemExit too, a stage calling exit() fails alone instead of stopping the other stages
+    except (Exception, SystemExit):
+        print(f"STAGE {stage.name}: failed")
+        traceback.print_exc()
+        return StageResult(stage.name, 'failed', time.perf_counter() - start)
+
+    return StageResult(stage.name, 'done', time.perf_counter() - start)
+
+
+def _get_fingerprint(stage: Stage):
+    # None when an input is missing, such a stage always runs
+    if not all(os.path.exists(path) for path in stage.inputs):
+        return None
+
+    return {path: get_file_digest(path) for path in stage.inputs}
+
+
+def _load_state(state_filepath):
+    if not os.path.exists(state_filepath):
+        return {}
+
+    with open(state_filepath, "r") as f:
+        return json.load(f)
+
+
+def _save_state(state_filepath, state):
+    tmp_filepath = f"{state_filepath}.tmp"
+
+    with open(tmp_filepath, "w") as f:
+        json.dump(state, f, indent=4)
+
+    os.replace(tmp_filepath, state_filepath)
+
+
+def print_summary(results: List[StageResult], total_seconds: float):
+    print(f"\n{'Stage':<25} {'Status':<10} {'Time':>8}")
+
+    for result in results:
+        seconds = f"{result.seconds:7.1f}s" if result.status in ('done', 'failed') else ""
+        print(f"{result.name:<25} {result.status:<10} {seconds}")
+
+    print(f"{'total':<25} {'':<10} {total_seconds:7.1f}s")
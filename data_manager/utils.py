@@ -1,10 +1,37 @@
+import itertools
+import json
+import multiprocessing
 import os
+from collections import Counter
+from dataclasses import dataclass
 
-from data_manager.problem_types import codeforces_to_standard, leetcode_to_standard
-from typing import List, Literal
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from data_manager.problem_types import ProblemLabel, codeforces_to_standard, leetcode_to_standard, spoj_to_standard
+from typing import Any, Dict, Iterator, List, Literal, Optional, get_args
 
 Source = Literal["huggingface", "scrapper", ""]
 
+# standard labels in the order they are declared in ProblemLabel
+PROBLEM_LABELS: List[str] = list(get_args(ProblemLabel))
+
+# label bitmasks have the bit i set, when a problem has the label PROBLEM_LABELS[i]
+LABEL_MASK_DTYPE = np.uint64
+
+JSON_READ_CHUNK_SIZE = 1 << 16
+# whitespace, brackets of a JSON array and commas between its records
+JSON_SEPARATORS = " \t\r\n,[]"
+
+def get_process_pool_context():
+    # process pools are started from stages running in threads, forked workers could inherit
+    # locks held by other threads (e.g. of pyarrow or BLAS pools) and deadlock
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+    return multiprocessing.get_context(method)
+
 def get_dataset_filepath(dataset_filename: str) -> str:
     absolute_path = os.path.dirname(os.path.abspath(__file__))
     filepath = f"{absolute_path}/dataset/{dataset_filename}"
@@ -13,12 +40,95 @@ def get_dataset_filepath(dataset_filename: str) -> str:
 
     return filepath
 
+def read_dataset(dataset_filepath: str) -> pd.DataFrame:
+    """
+    Reads a dataset saved by `write_dataset`. List columns (e.g. labels) are
+    returned as python lists, without any per-row parsing.
+    """
+    return _table_to_df(pq.read_table(dataset_filepath))
+
+def _table_to_df(table: pa.Table) -> pd.DataFrame:
+    dataset_df = table.to_pandas()
+
+    # pyarrow returns list columns as numpy arrays
+    for field in table.schema:
+        if pa.types.is_list(field.type) or pa.types.is_large_list(field.type):
+            dataset_df[field.name] = pd.Series(table.column(field.name).to_pylist(), index=dataset_df.index)
+
+    return dataset_df
+
+def write_dataset(dataset_df: pd.DataFrame, dataset_filepath: str, export_csv=False):
+    """
+    Writes a dataset in Parquet format, so that list columns keep their type.
+    With `export_csv=True` the dataset is also exported to a CSV file with the same name.
+    """
+    tmp_filepath = f"{dataset_filepath}.tmp"
+
+    pq.write_table(pa.Table.from_pandas(dataset_df, preserve_index=False), tmp_filepath)
+    os.replace(tmp_filepath, dataset_filepath)
+
+    if export_csv:
+        csv_filepath = f"{os.path.splitext(dataset_filepath)[0]}.csv"
+        dataset_df.to_csv(csv_filepath, index=False)
+
+def write_dataset_parts(part_filepaths: List[str], dataset_filepath: str, export_csv=False):
+    """
+    Merges Parquet parts into a single dataset, holding only one part in memory at a time.
+    Column types of the parts are unified, e.g. a column having only nulls in one part
+    gets the type it has in other parts.
+    """
+    schemas = [pq.read_schema(part_filepath) for part_filepath in part_filepaths]
+    schema = pa.unify_schemas(schemas, promote_options="permissive")
+    tmp_filepath = f"{dataset_filepath}.tmp"
+    csv_filepath = f"{os.path.splitext(dataset_filepath)[0]}.csv"
+
+    with pq.ParquetWriter(tmp_filepath, schema) as writer:
+        for i, part_filepath in enumerate(part_filepaths):
+            table = pq.read_table(part_filepath).cast(schema)
+            writer.write_table(table)
+
+            if export_csv:
+                _table_to_df(table).to_csv(csv_filepath, index=False, mode="w" if i == 0 else "a", header=i == 0)
+
+    os.replace(tmp_filepath, dataset_filepath)
+
+def iter_json_records(filepath: str, chunk_size=JSON_READ_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Yields records of a JSON array file or of a JSONL file one by one,
+    so only the current record and a chunk of the file are held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position = "", 0
+
+    with open(filepath, "r", encoding="utf-8") as f:
+        while True:
+            while position < len(buffer) and buffer[position] in JSON_SEPARATORS:
+                position += 1
+
+            try:
+                record, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # the record continues in the next chunk
+                chunk = f.read(chunk_size)
+
+                if not chunk:
+                    if position < len(buffer):
+                        raise
+
+                    return
+
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+
+            yield record
+
 def _convert_labels(labels: List[str], labels_map) -> List[str]:
+    # row-wise conversion, unknown tags are skipped like by `convert_labels_to_masks`
     converted_labels = []
 
     for label in labels:
         if label not in labels_map:
-            raise RuntimeError()
+            continue
 
         mapped_labels = labels_map[label]
 
@@ -29,6 +139,90 @@ def _convert_labels(labels: List[str], labels_map) -> List[str]:
 
     return list(set(converted_labels))
 
+@dataclass(frozen=True)
+class LabelTable:
+    """
+    Labels map of a source compiled into label bitmasks: the tag with id `tag_ids[tag]` maps to
+    labels of `masks[id]`, a problem with a tag having `discards[id]` set must not be used.
+    """
+    tag_ids: Dict[str, int]
+    masks: np.ndarray
+    discards: np.ndarray
+
+def compile_labels_map(labels_map) -> LabelTable:
+    tag_ids = {tag: i for i, tag in enumerate(labels_map)}
+    masks = np.zeros(len(tag_ids), dtype=LABEL_MASK_DTYPE)
+    discards = np.zeros(len(tag_ids), dtype=bool)
+    label_bits = {label: LABEL_MASK_DTYPE(1) << LABEL_MASK_DTYPE(i) for i, label in enumerate(PROBLEM_LABELS)}
+
+    for i, mapped_labels in enumerate(labels_map.values()):
+        if mapped_labels is None:
+            discards[i] = True
+            continue
+
+        for label in mapped_labels:
+            masks[i] |= label_bits[label]
+
+    return LabelTable(tag_ids, masks, discards)
+
+CODEFORCES_LABEL_TABLE = compile_labels_map(codeforces_to_standard)
+LEETCODE_LABEL_TABLE = compile_labels_map(leetcode_to_standard)
+SPOJ_LABEL_TABLE = compile_labels_map(spoj_to_standard)
+
+def convert_labels_to_masks(labels: pd.Series, label_table: LabelTable, unknown_tags: Optional[Counter] = None) -> np.ndarray:
+    """
+    Converts lists of source tags into label bitmasks for the whole column at once: the bitmask
+    of a row is OR of bitmasks of its tags. Rows with a discarding tag get an empty bitmask.
+
+    :param unknown_tags: tags missing in the table are skipped and counted here
+    """
+    # missing tags (NaN) are an empty list
+    rows_tags = [tags if isinstance(tags, (list, tuple, np.ndarray)) else () for tags in labels]
+    tags_counts = np.fromiter(map(len, rows_tags), dtype=np.int64, count=len(rows_tags))
+    tags = list(itertools.chain.from_iterable(rows_tags))
+
+    rows = np.repeat(np.arange(len(rows_tags)), tags_counts)
+    tag_ids = np.fromiter(map(label_table.tag_ids.get, tags, itertools.repeat(-1)), dtype=np.int64, count=len(tags))
+
+    is_known = tag_ids >= 0
+
+    if unknown_tags is not None and not is_known.all():
+        unknown_tags.update(tags[i] for i in np.flatnonzero(~is_known))
+
+    rows, tag_ids = rows[is_known], tag_ids[is_known]
+
+    masks = np.zeros(len(labels), dtype=LABEL_MASK_DTYPE)
+    np.bitwise_or.at(masks, rows, label_table.masks[tag_ids])
+    masks[rows[label_table.discards[tag_ids]]] = 0
+
+    return masks
+
+def count_mask_labels(masks: np.ndarray) -> np.ndarray:
+    return np.bitwise_count(masks)
+
+def masks_to_matrix(masks: np.ndarray, labels_count: Optional[int] = None) -> np.ndarray:
+    """
+    :param labels_count: number of columns, the highest set bit by default
+    :return: binary uint8 matrix with a row per bitmask and a column per bit
+    """
+    masks = np.asarray(masks, dtype=LABEL_MASK_DTYPE)
+
+    if labels_count is None:
+        labels_count = int(np.bitwise_or.reduce(masks, initial=0)).bit_length()
+
+    return ((masks[:, None] >> np.arange(labels_count, dtype=LABEL_MASK_DTYPE)) & 1).astype(np.uint8)
+
+def matrix_to_masks(labels_matrix: np.ndarray) -> np.ndarray:
+    labels_matrix = np.asarray(labels_matrix, dtype=LABEL_MASK_DTYPE)
+
+    return np.bitwise_or.reduce(labels_matrix << np.arange(labels_matrix.shape[1], dtype=LABEL_MASK_DTYPE), axis=1)
+
+def masks_to_labels(masks: np.ndarray, index=None) -> pd.Series:
+    # labels of every row are in PROBLEM_LABELS order, so the output is deterministic
+    label_names = np.array(PROBLEM_LABELS, dtype=object)
+
+    return pd.Series([label_names[row].tolist() for row in masks_to_matrix(masks, len(PROBLEM_LABELS)).astype(bool)], index=index, dtype=object)
+
 def convert_codeforces_labels(labels: List[str]) -> List[str]:
     return _convert_labels(labels, codeforces_to_standard)
 
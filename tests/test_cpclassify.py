@@ -0,0 +1,47 @@
+#
+# Tests of the cpclassify entry point: cold starts of `--help` and `predict` on a tiny input must
+# import no dependencies of other subcommands and stay within the import time budgets under
+# `python -X importtime`, and options are checked by the subcommand which takes them.
+#
+
+import pytest
+
+import cpclassify
+from benchmarks.startup_benchmark import (
+    DATASET_MODULES, HEAVY_MODULES, HELP_IMPORT_BUDGET, PREDICT_IMPORT_BUDGET, TINY_INPUT, run_with_importtime
+)
+
+
+def test_help_cold_start():
+    _, import_time, packages = run_with_importtime(["--help"])
+
+    assert not packages & set(HEAVY_MODULES)
+    assert import_time <= HELP_IMPORT_BUDGET
+
+
+def test_predict_cold_start(tmp_path):
+    # a small randomly initialized BERT, so the test runs offline
+    from benchmarks.synthetic_model import make_model_dir
+
+    model_dir, mlb_filepath = make_model_dir(str(tmp_path))
+
+    _, import_time, packages = run_with_importtime(["predict", "--model", model_dir, "--mlb", mlb_filepath], stdin=TINY_INPUT)
+
+    assert not packages & set(DATASET_MODULES)
+    assert import_time <= PREDICT_IMPORT_BUDGET
+
+
+def test_unknown_options_of_dataset_commands_are_rejected(capsys):
+    with pytest.raises(SystemExit) as exc_info:
+        cpclassify.main(["format", "--unknown"])
+
+    assert exc_info.value.code == 2
+    assert "unrecognized arguments: --unknown" in capsys.readouterr().err
+
+
+def test_predict_options_are_passed_to_predict(monkeypatch):
+    calls = []
+    monkeypatch.setattr(cpclassify, 'run_predict', lambda args, predict_argv: calls.append(predict_argv) or 0)
+
+    assert cpclassify.main(["predict", "--threshold", "0.3", "--help"]) == 0
+    assert calls == [["--threshold", "0.3", "--help"]]
@@ -0,0 +1,27 @@
+#
+# Tests of cleaning LeetCode HTML descriptions: the streaming cleaner must return the same text
+# as BeautifulSoup, serially and in a process pool.
+#
+
+import pandas as pd
+import pytest
+
+from benchmarks.html_cleaning_benchmark import EDGE_CASES
+from data_manager.html_cleaner import clean_html, clean_html_column
+
+
+@pytest.mark.parametrize('raw_description', EDGE_CASES)
+def test_fast_cleaner_matches_beautifulsoup(raw_description):
+    assert clean_html(raw_description, fast=True) == clean_html(raw_description)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+@pytest.mark.parametrize('fast', [False, True])
+def test_clean_html_column(workers, fast):
+    # null descriptions are kept and the index isn't reset
+    raw_descriptions = pd.Series(EDGE_CASES * 3 + [None], index=range(100, 100 + len(EDGE_CASES) * 3 + 1))
+
+    cleaned = clean_html_column(raw_descriptions, workers=workers, chunk_size=4, fast=fast)
+
+    expected = raw_descriptions.dropna().apply(clean_html).reindex(raw_descriptions.index)
+    pd.testing.assert_series_equal(cleaned, expected, check_dtype=False)
@@ -0,0 +1,41 @@
+#
+# Tests of multi-label metrics: label bitmasks of problems.parquet must give the same metrics
+# as binary label matrices with columns in the order of predictions.
+#
+
+import numpy as np
+import pytest
+from sklearn.preprocessing import MultiLabelBinarizer
+
+from classifier.metrics import multi_labels_metrics
+from data_manager.utils import PROBLEM_LABELS, matrix_to_masks
+
+PROBLEMS_COUNT = 200
+
+
+@pytest.fixture(scope='module')
+def problems():
+    rng = np.random.default_rng(0)
+    # labels of every problem in a random order, the order of mlb.classes_ differs from PROBLEM_LABELS
+    labels = [list(rng.choice(PROBLEM_LABELS, size=rng.integers(1, 4), replace=False)) for _ in range(PROBLEMS_COUNT)]
+    mlb = MultiLabelBinarizer().fit(labels)
+    logits = rng.normal(0, 2, size=(PROBLEMS_COUNT, len(mlb.classes_))).astype(np.float32)
+
+    return labels, mlb, logits
+
+
+def test_bitmasks_and_matrix_give_same_metrics(problems):
+    labels, mlb, logits = problems
+    # bit i of a bitmask is PROBLEM_LABELS[i]
+    masks = matrix_to_masks(np.array([[label in problem_labels for label in PROBLEM_LABELS] for problem_labels in labels]))
+
+    expected = multi_labels_metrics(logits, mlb.transform(labels))
+
+    assert multi_labels_metrics(logits, masks, label_names=mlb.classes_) == expected
+
+
+def test_bitmasks_need_label_names(problems):
+    labels, mlb, logits = problems
+
+    with pytest.raises(ValueError):
+        multi_labels_metrics(logits, np.zeros(PROBLEMS_COUNT, dtype=np.uint64))
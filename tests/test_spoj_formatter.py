@@ -0,0 +1,54 @@
+#
+# Tests of formatting scrapped SPOJ problems: a problem is kept when any of its sections is present,
+# and its description is merged like descriptions of other sources.
+#
+
+import json
+
+import pandas as pd
+import pytest
+
+from data_manager import cache
+from data_manager.format import SpojFormatter
+
+RECORDS = [
+    {'title': "Full", 'tags': ['dynamic-programming'], 'description': "Count\nthe ways.", 'task_description': "",
+     'input_format': "An integer n.", 'output_format': "The number of ways."},
+    {'title': "No preamble", 'tags': ['graph-theory'], 'description': "  ", 'task_description': "Find the path.",
+     'input_format': "A graph.", 'output_format': ""},
+    {'title': "Only input", 'tags': ['math'], 'description': "", 'task_description': "",
+     'input_format': "Two numbers.", 'output_format': ""},
+    {'title': "Empty", 'tags': ['math'], 'description': "", 'task_description': " ",
+     'input_format': "", 'output_format': ""},
+]
+
+
+# problems are formatted in batches, of one, of a part of problems and of all problems
+@pytest.fixture(params=[1, 3, 1000])
+def formatted_df(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'cache_dir', str(tmp_path / "cache"))
+
+    dataset_filepath = tmp_path / "spoj.json"
+    dataset_filepath.write_text("\n".join(json.dumps(record) for record in RECORDS))
+
+    formatter = SpojFormatter(batch_size=request.param)
+    formatter.dataset_filepath = str(dataset_filepath)
+
+    return formatter.format(use_cache=False)
+
+
+def test_problems_without_preamble_are_kept(formatted_df):
+    assert formatted_df['title'].tolist() == ["Full", "No preamble", "Only input"]
+    assert formatted_df['labels'].tolist() == [['dynamic programming'], ['graphs'], ['math']]
+
+
+def test_descriptions_are_merged_from_present_sections(formatted_df):
+    # the same "\n<field> = <text>" merging as the row-wise formatters of other sources
+    expected = [
+        "Count the ways.\ninput_format = An integer n.\noutput_format = The number of ways.",
+        "\ntask_description = Find the path.\ninput_format = A graph.",
+        "\ninput_format = Two numbers.",
+    ]
+
+    pd.testing.assert_series_equal(formatted_df['description'].reset_index(drop=True), pd.Series(expected, name='description'),
+                                   check_dtype=False)
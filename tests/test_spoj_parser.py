@@ -0,0 +1,58 @@
+#
+# Tests of parsing SPOJ pages: the default parser backend must produce the same problems as html5lib,
+# the parser the scrapper used before ('html.parser' nests unclosed tags differently, see scrapper.PARSER).
+#
+
+import pytest
+
+from benchmarks.parser_benchmark import REFERENCE_PARSER, generate_pages, parse_all
+from data_manager.spoj_scrapper import scrapper
+
+PROBLEMS_COUNT = 60
+
+# a statement with unclosed paragraphs, line breaks and entities outside of the stub markup
+HANDWRITTEN_PAGE = (
+    '<html><body>\n'
+    '<div id="problem-tags"><a href="/problems/tag/math"><span class="problem-tag">#math</span></a></div>\n'
+    '<div id="problem-body">\n'
+    '<p>Find the sum<br>of <i>two</i> numbers &amp; print it\n'
+    '<h3>Input</h3><p>Two integers a, b (|a|, |b| &le; 10<sup>9</sup>)\n'
+    '<h3>Output</h3><p>a&nbsp;+&nbsp;b</p>\n'
+    '<h3>Example</h3><pre><b>Input:</b>\n1 2\n\n<b>Output:</b>\n3\n</pre>\n'
+    '</div>\n'
+    '<table id="problem-meta"><tbody>\n'
+    '<tr><td>Added by:</td><td><a href="/users/someone">Someone</a></td></tr>\n'
+    '<tr><td>Time limit:</td><td>1s</td></tr>\n'
+    '</tbody></table>\n'
+    '</body></html>'
+)
+
+
+@pytest.fixture(scope='module')
+def pages():
+    problems_pages, problem_pages = generate_pages(PROBLEMS_COUNT)
+
+    return problems_pages, problem_pages + [(HANDWRITTEN_PAGE, scrapper.ProblemPreview(url="handwritten"))]
+
+
+@pytest.fixture(scope='module')
+def reference(pages):
+    problems_preview, problems, _ = parse_all(REFERENCE_PARSER, *pages)
+
+    return problems_preview, problems
+
+
+def test_reference_parses_pages(reference):
+    problems_preview, problems = reference
+
+    assert sum(len(page) for page in problems_preview) == PROBLEMS_COUNT
+    assert problems[-1].tags == ['math']
+    assert "Find the sum" in problems[-1].description
+    assert problems[-1].input_format and problems[-1].output_format
+
+
+def test_default_parser_matches_reference(pages, reference):
+    problems_preview, problems, _ = parse_all(scrapper.PARSER, *pages)
+
+    assert problems_preview == reference[0]
+    assert problems == reference[1]
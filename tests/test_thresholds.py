@@ -0,0 +1,40 @@
+#
+# Tests of per-label thresholds: both predictors get a threshold of every label,
+# and thresholds of unknown labels are rejected.
+#
+
+import joblib
+import numpy as np
+import pytest
+
+from classifier.baseline import BaselinePredictor, make_baseline
+from classifier.constants import DEFAULT_THRESHOLD
+from classifier.thresholds import get_thresholds
+
+LABEL_NAMES = ['graphs', 'math', 'sortings']
+
+
+def test_threshold_of_all_labels():
+    np.testing.assert_array_equal(get_thresholds(0.3, LABEL_NAMES), np.full(3, 0.3, dtype=np.float32))
+
+
+def test_thresholds_of_some_labels():
+    np.testing.assert_array_equal(get_thresholds({'math': 0.2}, LABEL_NAMES), np.array([DEFAULT_THRESHOLD, 0.2, DEFAULT_THRESHOLD], dtype=np.float32))
+
+
+def test_thresholds_of_unknown_labels():
+    with pytest.raises(ValueError, match="unknown labels"):
+        get_thresholds({'grahps': 0.2}, LABEL_NAMES)
+
+
+@pytest.mark.parametrize('thresholds', [0.4, {'math': 0.4}])
+def test_baseline_thresholds_of_every_label(tmp_path, thresholds):
+    texts = ["shortest path in a graph", "sum of two numbers", "sort the array"] * 4
+    labels = np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1]] * 4)
+    model_filepath = tmp_path / "baseline.joblib"
+    joblib.dump({'pipeline': make_baseline(n_jobs=1).fit(texts, labels), 'label_names': LABEL_NAMES}, model_filepath)
+
+    predictor = BaselinePredictor(model_filepath, thresholds)
+
+    np.testing.assert_array_equal(predictor.thresholds, get_thresholds(thresholds, LABEL_NAMES))
+    assert len(predictor.predict(texts[:3])) == 3
@@ -0,0 +1,46 @@
+#
+# Tests of batched tokenization, encode_corpus with the fast tokenizer must produce the same token ids
+# as the pure-Python tokenizer encoding texts one at a time.
+#
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic_tokenizer import make_tokenizer
+from benchmarks.tokenizer_benchmark import EDGE_CASES
+from classifier.tokenization import MAX_LENGTH, encode_corpus
+
+TEXTS = [
+    "Given an array of n integers, find the maximum sum of a subarray.",
+    "Queries on a tree: print the number of vertices in the subtree of every vertex.",
+] + EDGE_CASES
+
+
+@pytest.fixture(scope='module')
+def tokenizers(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("tokenizer")
+
+    return make_tokenizer(directory, fast=False), make_tokenizer(directory, fast=True)
+
+
+@pytest.mark.parametrize('batch_size, num_workers', [(1000, None), (3, 1), (3, 2)])
+def test_encode_corpus_matches_slow_tokenizer(tokenizers, batch_size, num_workers):
+    slow_tokenizer, fast_tokenizer = tokenizers
+
+    encoded_corpus = encode_corpus(TEXTS, fast_tokenizer, batch_size=batch_size, num_workers=num_workers)
+
+    assert len(encoded_corpus) == len(TEXTS)
+    for idx, text in enumerate(TEXTS):
+        assert encoded_corpus[idx].tolist() == slow_tokenizer(text, truncation=True, max_length=MAX_LENGTH)['input_ids']
+
+
+def test_encode_corpus_truncation(tokenizers):
+    _, fast_tokenizer = tokenizers
+    texts = [" ".join(["vertex"] * 100), "sum"]
+
+    truncated = encode_corpus(texts, fast_tokenizer, max_length=16)
+    full = encode_corpus(texts, fast_tokenizer, max_length=None)
+
+    np.testing.assert_array_equal(truncated.lengths, [16, 3])
+    assert full.lengths[0] == 102
+    assert truncated[1].tolist() == full[1].tolist()
@@ -1,27 +1,36 @@
 #!/usr/bin/env python3
 import joblib
 import torch
-import numpy as np
-from sklearn.metrics import roc_auc_score, f1_score, hamming_loss, classification_report
+from sklearn.metrics import classification_report
 from transformers import (
-    BertTokenizer, 
+    BertTokenizerFast,
     BertForSequenceClassification,
-    AutoModelForSequenceClassification,
-    Trainer,
     TrainingArguments,
     EvalPrediction
 )
-from torch.utils.data import Dataset
+
+from classifier.batching import BucketedTrainer, WindowPoolingTrainer, collate_to_longest, collate_windows
+from classifier.constants import MODEL_DIR
+from classifier.corpus import CORPUS_DIR_NAME, CorpusDataset, build_corpus
+from classifier.metrics import multi_labels_metrics
+from data_manager.preprocess import MLB_FILE, PREPROCESSED_DATA_FILE, unpack_labels
+from data_manager.utils import get_dataset_filepath
+
+# "max" or "mean" to split long problems into overlapping windows and pool their logits,
+# None truncates problems to 512 tokens. Predict with the same `--pooling`
+WINDOW_POOLING = None
 
 # ---------------- Step 1: Load preprocessed data ----------------
 print("Loading preprocessed data...")
-data = joblib.load("./dataset/preprocessed_data.joblib")
+# made by the preprocessing stage of data_manager/prepare_dataset.py
+data = joblib.load(get_dataset_filepath(PREPROCESSED_DATA_FILE))
 train_texts = data["train_texts"]
 val_texts = data["val_texts"]
-train_labels = data["train_labels"]
-val_labels = data["val_labels"]
+# labels are stored bit-packed, unpacked labels are uint8 matrices
+train_labels = unpack_labels(data["train_labels"], data["labels_count"])
+val_labels = unpack_labels(data["val_labels"], data["labels_count"])
 
-mlb = joblib.load("./dataset/mlb.joblib")
+mlb = joblib.load(get_dataset_filepath(MLB_FILE))
 label_names = mlb.classes_ # numpy array，包含所有分類類別的名稱，順序與 one-hot 編碼中的欄位對應
 
 # ---------------- Step 2: Tokenize ----------------
@@ -29,7 +38,8 @@ print("Tokenizing...")
 
 # Use BERT
 checkpoint = "bert-base-uncased"
-tokenizer = BertTokenizer.from_pretrained(checkpoint)
+# Rust-backed tokenizer, texts are encoded in batches
+tokenizer = BertTokenizerFast.from_pretrained(checkpoint)
 #  multi-label loss（BCEWithLogitsLoss）
 model = BertForSequenceClassification.from_pretrained(
     checkpoint,
@@ -37,61 +47,25 @@ model = BertForSequenceClassification.from_pretrained(
     problem_type="multi_label_classification"
 )
 
-class CustomDataset(Dataset):
-    def __init__(self, texts, labels, tokenizer, max_len=512):
-        self.texts = texts
-        self.labels = labels
-        self.tokenizer = tokenizer
-        self.max_len = max_len
-
-    def __len__(self):
-        return len(self.texts)
-
-    def __getitem__(self, idx):
-        text = str(self.texts[idx])
-        label = torch.tensor(self.labels[idx], dtype=torch.float32)
-
-        encoding = self.tokenizer(
-            text,
-            truncation=True,
-            padding="max_length",
-            max_length=self.max_len,
-            return_tensors='pt'
-        )
-
-        return {
-            'input_ids': encoding['input_ids'].squeeze(0),
-            'attention_mask': encoding['attention_mask'].squeeze(0),
-            'labels': label
-        }
-
-# ---------------- Instantiate datasets ----------------
-train_dataset = CustomDataset(train_texts, train_labels, tokenizer)
-val_dataset   = CustomDataset(val_texts, val_labels, tokenizer)
-
+# texts are tokenized once, next runs reuse memory-mapped tokens from data_manager/dataset/corpus
+train_corpus_dir = get_dataset_filepath(f"{CORPUS_DIR_NAME}/train")
+val_corpus_dir = get_dataset_filepath(f"{CORPUS_DIR_NAME}/val")
 
+windowed = WINDOW_POOLING is not None
 
-# ---------------- Step 4: Move model to GPU if available ----------------
-def multi_labels_metrics(predictions, labels, threshold=0.3):
-  sigmoid = torch.nn.Sigmoid()
-  probs = sigmoid(torch.Tensor(predictions))
+if not build_corpus(train_texts, train_labels, tokenizer, train_corpus_dir, windowed=windowed):
+    print("Training corpus is up to date")
 
-  y_pred = np.zeros(probs.shape)
-  y_pred[np.where(probs>=threshold)] = 1
-  y_true = labels
+if not build_corpus(val_texts, val_labels, tokenizer, val_corpus_dir, windowed=windowed):
+    print("Validation corpus is up to date")
 
-  f1 = f1_score(y_true, y_pred, average = 'macro')
-  roc_auc = roc_auc_score(y_true, y_pred, average = 'macro')
-  hamming = hamming_loss(y_true, y_pred)
+# ---------------- Instantiate datasets ----------------
+train_dataset = CorpusDataset(train_corpus_dir)
+val_dataset   = CorpusDataset(val_corpus_dir)
 
-  metrics = {
-      "roc_auc": roc_auc,
-      "hamming_loss": hamming,
-      "f1": f1
-  }
 
-  return metrics
 
+# ---------------- Step 4: Move model to GPU if available ----------------
 def compute_metrics(p:EvalPrediction):
   preds = p.predictions[0] if isinstance(p.predictions, tuple) else p.predictions
 
@@ -110,13 +84,26 @@ training_args = TrainingArguments(
     save_total_limit=2
 )
 
-trainer = Trainer(
-    model=model,
-    args=training_args,
-    train_dataset=train_dataset,
-    eval_dataset=val_dataset,
-    tokenizer=tokenizer,
-)
+# batches have problems of similar length and are padded only to their longest problem
+if windowed:
+    trainer = WindowPoolingTrainer(
+        model=model,
+        args=training_args,
+        data_collator=collate_windows,
+        train_dataset=train_dataset,
+        eval_dataset=val_dataset,
+        processing_class=tokenizer,
+        pooling=WINDOW_POOLING,
+    )
+else:
+    trainer = BucketedTrainer(
+        model=model,
+        args=training_args,
+        data_collator=collate_to_longest,
+        train_dataset=train_dataset,
+        eval_dataset=val_dataset,
+        processing_class=tokenizer,
+    )
 
 # ---------------- Step 6: Train! ----------------
 print("Starting training...")
@@ -127,6 +114,9 @@ if torch.cuda.is_available():
 
 trainer.train()
 
+# the model and the tokenizer are loaded from here by classifier/predict.py
+trainer.save_model(MODEL_DIR)
+
 # ---------------- Step 7: Evaluate ----------------
 print("Evaluating...")
 preds = trainer.predict(val_dataset).predictions